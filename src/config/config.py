@@ -10,6 +10,22 @@ class App:
     name: str
     environment: str
     api_keys: list[str]
+    token_cache_size: int = 1024
+    token_cache_ttl: int = 300
+    master_cache_ttl: int = 300
+    master_cache_listen: bool = False
+    forecast_upsert_mode: str = "diff"
+    job_worker: bool = True
+    job_workers: int = 4
+    job_poll_interval: int = 5
+    job_stale_timeout: int = 600
+    job_max_attempts: int = 3
+    upload_retention: bool = False
+    temp_retention: int = 86400
+    temp_purge_interval: int = 3600
+    pdf_cache_size: int = 67108864
+    forecast_stats_reconcile_interval: int = 3600
+    allocation_snapshot_refresh_interval: int = 900
 
     def __init__(self, **data: Any):
         self.__dict__.update(**data)
@@ -21,6 +37,11 @@ class Database:
     name: str
     username: str
     password: str
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    pool_timeout: int = 30
 
     def __init__(self, **data: Any):
         self.__dict__.update(**data)
@@ -39,6 +60,11 @@ class Outbound:
     api_key: str | None
     username: str | None
     password: str | None
+    timeout: float = 30
+    max_retries: int = 3
+    retry_backoff: float = 1
+    pool_size: int = 10
+    max_concurrency: int = 4
 
     def __init__(self, **data: Any):
         self.__dict__.update(**data)
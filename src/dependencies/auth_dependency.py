@@ -10,6 +10,7 @@ from src.domains.users.user_interface import IUserRepository
 from src.domains.users.user_repository import UserRepository
 from src.shared.enums import Database
 from src.shared.utils.database_utils import begin_transaction, commit
+from src.shared.utils.token_cache import cache_user, get_cached_user
 
 http_bearer = HTTPBearer()
 api_key_header = APIKeyHeader(name="X-API-Key")
@@ -20,16 +21,21 @@ def bearer_auth(
     auth: HTTPAuthorizationCredentials = Security(http_bearer),
     user_repo: IUserRepository = Depends(UserRepository),
 ):
-    user = user_repo.get_auth_user(request, auth.credentials.removeprefix("Bearer "))
+    access_token = auth.credentials.removeprefix("Bearer ")
+    user = get_cached_user(access_token)
     if user is None:
-        raise HTTPException(
-            status_code=http.HTTPStatus.UNAUTHORIZED, detail="Unauthorized"
-        )
-
-    begin_transaction(request, Database.VEHICLE_ALLOCATION)
-    user_repo.upsert_user(request, user)
-    commit(request, Database.VEHICLE_ALLOCATION)
-    request.state.access_token = auth.credentials.removeprefix("Bearer ")
+        user = user_repo.get_auth_user(request, access_token)
+        if user is None:
+            raise HTTPException(
+                status_code=http.HTTPStatus.UNAUTHORIZED, detail="Unauthorized"
+            )
+
+        begin_transaction(request, Database.VEHICLE_ALLOCATION)
+        user_repo.upsert_user(request, user)
+        commit(request, Database.VEHICLE_ALLOCATION)
+        cache_user(access_token, user)
+
+    request.state.access_token = access_token
     request.state.user = user
 
 
@@ -1,11 +1,19 @@
-from typing import Generator
+from typing import AsyncGenerator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from src.infrastructures.databases.database import postgres
+from starlette.requests import Request
+from src.infrastructures.databases.database import postgres_async
+from src.shared.utils.database_utils import get_request_va_db
 
 
-def get_va_db() -> Generator[Session, None, None]:
-    db = postgres("vehicle_allocation")
+def get_va_db(request: Request) -> Session:
+    # closed by DatabaseMiddleware once the response is sent
+    return get_request_va_db(request)
+
+
+async def get_va_async_db() -> AsyncGenerator[AsyncSession, None]:
+    db = postgres_async("vehicle_allocation")
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
@@ -0,0 +1,318 @@
+import hashlib
+from typing import Any, Iterable, List, Sequence
+
+import numpy
+import pandas
+from sqlalchemy import Select, and_, func, select
+
+from src.domains.calculations.entities.va_slot_calculation_details import (
+    SlotCalculationDetail,
+)
+from src.domains.calculations.entities.va_slot_calculations import SlotCalculation
+from src.domains.forecasts.entities.va_forecast_detail_months import ForecastDetailMonth
+from src.domains.forecasts.entities.va_forecast_details import ForecastDetail
+from src.domains.forecasts.entities.va_forecasts import Forecast
+from src.domains.masters.entities.va_dealers import Dealer
+from src.domains.masters.entities.va_models import Model
+from src.domains.masters.entities.va_order_configurations import OrderConfiguration
+from src.domains.masters.entities.va_stock_pilots import StockPilot
+
+FORECAST_MONTH_COLUMNS = [
+    "forecast_detail_month_id",
+    "dealer_id",
+    "dealer_name",
+    "year",
+    "month",
+    "model_id",
+    "segment_id",
+    "category_id",
+    "forecast_month",
+    "adjustment",
+    "total_ws",
+    "confirmed_total_ws",
+    "end_stock",
+]
+ALLOCATION_COLUMNS = [
+    "forecast_detail_month_id",
+    "dealer_id",
+    "dealer_name",
+    "year",
+    "month",
+    "model_id",
+    "segment_id",
+    "category_id",
+    "forecast_month",
+    "adjustment",
+    "ws",
+    "ws_percentage",
+    "allocation",
+    "confirmed_total_ws",
+    "end_stock",
+]
+SLOT_COLUMNS = ["take_off", "soa", "oc", "bo", "so", "booking_prospect", "slot_1"]
+
+
+def get_forecast_month_statement(
+    month: int, year: int, model_ids: Iterable[str] | None = None
+) -> Select:
+    statement = (
+        select(
+            ForecastDetailMonth.id,
+            Dealer.id,
+            Dealer.name,
+            Forecast.year,
+            Forecast.month,
+            Model.id,
+            Model.segment_id,
+            Model.category_id,
+            ForecastDetailMonth.forecast_month,
+            ForecastDetailMonth.adjustment,
+            ForecastDetailMonth.total_ws,
+            ForecastDetailMonth.confirmed_total_ws,
+            ForecastDetail.end_stock,
+        )
+        .select_from(Forecast)
+        .join(Dealer, Dealer.id == Forecast.dealer_id)
+        .join(
+            ForecastDetail,
+            and_(
+                ForecastDetail.forecast_id == Forecast.id,
+                ForecastDetail.deletable == 0,
+            ),
+        )
+        .join(
+            ForecastDetailMonth,
+            and_(
+                ForecastDetailMonth.forecast_detail_id == ForecastDetail.id,
+                ForecastDetailMonth.deletable == 0,
+            ),
+        )
+        .join(Model, Model.id == ForecastDetail.model_id)
+        .where(and_(Forecast.month == month, Forecast.year == year))
+    )
+    if model_ids is not None:
+        statement = statement.where(ForecastDetail.model_id.in_(list(model_ids)))
+    return statement
+
+
+def get_total_ws_statement(
+    month: int, year: int, model_ids: Iterable[str] | None = None
+) -> Select:
+    statement = (
+        select(
+            ForecastDetail.model_id,
+            ForecastDetailMonth.forecast_month,
+            func.sum(ForecastDetailMonth.total_ws),
+        )
+        .select_from(ForecastDetailMonth)
+        .join(
+            ForecastDetail,
+            and_(
+                ForecastDetail.deletable == 0,
+                ForecastDetail.id == ForecastDetailMonth.forecast_detail_id,
+            ),
+        )
+        .join(
+            Forecast,
+            and_(Forecast.deletable == 0, Forecast.id == ForecastDetail.forecast_id),
+        )
+        .where(
+            and_(
+                Forecast.month == month,
+                Forecast.year == year,
+                ForecastDetailMonth.deletable == 0,
+            )
+        )
+        .group_by(ForecastDetail.model_id, ForecastDetailMonth.forecast_month)
+    )
+    if model_ids is not None:
+        statement = statement.where(ForecastDetail.model_id.in_(list(model_ids)))
+    return statement
+
+
+def get_slot_calculation_statement(month: int, year: int) -> Select:
+    return select(SlotCalculation.id).where(
+        and_(
+            SlotCalculation.month == month,
+            SlotCalculation.year == year,
+            SlotCalculation.deletable == 0,
+        )
+    )
+
+
+def get_slot_calculation_detail_statement(
+    month: int, year: int, model_ids: Iterable[str] | None = None
+) -> Select:
+    statement = (
+        select(
+            SlotCalculationDetail.slot_calculation_id,
+            SlotCalculationDetail.model_id,
+            SlotCalculationDetail.forecast_month,
+            *[getattr(SlotCalculationDetail, i) for i in SLOT_COLUMNS],
+        )
+        .join(
+            SlotCalculation,
+            and_(
+                SlotCalculation.id == SlotCalculationDetail.slot_calculation_id,
+                SlotCalculation.month == month,
+                SlotCalculation.year == year,
+                SlotCalculation.deletable == 0,
+            ),
+        )
+        .where(SlotCalculationDetail.deletable == 0)
+    )
+    if model_ids is not None:
+        statement = statement.where(
+            SlotCalculationDetail.model_id.in_(list(model_ids))
+        )
+    return statement
+
+
+def get_stock_pilot_statement(month: int, year: int) -> Select:
+    return select(StockPilot.segment_id, StockPilot.percentage).where(
+        and_(StockPilot.month == month, StockPilot.year == year)
+    )
+
+
+def get_order_configuration_statement(month: int, year: int) -> Select:
+    return select(
+        OrderConfiguration.category_id, OrderConfiguration.forecast_percentage
+    ).where(and_(OrderConfiguration.month == month, OrderConfiguration.year == year))
+
+
+def get_allocation_input_statements(
+    month: int, year: int, model_ids: Iterable[str] | None = None
+) -> List[Select]:
+    # in the argument order of compute_allocation_adjustments
+    if model_ids is not None:
+        model_ids = list(model_ids)
+    return [
+        get_forecast_month_statement(month, year, model_ids),
+        get_total_ws_statement(month, year, model_ids),
+        get_slot_calculation_statement(month, year),
+        get_slot_calculation_detail_statement(month, year, model_ids),
+        get_stock_pilot_statement(month, year),
+        get_order_configuration_statement(month, year),
+    ]
+
+
+def get_allocation_fingerprint(
+    stock_pilots: Sequence[Sequence[Any]],
+    order_configurations: Sequence[Sequence[Any]],
+) -> str:
+    # stock pilots and order configurations are maintained outside this app,
+    # a snapshot built from other values than the current ones is stale
+    return hashlib.sha256(
+        repr(
+            (
+                sorted(tuple(i) for i in stock_pilots),
+                sorted(tuple(i) for i in order_configurations),
+            )
+        ).encode()
+    ).hexdigest()
+
+
+def _get_slot_candidates(
+    calculation_ids: Sequence[Any], slot_details: Sequence[Sequence[Any]]
+) -> pandas.DataFrame:
+    # the report query left joins every live calculation of the period, so a
+    # (model, month) gets one row per calculation (all NULL when that
+    # calculation has no detail) and GROUP BY collapses identical rows
+    columns = ["model_id", "forecast_month"] + SLOT_COLUMNS
+    candidates = [tuple(i[1:]) for i in slot_details]
+
+    counts = {}
+    for i in candidates:
+        counts[i[:2]] = counts.get(i[:2], 0) + 1
+    candidates += [
+        k + (None,) * len(SLOT_COLUMNS)
+        for k, v in counts.items()
+        if v < len(calculation_ids)
+    ]
+
+    return pandas.DataFrame(
+        list(dict.fromkeys(candidates)), columns=columns, dtype=object
+    )
+
+
+def _as_float(values: pandas.Series) -> numpy.ndarray:
+    return pandas.to_numeric(values, errors="coerce").to_numpy(dtype=numpy.float64)
+
+
+def compute_allocation_adjustments(
+    forecast_months: Sequence[Sequence[Any]],
+    total_ws: Sequence[Sequence[Any]],
+    calculation_ids: Sequence[Any],
+    slot_details: Sequence[Sequence[Any]],
+    stock_pilots: Sequence[Sequence[Any]],
+    order_configurations: Sequence[Sequence[Any]],
+) -> List[tuple]:
+    rows = pandas.DataFrame(forecast_months, columns=FORECAST_MONTH_COLUMNS)
+    if len(rows) == 0:
+        return []
+
+    # stock pilot and order configuration are inner joins in the report query
+    rows = rows.merge(
+        pandas.DataFrame(stock_pilots, columns=["segment_id", "stock_pilot"]),
+        on="segment_id",
+    ).merge(
+        pandas.DataFrame(
+            order_configurations, columns=["category_id", "forecast_percentage"]
+        ),
+        on="category_id",
+    )
+    rows = rows.merge(
+        pandas.DataFrame(
+            total_ws, columns=["model_id", "forecast_month", "total_ws_sum"]
+        ),
+        on=["model_id", "forecast_month"],
+        how="left",
+    ).merge(
+        _get_slot_candidates(calculation_ids, slot_details),
+        on=["model_id", "forecast_month"],
+        how="left",
+    )
+    if len(rows) == 0:
+        return []
+
+    total_ws_sum = _as_float(rows["total_ws_sum"])
+    has_total_ws = numpy.nan_to_num(total_ws_sum, nan=0) > 0
+    safe_total_ws_sum = numpy.where(has_total_ws, total_ws_sum, 1)
+    ws = numpy.nan_to_num(_as_float(rows["total_ws"]), nan=0)
+
+    # float8 arithmetic in the same order as the SQL, float8 -> int4 casts
+    # round half to even which is what numpy.rint does
+    ws_percentage = numpy.where(
+        has_total_ws, numpy.rint(ws / safe_total_ws_sum * 100), 0
+    )
+
+    slot = {i: numpy.nan_to_num(_as_float(rows[i]), nan=0) for i in SLOT_COLUMNS}
+    slot_1 = _as_float(rows["slot_1"])
+    stock_pilot = _as_float(rows["stock_pilot"])
+    forecast_percentage = _as_float(rows["forecast_percentage"])
+
+    allocation = numpy.rint(
+        (
+            (slot["take_off"] + slot["bo"]) * (stock_pilot / 100)
+            - (slot["soa"] + slot["oc"] + slot["so"] + slot["booking_prospect"])
+        )
+        * (forecast_percentage / 100)
+        * safe_total_ws_sum
+        * 100
+    )
+    allocation = numpy.where(has_total_ws, allocation, 0)
+    allocation = numpy.where(numpy.isnan(slot_1), allocation, slot_1)
+    allocation = numpy.minimum(allocation, ws)
+
+    rows["ws"] = ws.astype(numpy.int64)
+    rows["ws_percentage"] = ws_percentage.astype(numpy.int64)
+    rows["allocation"] = allocation.astype(numpy.int64)
+    for i in ["adjustment", "confirmed_total_ws", "end_stock"]:
+        rows[i] = numpy.nan_to_num(_as_float(rows[i]), nan=0).astype(numpy.int64)
+
+    rows = rows.sort_values(
+        ["model_id", "dealer_id", "forecast_month", "forecast_detail_month_id"],
+        kind="stable",
+    )
+
+    return list(rows[ALLOCATION_COLUMNS].itertuples(index=False, name=None))
@@ -8,16 +8,21 @@ from fastapi import (
     Form,
     UploadFile,
     HTTPException,
-    BackgroundTasks,
 )
 from starlette.requests import Request
-from starlette.responses import FileResponse
+from starlette.responses import Response
 
 from src.dependencies.auth_dependency import api_key_auth, bearer_auth
 from src.domains.allocations.allocation_interface import IAllocationUseCase
 from src.domains.allocations.allocation_usecase import AllocationUseCase
 from src.domains.forecasts.forecast_interface import IForecastUseCase
 from src.domains.forecasts.forecast_usecase import ForecastUseCase
+from src.domains.jobs.enums import JobTypeEnum
+from src.domains.jobs.job_interface import IJobUseCase
+from src.domains.jobs.job_usecase import JobUseCase
+from src.domains.uploads.enums import UploadKindEnum
+from src.domains.uploads.upload_interface import IUploadUseCase
+from src.domains.uploads.upload_usecase import UploadUseCase
 from src.models.requests.allocation_request import (
     GetAllocationRequest,
     SubmitAllocationRequest,
@@ -31,6 +36,7 @@ from src.models.requests.forecast_request import (
 )
 from src.models.responses.allocation_response import (
     GetAllocationAdjustmentResponse,
+    GetAllocationDispatchResponse,
     GetAllocationResponse,
 )
 from src.models.responses.basic_response import (
@@ -38,7 +44,10 @@ from src.models.responses.basic_response import (
     ListResponse,
     NoDataResponse,
 )
-from src.shared.utils.storage_utils import save_file
+from src.models.responses.job_response import JobResponse
+from src.shared.utils.checksum import get_file_checksum
+from src.shared.utils.excel import get_excel_template_response
+from src.shared.utils.storage_utils import save_upload
 
 router = APIRouter(prefix="/api/allocations", tags=["Allocation"])
 
@@ -59,30 +68,59 @@ def approve_allocation(
     return BasicResponse(data=res, message="Success approving allocation data")
 
 
-@router.post("/send-to-hoyu", response_model=NoDataResponse)
+@router.post(
+    "/send-to-hoyu",
+    response_model=BasicResponse[JobResponse],
+    status_code=http.HTTPStatus.ACCEPTED,
+)
 def send_to_hoyu(
     request: Request,
-    background_task: BackgroundTasks,
     approval_request: ApprovalAllocationRequest,
     uc: IAllocationUseCase = Depends(AllocationUseCase),
+    job_uc: IJobUseCase = Depends(JobUseCase),
+):
+    uc.prepare_allocation_dispatch(request, approval_request)
+    res = job_uc.enqueue_job(
+        request,
+        JobTypeEnum.HOYU_DISPATCH,
+        approval_request.month,
+        approval_request.year,
+        {},
+    )
+    return BasicResponse(data=res, message="Success queueing allocation data to HOYU")
+
+
+@router.get(
+    "/send-to-hoyu",
+    response_model=BasicResponse[GetAllocationDispatchResponse],
+    summary="Get HOYU Dispatch Progress",
+    description="Get the per dealer status of the last allocation push to HOYU for a period",
+)
+def get_send_to_hoyu_progress(
+    request: Request,
+    approval_request: ApprovalAllocationRequest = Depends(),
+    uc: IAllocationUseCase = Depends(AllocationUseCase),
 ):
-    background_task.add_task(uc.send_allocation_to_hoyu, request, approval_request)
-    return NoDataResponse(message="Success sending allocation data to HOYU")
+    res = uc.get_allocation_dispatch(request, approval_request)
+    return BasicResponse(data=res, message="Success getting HOYU dispatch progress")
 
 
 @router.post(
     "/monthly-target",
-    response_model=NoDataResponse,
+    response_model=BasicResponse[JobResponse | None],
+    status_code=http.HTTPStatus.ACCEPTED,
     summary="Upsert Monthly Target",
-    description="Upsert Monthly Target",
+    description="Queue the upsert of the monthly target, the progress is available at /api/jobs/{id}",
 )
 def upsert_monthly_target(
     request: Request,
+    response: Response,
     file: UploadFile = File(...),
     month: int = Form(...),
     year: int = Form(...),
-    allocation_uc: IAllocationUseCase = Depends(AllocationUseCase),
-) -> NoDataResponse:
+    job_uc: IJobUseCase = Depends(JobUseCase),
+    upload_uc: IUploadUseCase = Depends(UploadUseCase),
+) -> BasicResponse[JobResponse | None]:
     if (
         file.content_type
         != "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -91,19 +129,33 @@ def upsert_monthly_target(
             status_code=http.HTTPStatus.BAD_REQUEST,
             detail="Please upload excel file",
         )
-    path = save_file("allocations", file)
-    allocation_uc.upsert_monthly_target(request, path, month, year)
 
-    return NoDataResponse(message="Success Upserting Monthly Target")
+    content_hash = get_file_checksum(file.file)
+    if upload_uc.is_upload_current(
+        request, UploadKindEnum.MONTHLY_TARGET, month, year, content_hash
+    ):
+        response.status_code = http.HTTPStatus.OK
+        return BasicResponse(data=None, message="Monthly Target is already up to date")
+
+    path = save_upload("allocations", file)
+    res = job_uc.enqueue_job(
+        request,
+        JobTypeEnum.MONTHLY_TARGET,
+        month,
+        year,
+        {"path": path, "content_hash": content_hash},
+    )
+
+    return BasicResponse(data=res, message="Success queueing Monthly Target")
 
 
 @router.get("", response_model=BasicResponse[GetAllocationResponse])
-def get_allocation_detail(
+async def get_allocation_detail(
     request: Request,
     get_allocation_request: GetAllocationRequest = Depends(),
     allocation_uc: IAllocationUseCase = Depends(AllocationUseCase),
 ):
-    res = allocation_uc.get_allocations(request, get_allocation_request)
+    res = await allocation_uc.get_allocations(request, get_allocation_request)
 
     return BasicResponse(data=res, message="Success getting allocation")
 
@@ -128,10 +180,12 @@ def download_monthly_target_template(
     month: int,
     year: int,
     allocation_uc: IAllocationUseCase = Depends(AllocationUseCase),
-) -> FileResponse:
-    path = allocation_uc.download_monthly_target_excel_template(request, month, year)
-    return FileResponse(
-        path,
-        media_type="application/octet-stream",
-        filename="{}-{}-allocation-monthly-target-template.xlsx".format(month, year),
+) -> Response:
+    template = allocation_uc.download_monthly_target_excel_template(
+        request, month, year
+    )
+    return get_excel_template_response(
+        request,
+        template,
+        "{}-{}-allocation-monthly-target-template.xlsx".format(month, year),
     )
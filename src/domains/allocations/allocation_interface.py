@@ -1,5 +1,5 @@
 import abc
-from typing import List
+from typing import BinaryIO, Iterable, List, Tuple
 
 from fastapi import UploadFile
 from starlette.requests import Request
@@ -8,26 +8,36 @@ from src.domains.allocations.entities.allocation_approval_matrix import (
     AllocationApprovalMatrix,
 )
 from src.domains.allocations.entities.allocation_approvals import AllocationApproval
+from src.domains.allocations.entities.allocation_dispatches import AllocationDispatch
 from src.domains.forecasts.entities.va_monthly_target_details import MonthlyTargetDetail
 from src.domains.forecasts.entities.va_monthly_targets import MonthlyTarget
+from src.models.dtos.excel_dto import ExcelTemplateDto
 from src.models.requests.allocation_request import (
     GetAllocationRequest,
     SubmitAllocationRequest,
 )
 from src.models.requests.forecast_request import ApprovalAllocationRequest
-from src.models.responses.allocation_response import GetAllocationAdjustmentResponse
+from src.models.responses.allocation_response import (
+    GetAllocationAdjustmentResponse,
+    GetAllocationDispatchResponse,
+)
 
 
 class IAllocationUseCase:
     @abc.abstractmethod
-    def get_allocations(
+    async def get_allocations(
         self, request: Request, get_allocation_request: GetAllocationRequest
     ) -> List[GetAllocationAdjustmentResponse]:
         pass
 
     @abc.abstractmethod
     def upsert_monthly_target(
-        self, request: Request, file: str, month: int, year: int
+        self,
+        request: Request,
+        file: str | BinaryIO,
+        month: int,
+        year: int,
+        content_hash: str | None = None,
     ) -> None:
         pass
 
@@ -46,7 +56,13 @@ class IAllocationUseCase:
     @abc.abstractmethod
     def download_monthly_target_excel_template(
         self, request: Request, month: int, year: int
-    ) -> str:
+    ) -> ExcelTemplateDto:
+        pass
+
+    @abc.abstractmethod
+    def prepare_allocation_dispatch(
+        self, request: Request, approval_request: ApprovalAllocationRequest
+    ) -> None:
         pass
 
     @abc.abstractmethod
@@ -55,16 +71,44 @@ class IAllocationUseCase:
     ):
         pass
 
+    @abc.abstractmethod
+    def get_allocation_dispatch(
+        self, request: Request, approval_request: ApprovalAllocationRequest
+    ) -> GetAllocationDispatchResponse:
+        pass
+
 
 class IAllocationRepository:
     @abc.abstractmethod
-    def get_allocation_adjustments(
+    async def get_allocation_adjustments(
+        self, request: Request, get_allocation_request: GetAllocationRequest
+    ) -> tuple:
+        pass
+
+    @abc.abstractmethod
+    async def get_allocation_snapshot(
         self, request: Request, get_allocation_request: GetAllocationRequest
     ) -> tuple:
         pass
 
     @abc.abstractmethod
-    def get_allocation_monthly_target(
+    def refresh_allocation_snapshot(
+        self,
+        request: Request,
+        month: int,
+        year: int,
+        model_ids: Iterable[str] | None = None,
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def find_stale_allocation_snapshot_periods(
+        self, request: Request
+    ) -> List[Tuple[int, int]]:
+        pass
+
+    @abc.abstractmethod
+    async def get_allocation_monthly_target(
         self, request: Request, get_allocation_request: GetAllocationRequest
     ) -> tuple:
         pass
@@ -97,6 +141,12 @@ class IAllocationRepository:
     ) -> List[AllocationApproval]:
         pass
 
+    @abc.abstractmethod
+    async def get_allocation_approvals_async(
+        self, request: Request, month: int, year: int
+    ) -> List[AllocationApproval]:
+        pass
+
     @abc.abstractmethod
     def get_allocation_approval_matrices(
         self, request: Request
@@ -109,10 +159,29 @@ class IAllocationRepository:
     ):
         pass
 
+    @abc.abstractmethod
+    def get_allocation_dispatches(
+        self, request: Request, month: int, year: int
+    ) -> List[AllocationDispatch]:
+        pass
+
+    @abc.abstractmethod
+    def create_allocation_dispatches(
+        self, request: Request, dispatches: List[AllocationDispatch]
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def update_allocation_dispatch(
+        self, request: Request, dispatch_id: str, values: dict
+    ) -> None:
+        pass
+
     @abc.abstractmethod
     def approve_allocation_data(
         self,
         request: Request,
         payload: dict,
+        idempotency_key: str | None = None,
     ) -> dict:
         pass
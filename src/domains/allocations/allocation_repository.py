@@ -1,19 +1,33 @@
 import json
-from typing import List, Type
+from typing import Iterable, List, Tuple, Type
 
-import requests
 from fastapi import Depends, HTTPException
-from sqlalchemy import func, Integer, and_, cast, select, case, Float, text
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from starlette.requests import Request
 
 from src.config.config import get_config
-from src.dependencies.database_dependency import get_va_db
+from src.dependencies.database_dependency import get_va_db, get_va_async_db
+from src.domains.allocations.allocation_engine import (
+    ALLOCATION_COLUMNS,
+    compute_allocation_adjustments,
+    get_allocation_fingerprint,
+    get_allocation_input_statements,
+    get_order_configuration_statement,
+    get_stock_pilot_statement,
+)
 from src.domains.allocations.allocation_interface import IAllocationRepository
 from src.domains.allocations.entities.allocation_approval_matrix import (
     AllocationApprovalMatrix,
 )
 from src.domains.allocations.entities.allocation_approvals import AllocationApproval
+from src.domains.allocations.entities.allocation_dispatches import AllocationDispatch
+from src.domains.allocations.entities.allocation_snapshot_periods import (
+    AllocationSnapshotPeriod,
+)
+from src.domains.allocations.entities.allocation_snapshots import AllocationSnapshot
 from src.domains.calculations.entities.va_slot_calculation_details import (
     SlotCalculationDetail,
 )
@@ -25,268 +39,220 @@ from src.domains.forecasts.entities.va_monthly_target_details import MonthlyTarg
 from src.domains.forecasts.entities.va_monthly_targets import MonthlyTarget
 from src.domains.masters.entities.va_dealers import Dealer
 from src.domains.masters.entities.va_models import Model
-from src.domains.masters.entities.va_order_configurations import OrderConfiguration
-from src.domains.masters.entities.va_stock_pilots import StockPilot
+from src.infrastructures.outbounds.session import outbound_session
 from src.models.requests.allocation_request import GetAllocationRequest
 
 
+ALLOCATION_SNAPSHOT_BATCH_SIZE = 1000
+# the dealer name is read from va_dealers so a renamed dealer needs no refresh
+ALLOCATION_SNAPSHOT_COLUMNS = [i for i in ALLOCATION_COLUMNS if i != "dealer_name"]
+
+
 class AllocationRepository(IAllocationRepository):
 
-    def __init__(self, va_db: Session = Depends(get_va_db)):
+    def __init__(
+        self,
+        va_db: Session = Depends(get_va_db),
+        va_async_db: AsyncSession = Depends(get_va_async_db),
+    ):
         self.va_db = va_db
+        self.va_async_db = va_async_db
 
     def get_va_db(self, request: Request) -> Session:
         return request.state.va_db if request.state.va_db is not None else self.va_db
 
-    def get_allocation_adjustments(
+    async def get_allocation_adjustments(
         self, request: Request, get_allocation_request: GetAllocationRequest
     ):
+        return compute_allocation_adjustments(
+            *[
+                (await self.va_async_db.execute(i)).all()
+                for i in get_allocation_input_statements(
+                    get_allocation_request.month, get_allocation_request.year
+                )
+            ]
+        )
 
-        forecast_detail_months_alias = aliased(ForecastDetailMonth)
-        forecast_detail_alias = aliased(ForecastDetail)
-        forecast_alias = aliased(Forecast)
-        total_ws_alias = aliased(
-            self.get_va_db(request)
-            .query(
-                func.sum(forecast_detail_months_alias.total_ws).label("total_ws_sum"),
-                forecast_detail_alias.model_id.label("model_id"),
-                forecast_detail_months_alias.forecast_month.label("forecast_month"),
-                forecast_alias.year.label("year"),
-                forecast_alias.month.label("month"),
-            )
-            .join(
-                forecast_detail_alias,
-                and_(
-                    forecast_detail_alias.deletable == 0,
-                    forecast_detail_alias.id
-                    == forecast_detail_months_alias.forecast_detail_id,
-                ),
-            )
-            .join(
-                forecast_alias,
-                and_(
-                    forecast_alias.deletable == 0,
-                    forecast_alias.id == forecast_detail_alias.forecast_id,
-                ),
-            )
-            .filter(
+    async def get_allocation_snapshot(
+        self, request: Request, get_allocation_request: GetAllocationRequest
+    ):
+        # None when the period was never snapshotted or its stock pilots or
+        # order configurations changed since, the caller computes it live
+        fingerprint = await self.va_async_db.scalar(
+            select(AllocationSnapshotPeriod.fingerprint).where(
                 and_(
-                    forecast_alias.month == get_allocation_request.month,
-                    forecast_alias.year == get_allocation_request.year,
-                    forecast_detail_months_alias.deletable == 0,
+                    AllocationSnapshotPeriod.month == get_allocation_request.month,
+                    AllocationSnapshotPeriod.year == get_allocation_request.year,
                 )
             )
-            .group_by(
-                forecast_detail_months_alias.forecast_month,
-                forecast_alias.year,
-                forecast_alias.month,
-                forecast_detail_alias.model_id,
-            )
-            .subquery()
         )
+        if fingerprint is None or fingerprint != get_allocation_fingerprint(
+            (
+                await self.va_async_db.execute(
+                    get_stock_pilot_statement(
+                        get_allocation_request.month, get_allocation_request.year
+                    )
+                )
+            ).all(),
+            (
+                await self.va_async_db.execute(
+                    get_order_configuration_statement(
+                        get_allocation_request.month, get_allocation_request.year
+                    )
+                )
+            ).all(),
+        ):
+            return None
 
-        query = (
-            self.get_va_db(request)
-            .query(
-                ForecastDetailMonth.id,
-                Dealer.id,
-                Dealer.name,
-                Forecast.year,
-                Forecast.month,
-                Model.id,
-                Model.segment_id,
-                Model.category_id,
-                ForecastDetailMonth.forecast_month,
-                func.coalesce(ForecastDetailMonth.adjustment, 0),
-                func.coalesce(ForecastDetailMonth.total_ws, 0),
-                case(
+        statement = (
+            select(
+                *[
                     (
-                        (
-                            total_ws_alias.c.total_ws_sum > 0,
-                            cast(
-                                cast(
-                                    func.coalesce(ForecastDetailMonth.total_ws, 0),
-                                    Float,
-                                )
-                                / cast(
-                                    func.coalesce(total_ws_alias.c.total_ws_sum, 0),
-                                    Float,
-                                )
-                                * 100,
-                                Integer,
-                            ),
-                        )
-                    ),
-                    else_=0,
-                ),
-                cast(
-                    case(
-                        (
-                            SlotCalculationDetail.slot_1 != None,
-                            SlotCalculationDetail.slot_1,
-                        ),
-                        (
-                            total_ws_alias.c.total_ws_sum > 0,
-                            cast(
-                                cast(
-                                    (
-                                        (
-                                            func.coalesce(
-                                                SlotCalculationDetail.take_off, 0
-                                            )
-                                            + func.coalesce(SlotCalculationDetail.bo, 0)
-                                        )
-                                        * (cast(StockPilot.percentage, Float) / 100)
-                                    )
-                                    - (
-                                        (
-                                            func.coalesce(SlotCalculationDetail.soa, 0)
-                                            + func.coalesce(SlotCalculationDetail.oc, 0)
-                                            + func.coalesce(SlotCalculationDetail.so, 0)
-                                            + func.coalesce(
-                                                SlotCalculationDetail.booking_prospect,
-                                                0,
-                                            )
-                                        )
-                                    ),
-                                    Float,
-                                )
-                                * cast(
-                                    func.coalesce(
-                                        OrderConfiguration.forecast_percentage,
-                                        0,
-                                    )
-                                    / 100,
-                                    Float,
-                                )
-                                * (
-                                    cast(
-                                        func.coalesce(total_ws_alias.c.total_ws_sum, 0),
-                                        Float,
-                                    )
-                                    * 100
-                                ),
-                                Integer,
-                            ),
-                        ),
-                        else_=0,
-                    ),
-                    Integer,
-                ),
-                func.coalesce(ForecastDetailMonth.confirmed_total_ws, 0),
-                func.coalesce(ForecastDetail.end_stock, 0),
-            )
-            .join(Dealer, and_(Dealer.id == Forecast.dealer_id))
-            .join(
-                ForecastDetail,
-                and_(
-                    ForecastDetail.forecast_id == Forecast.id,
-                    ForecastDetail.deletable == 0,
-                ),
-            )
-            .join(
-                ForecastDetailMonth,
-                and_(
-                    ForecastDetailMonth.forecast_detail_id == ForecastDetail.id,
-                    ForecastDetailMonth.deletable == 0,
-                ),
-            )
-            .join(Model, and_(Model.id == ForecastDetail.model_id))
-            .join(
-                StockPilot,
-                and_(
-                    StockPilot.segment_id == Model.segment_id,
-                    StockPilot.month == Forecast.month,
-                    StockPilot.year == Forecast.year,
-                ),
-            )
-            .join(
-                OrderConfiguration,
-                and_(
-                    OrderConfiguration.month == Forecast.month,
-                    OrderConfiguration.year == Forecast.year,
-                    OrderConfiguration.category_id == Model.category_id,
-                ),
+                        Dealer.name
+                        if i == "dealer_name"
+                        else getattr(AllocationSnapshot, i)
+                    )
+                    for i in ALLOCATION_COLUMNS
+                ]
             )
-            .join(
-                SlotCalculation,
+            .join(Dealer, Dealer.id == AllocationSnapshot.dealer_id)
+            .where(
                 and_(
-                    SlotCalculation.year == Forecast.year,
-                    SlotCalculation.month == Forecast.month,
-                    SlotCalculation.deletable == 0,
-                ),
-                isouter=True,
-            )
-            .join(
-                SlotCalculationDetail,
-                and_(
-                    SlotCalculation.id == SlotCalculationDetail.slot_calculation_id,
-                    SlotCalculationDetail.model_id == Model.id,
-                    SlotCalculationDetail.forecast_month
-                    == ForecastDetailMonth.forecast_month,
-                    SlotCalculationDetail.deletable == 0,
-                ),
-                isouter=True,
+                    AllocationSnapshot.month == get_allocation_request.month,
+                    AllocationSnapshot.year == get_allocation_request.year,
+                )
             )
-            .join(
-                total_ws_alias,
-                and_(
-                    total_ws_alias.c.model_id == Model.id,
-                    total_ws_alias.c.forecast_month
-                    == ForecastDetailMonth.forecast_month,
-                    total_ws_alias.c.model_id == Model.id,
-                ),
-                isouter=True,
+            .order_by(
+                AllocationSnapshot.model_id,
+                AllocationSnapshot.dealer_id,
+                AllocationSnapshot.forecast_month,
+                AllocationSnapshot.forecast_detail_month_id,
+                AllocationSnapshot.id,
             )
-            .filter(
-                and_(
-                    Forecast.month == get_allocation_request.month,
-                    Forecast.year == get_allocation_request.year,
+        )
+
+        return (await self.va_async_db.execute(statement)).all()
+
+    def refresh_allocation_snapshot(
+        self,
+        request: Request,
+        month: int,
+        year: int,
+        model_ids: Iterable[str] | None = None,
+    ) -> None:
+        session = self.get_va_db(request)
+        session.flush()
+
+        if model_ids is not None:
+            model_ids = list(set(model_ids))
+            if len(model_ids) == 0:
+                return
+
+        # refreshes of a period queue on a lock held until commit, the
+        # existence check and the delete below then see the rows inserted by
+        # the refresh before, which would otherwise survive next to ours
+        session.execute(
+            select(
+                func.pg_advisory_xact_lock(
+                    func.hashtext(AllocationSnapshot.__tablename__),
+                    year * 100 + month,
                 )
             )
-            .group_by(
-                Forecast.month,
-                Forecast.year,
-                Dealer.id,
-                Model.id,
-                Model.category_id,
-                ForecastDetailMonth.forecast_month,
-                ForecastDetailMonth.adjustment,
-                ForecastDetailMonth.total_ws,
-                total_ws_alias.c.total_ws_sum,
-                SlotCalculationDetail.take_off,
-                SlotCalculationDetail.soa,
-                SlotCalculationDetail.oc,
-                SlotCalculationDetail.bo,
-                SlotCalculationDetail.so,
-                OrderConfiguration.forecast_percentage,
-                StockPilot.percentage,
-                ForecastDetailMonth.confirmed_total_ws,
-                SlotCalculationDetail.booking_prospect,
-                ForecastDetail.end_stock,
-                ForecastDetailMonth.id,
-                SlotCalculationDetail.slot_1,
+        )
+
+        stock_pilots = session.execute(get_stock_pilot_statement(month, year)).all()
+        order_configurations = session.execute(
+            get_order_configuration_statement(month, year)
+        ).all()
+        fingerprint = get_allocation_fingerprint(stock_pilots, order_configurations)
+
+        if model_ids is not None:
+            # a period that was never snapshotted is built in full, a partial
+            # snapshot would hide the models that were not touched, and so is
+            # one built from other stock pilots or order configurations
+            if fingerprint != session.scalar(
+                select(AllocationSnapshotPeriod.fingerprint).where(
+                    and_(
+                        AllocationSnapshotPeriod.month == month,
+                        AllocationSnapshotPeriod.year == year,
+                    )
+                )
+            ):
+                model_ids = None
+
+        statement = delete(AllocationSnapshot).where(
+            and_(AllocationSnapshot.month == month, AllocationSnapshot.year == year)
+        )
+        if model_ids is not None:
+            statement = statement.where(AllocationSnapshot.model_id.in_(model_ids))
+        session.execute(statement)
+
+        # stock pilots and order configurations were read above
+        rows = compute_allocation_adjustments(
+            *[
+                session.execute(i).all()
+                for i in get_allocation_input_statements(month, year, model_ids)[:-2]
+            ],
+            stock_pilots,
+            order_configurations,
+        )
+        for start in range(0, len(rows), ALLOCATION_SNAPSHOT_BATCH_SIZE):
+            session.execute(
+                insert(AllocationSnapshot).values(
+                    [
+                        {
+                            k: v
+                            for k, v in zip(ALLOCATION_COLUMNS, i)
+                            if k in ALLOCATION_SNAPSHOT_COLUMNS
+                        }
+                        for i in rows[start : start + ALLOCATION_SNAPSHOT_BATCH_SIZE]
+                    ]
+                )
             )
-            .order_by(
-                Model.id,
-                Dealer.id,
+
+        statement = pg_insert(AllocationSnapshotPeriod).values(
+            month=month, year=year, fingerprint=fingerprint
+        )
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["year", "month"],
+                set_={
+                    "fingerprint": statement.excluded.fingerprint,
+                    "refreshed_at": func.now(),
+                },
             )
         )
 
-        # print query with parameters
-        print(query.statement.compile(compile_kwargs={"literal_binds": True}))
+    def find_stale_allocation_snapshot_periods(
+        self, request: Request
+    ) -> List[Tuple[int, int]]:
+        # snapshots taken before periods were fingerprinted count as stale
+        session = self.get_va_db(request)
+        periods = {
+            (i.year, i.month): i.fingerprint
+            for i in session.execute(select(AllocationSnapshotPeriod)).scalars()
+        }
+        for year, month in session.execute(
+            select(AllocationSnapshot.year, AllocationSnapshot.month).distinct()
+        ).all():
+            periods.setdefault((year, month), None)
 
-        res = query.all()
+        stale = []
+        for (year, month), fingerprint in sorted(periods.items()):
+            if fingerprint != get_allocation_fingerprint(
+                session.execute(get_stock_pilot_statement(month, year)).all(),
+                session.execute(get_order_configuration_statement(month, year)).all(),
+            ):
+                stale.append((month, year))
 
-        return res
+        return stale
 
-    def get_allocation_monthly_target(
+    async def get_allocation_monthly_target(
         self, request: Request, get_allocation_request: GetAllocationRequest
     ):
-        query = (
+        statement = (
             (
-                self.get_va_db(request)
-                .query(
+                select(
                     MonthlyTargetDetail.category_id,
                     MonthlyTargetDetail.target,
                     MonthlyTargetDetail.dealer_id,
@@ -297,6 +263,7 @@ class AllocationRepository(IAllocationRepository):
                     ),
                     func.coalesce(func.sum(ForecastDetailMonth.total_ws), 0),
                 )
+                .select_from(MonthlyTargetDetail)
                 .join(
                     MonthlyTarget,
                     and_(
@@ -356,7 +323,7 @@ class AllocationRepository(IAllocationRepository):
                     ),
                 )
             )
-            .filter(
+            .where(
                 and_(
                     MonthlyTarget.month == get_allocation_request.month,
                     MonthlyTarget.year == get_allocation_request.year,
@@ -371,7 +338,7 @@ class AllocationRepository(IAllocationRepository):
             )
         )
 
-        rows = query.all()
+        rows = (await self.va_async_db.execute(statement)).all()
 
         return rows
 
@@ -430,6 +397,24 @@ class AllocationRepository(IAllocationRepository):
             .all()
         )
 
+    async def get_allocation_approvals_async(
+        self, request: Request, month: int, year: int
+    ) -> list[AllocationApproval]:
+        statement = (
+            select(AllocationApproval)
+            .where(
+                and_(
+                    AllocationApproval.month == month,
+                    AllocationApproval.year == year,
+                    AllocationApproval.deletable == 0,
+                )
+            )
+            .options(selectinload(AllocationApproval.approver))
+            .order_by(AllocationApproval.id.asc())
+        )
+
+        return list((await self.va_async_db.execute(statement)).scalars().all())
+
     def get_allocation_approval_matrices(
         self, request: Request
     ) -> List[Type[AllocationApprovalMatrix]]:
@@ -447,21 +432,55 @@ class AllocationRepository(IAllocationRepository):
             self.get_va_db(request).add(i)
             self.get_va_db(request).flush()
 
+    def get_allocation_dispatches(
+        self, request: Request, month: int, year: int
+    ) -> List[AllocationDispatch]:
+        return (
+            self.get_va_db(request)
+            .query(AllocationDispatch)
+            .filter(
+                and_(
+                    AllocationDispatch.month == month,
+                    AllocationDispatch.year == year,
+                )
+            )
+            .order_by(AllocationDispatch.dealer_id.asc())
+            .all()
+        )
+
+    def create_allocation_dispatches(
+        self, request: Request, dispatches: List[AllocationDispatch]
+    ) -> None:
+        self.get_va_db(request).add_all(dispatches)
+        self.get_va_db(request).flush()
+
+    def update_allocation_dispatch(
+        self, request: Request, dispatch_id: str, values: dict
+    ) -> None:
+        self.get_va_db(request).execute(
+            update(AllocationDispatch)
+            .where(AllocationDispatch.id == dispatch_id)
+            .values(**values, updated_at=func.now())
+        )
+
     def approve_allocation_data(
         self,
         request: Request,
         payload: dict,
+        idempotency_key: str | None = None,
     ) -> dict:
-        config = get_config()
-        url = config.outbound["hoyu"].base_url + "/ords/hmsi/dealer_forcast/allocation"
+        outbound = get_config().outbound["hoyu"]
+        url = outbound.base_url + "/ords/hmsi/dealer_forcast/allocation"
 
-        response = requests.post(
+        response = outbound_session("hoyu").post(
             url,
             json=payload,
-            auth=(
-                config.outbound["hoyu"].username,
-                config.outbound["hoyu"].password,
+            headers=(
+                {"Idempotency-Key": idempotency_key}
+                if idempotency_key is not None
+                else None
             ),
+            timeout=outbound.timeout,
         )
 
         if response.status_code != 200:
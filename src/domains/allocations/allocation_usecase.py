@@ -1,41 +1,46 @@
+import hashlib
 import http
 import json
-import os
-import re
-import uuid
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import BinaryIO, List, Dict
 
 import openpyxl
-import pandas
+import requests
 from fastapi import Depends, HTTPException, UploadFile
-from openpyxl.styles import Border, Side, Alignment
-from openpyxl.workbook import Workbook
 from starlette.requests import Request
 from src.domains.allocations.allocation_interface import (
     IAllocationRepository,
     IAllocationUseCase,
 )
 from src.domains.allocations.allocation_repository import AllocationRepository
+from src.config.config import get_config
 from src.domains.allocations.entities.allocation_approvals import AllocationApproval
+from src.domains.allocations.entities.allocation_dispatches import AllocationDispatch
 from src.domains.allocations.enums import (
     AllocationSubmissionStatusEnum,
     AllocationApprovalFlagEnum,
+    AllocationDispatchStatusEnum,
 )
+from src.domains.forecasts.entities.va_forecasts import Forecast
 from src.domains.forecasts.entities.va_monthly_target_details import MonthlyTargetDetail
 from src.domains.forecasts.entities.va_monthly_targets import MonthlyTarget
 from src.domains.forecasts.forecast_interface import IForecastRepository
 from src.domains.forecasts.forecast_repository import ForecastRepository
-from src.domains.masters.entities.va_categories import Category
-from src.domains.masters.entities.va_dealers import Dealer
 from src.domains.masters.master_interface import IMasterRepository
 from src.domains.masters.master_repository import MasterRepository
+from src.domains.uploads.enums import UploadKindEnum
+from src.domains.uploads.upload_interface import IUploadRepository
+from src.domains.uploads.upload_repository import UploadRepository
 from src.domains.users.enums import RoleDict
+from src.models.dtos.excel_dto import ExcelTemplateDto
+from src.models.dtos.master_dto import CategoryDto, DealerDto
 from src.models.requests.allocation_request import (
     GetAllocationRequest,
     SubmitAllocationRequest,
-    SubmitAllocationAdjustmentRequest,
 )
 from src.models.requests.forecast_request import ApprovalAllocationRequest
 from src.models.responses.allocation_response import (
@@ -47,20 +52,31 @@ from src.models.responses.allocation_response import (
     AllocationTargetMonthMonthResponse,
     AllocationTargetMonthResponse,
     AllocationApprovalResponse,
+    AllocationDispatchResponse,
+    GetAllocationDispatchResponse,
 )
 from src.models.responses.basic_response import TextValueResponse
 from src.shared.enums import Database
+from src.shared.utils.checksum import get_rows_checksum
 from src.shared.utils.database_utils import commit, begin_transaction
 from src.shared.utils.date import is_date_string_format, get_month_difference
-from src.shared.utils.excel import get_header_column_index
+from src.shared.utils.excel import (
+    FORECAST_MONTH_PATTERN,
+    ExcelRowReader,
+    get_excel_template,
+    get_header_column_index,
+    get_template_months,
+)
 from src.shared.utils.file_utils import (
     clear_directory,
     save_upload_file,
     get_file_extension,
 )
-from src.shared.utils.storage_utils import get_full_path, is_file_exist
+from src.shared.utils.storage_utils import get_upload_source
 from src.shared.utils.xid import generate_xid
 
+logger = logging.getLogger(__name__)
+
 
 class AllocationUseCase(IAllocationUseCase):
     def __init__(
@@ -68,22 +84,28 @@ class AllocationUseCase(IAllocationUseCase):
         allocation_repo: IAllocationRepository = Depends(AllocationRepository),
         master_repo: IMasterRepository = Depends(MasterRepository),
         forecast_repo: IForecastRepository = Depends(ForecastRepository),
+        upload_repo: IUploadRepository = Depends(UploadRepository),
     ):
         self.master_repo = master_repo
         self.allocation_repo = allocation_repo
         self.forecast_repo = forecast_repo
+        self.upload_repo = upload_repo
 
-    def get_allocations(
+    async def get_allocations(
         self, request: Request, get_allocation_request: GetAllocationRequest
     ) -> GetAllocationResponse:
-        adjustment_data = self.allocation_repo.get_allocation_adjustments(
+        adjustment_data = await self.allocation_repo.get_allocation_snapshot(
             request, get_allocation_request
         )
-        monthly_target_data = self.allocation_repo.get_allocation_monthly_target(
+        if adjustment_data is None:
+            adjustment_data = await self.allocation_repo.get_allocation_adjustments(
+                request, get_allocation_request
+            )
+        monthly_target_data = await self.allocation_repo.get_allocation_monthly_target(
             request, get_allocation_request
         )
 
-        approval_data = self.allocation_repo.get_allocation_approvals(
+        approval_data = await self.allocation_repo.get_allocation_approvals_async(
             request, get_allocation_request.month, get_allocation_request.year
         )
 
@@ -150,8 +172,6 @@ class AllocationUseCase(IAllocationUseCase):
             if category_id not in total_alloc_map[dealer_id]:
                 total_alloc_map[dealer_id][category_id] = 0
 
-            allocation = min(allocation, ws)
-
             total_alloc_map[dealer_id][category_id] += allocation
             dealer_adjustment_map[dealer_id][model_id]["remaining_stock"] = end_stock
             dealer_adjustment_map[dealer_id][model_id][forecast_month] = (
@@ -263,90 +283,90 @@ class AllocationUseCase(IAllocationUseCase):
             approvals=approvals, adjustments=adjustments, targets=targets
         )
 
-    def upsert_monthly_target(self, request, file: str, month: int, year: int):
-        if not is_file_exist(file):
+    def _find_monthly_target_masters(
+        self, request: Request, rows: List[tuple]
+    ) -> tuple[Dict[str, DealerDto], Dict[str, CategoryDto]]:
+        dealer_ids = list(dict.fromkeys(i[0] for i in rows))
+        dealer_dict: Dict[str, DealerDto] = self.master_repo.find_dealers_by_ids(
+            request, dealer_ids
+        )
+        not_found = [str(i) for i in dealer_ids if i not in dealer_dict]
+        if len(not_found) > 0:
+            raise HTTPException(
+                status_code=http.HTTPStatus.BAD_REQUEST,
+                detail=f"Dealer {', '.join(not_found)} is not found",
+            )
+
+        category_ids = list(dict.fromkeys(i[1] for i in rows))
+        category_dict: Dict[str, CategoryDto] = self.master_repo.find_categories_by_ids(
+            request, category_ids
+        )
+        not_found = [str(i) for i in category_ids if i not in category_dict]
+        if len(not_found) > 0:
             raise HTTPException(
-                status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
-                detail="Excel file is not found",
+                status_code=http.HTTPStatus.BAD_REQUEST,
+                detail=f"Category {', '.join(not_found)} is not found",
             )
 
-        df = pandas.read_excel(os.getcwd() + "/storage" + file)
+        return dealer_dict, category_dict
+
+    def upsert_monthly_target(
+        self,
+        request,
+        file: str | BinaryIO,
+        month: int,
+        year: int,
+        content_hash: str | None = None,
+    ):
         columns = [
             "Dealer Name",
             "Category",
         ]
 
-        not_found_index = [i for i in columns if i not in df.columns.tolist()]
-        forecast_months = [
-            i for i in df.columns.tolist() if re.match(r"^\d{4}-(0[1-9]|1[0-2])$", i)
-        ]
-
-        if len(not_found_index) > 0:
-            raise HTTPException(
-                http.HTTPStatus.BAD_REQUEST,
-                detail=f"{not_found_index[0]} field is required.",
-            )
-
-        begin_transaction(request, Database.VEHICLE_ALLOCATION)
-
-        dealer_dict: Dict[str, Dealer] = {}
-        category_dict: Dict[str, Category] = {}
-        monthly_target_details: List[MonthlyTargetDetail] = []
         monthly_target_map = {}
 
-        for idx, row in df.iterrows():
-            dealer_id = row["Dealer Name"]
-            category_id = row["Category"]
-
-            if dealer_id not in dealer_dict:
-                dealer = self.master_repo.find_dealer(request, dealer_id=dealer_id)
-                if dealer is None:
-                    raise HTTPException(
-                        status_code=http.HTTPStatus.BAD_REQUEST,
-                        detail=f"Dealer {dealer_id} is not found",
-                    )
-                dealer_dict[dealer_id] = dealer
-
-            if category_id not in category_dict:
-                category = self.master_repo.find_category(request, category_id)
-                if category is None:
-                    raise HTTPException(
-                        status_code=http.HTTPStatus.BAD_REQUEST,
-                        detail=f"Category {category_id} is not found",
-                    )
-                category_dict[category_id] = category
-
-            dealer = dealer_dict[dealer_id]
-            category = category_dict[category_id]
-
-            for j in forecast_months:
-                forecast_month = get_month_difference(f"{year}-{month}", j)
-
-                if forecast_month < 0:
-                    raise HTTPException(
-                        status_code=http.HTTPStatus.BAD_REQUEST,
-                        detail=f"Forecast month cannot be less than the current month",
-                    )
-
-                monthly_target = MonthlyTargetDetail(
-                    forecast_month=forecast_month,
-                    dealer_id=dealer.id,
-                    target=row[j] if not pandas.isna(row[j]) else 0,
-                    category_id=category.id,
+        with ExcelRowReader(get_upload_source(file)) as reader:
+            reader.validate_header(columns)
+            forecast_months = reader.get_columns(FORECAST_MONTH_PATTERN)
+            offsets = {
+                i: get_month_difference(f"{year}-{month}", i) for i in forecast_months
+            }
+            if any(i < 0 for i in offsets.values()):
+                raise HTTPException(
+                    status_code=http.HTTPStatus.BAD_REQUEST,
+                    detail=f"Forecast month cannot be less than the current month",
                 )
 
-                monthly_target_details.append(monthly_target)
-                monthly_target_map[(dealer_id, category_id, forecast_month)] = (
-                    monthly_target
+            row_count = 0
+            for rows in reader.iter_chunks(columns + forecast_months, forecast_months):
+                row_count += len(rows)
+                dealer_dict, category_dict = self._find_monthly_target_masters(
+                    request, rows
                 )
 
+                for row in rows:
+                    dealer = dealer_dict[row[0]]
+                    category = category_dict[row[1]]
+
+                    for j, target in zip(forecast_months, row[2:]):
+                        monthly_target_map[(row[0], row[1], offsets[j])] = (
+                            MonthlyTargetDetail(
+                                forecast_month=offsets[j],
+                                dealer_id=dealer.id,
+                                target=target if target is not None else 0,
+                                category_id=category.id,
+                            )
+                        )
+
+        begin_transaction(request, Database.VEHICLE_ALLOCATION)
+
         monthly_target = self.allocation_repo.find_monthly_target(
             request, month=month, year=year
         )
 
         if monthly_target is None:
             monthly_target = MonthlyTarget(
-                month=month, year=year, details=monthly_target_details
+                month=month, year=year, details=list(monthly_target_map.values())
             )
             self.allocation_repo.create_monthly_target(request, monthly_target)
         else:
@@ -365,6 +385,20 @@ class AllocationUseCase(IAllocationUseCase):
                     detail = detail_maps[(dealer_id, category_id, forecast_month)]
                     detail.target = v.target
 
+        if content_hash is not None:
+            self.upload_repo.upsert_upload_ledger(
+                request,
+                UploadKindEnum.MONTHLY_TARGET,
+                month,
+                year,
+                content_hash,
+                row_count,
+                len(monthly_target_map),
+                get_rows_checksum(
+                    k + (v.target,) for k, v in monthly_target_map.items()
+                ),
+            )
+
         commit(request, Database.VEHICLE_ALLOCATION)
 
     def submit_allocation(
@@ -372,30 +406,49 @@ class AllocationUseCase(IAllocationUseCase):
     ) -> None:
         begin_transaction(request, Database.VEHICLE_ALLOCATION)
 
-        forecasts = self.forecast_repo.get_forecast(
-            request,
-            month=submit_allocation_request.month,
-            year=submit_allocation_request.year,
+        forecast_count = self.forecast_repo.count_forecast(
+            request, submit_allocation_request.month, submit_allocation_request.year
         )
 
-        if len(forecasts) == 0:
+        if forecast_count == 0:
             raise HTTPException(
                 http.HTTPStatus.BAD_REQUEST, detail="Forecast is not found"
             )
 
-        adjustment_map: Dict[str, SubmitAllocationAdjustmentRequest] = {}
+        # the last adjustment of a month wins, as it did when they were applied
+        # one by one
+        adjustments = list(
+            {
+                i.forecast_detail_month_id: i
+                for i in submit_allocation_request.adjustments
+            }.values()
+        )
+        updated = self.forecast_repo.update_forecast_detail_month_adjustments(
+            request,
+            submit_allocation_request.month,
+            submit_allocation_request.year,
+            adjustments,
+        )
 
-        for i in submit_allocation_request.adjustments:
-            adjustment_map[i.forecast_detail_month_id] = i
+        not_found = [
+            i.forecast_detail_month_id
+            for i in adjustments
+            if i.forecast_detail_month_id not in updated
+        ]
+        if len(not_found) > 0:
+            raise HTTPException(
+                status_code=http.HTTPStatus.BAD_REQUEST,
+                detail=f"Forecast detail month {', '.join(not_found)} not found",
+            )
 
-        for i in forecasts:
-            for j in i.details:
-                if j.deletable == 0:
-                    for k in j.months:
-                        if k.deletable == 0:
-                            if k.id in adjustment_map:
-                                k.adjustment = adjustment_map[k.id].adjustment
-                                k.hmsi_allocation = adjustment_map[k.id].hmsi_allocation
+        adjusted_model_ids = set(updated.values())
+
+        self.allocation_repo.refresh_allocation_snapshot(
+            request,
+            submit_allocation_request.month,
+            submit_allocation_request.year,
+            adjusted_model_ids,
+        )
 
         if submit_allocation_request.status == AllocationSubmissionStatusEnum.SUBMIT:
             approvals = self.allocation_repo.get_allocation_approvals(
@@ -468,68 +521,202 @@ class AllocationUseCase(IAllocationUseCase):
             "message": "Success approving allocation",
         }
 
-    def send_allocation_to_hoyu(
+    def get_allocation_payload(self, forecast: Forecast) -> dict:
+        payload = {"data": []}
+
+        for i in forecast.details:
+            if i.deletable == 0:
+                temp = {
+                    "RECORD_ID": i.id,
+                    "DEALER_FORECAST_ID": forecast.id,
+                    "MODEL_VARIANT": i.model_id,
+                }
+                for j in i.months:
+                    if j.deletable == 0:
+                        temp[f"N{j.forecast_month}_HMSI_ALLOCATION"] = j.hmsi_allocation
+                payload["data"].append(temp)
+
+        return payload
+
+    def prepare_allocation_dispatch(
         self, request: Request, approval_request: ApprovalAllocationRequest
-    ):
+    ) -> None:
+        begin_transaction(request, Database.VEHICLE_ALLOCATION)
+
         forecasts = self.forecast_repo.get_forecast(
             request, month=approval_request.month, year=approval_request.year
         )
-        for forecast in forecasts:
-            payload = {"data": []}
+        if len(forecasts) == 0:
+            raise HTTPException(
+                status_code=http.HTTPStatus.NOT_FOUND, detail="Forecast is not found"
+            )
 
-            for i in forecast.details:
-                if i.deletable == 0:
-                    temp = {
-                        "RECORD_ID": i.id,
-                        "DEALER_FORECAST_ID": forecast.id,
-                        "MODEL_VARIANT": i.model_id,
-                    }
-                    for j in i.months:
-                        if j.deletable == 0:
-                            temp[f"N{j.forecast_month}_HMSI_ALLOCATION"] = (
-                                j.hmsi_allocation
-                            )
-                    payload["data"].append(temp)
-            print("Sending Allocation: " + forecast.dealer_id)
-            self.allocation_repo.approve_allocation_data(request, payload)
+        dispatches = {
+            i.forecast_id: i
+            for i in self.allocation_repo.get_allocation_dispatches(
+                request, approval_request.month, approval_request.year
+            )
+        }
 
-    def download_monthly_target_excel_template(
-        self, request: Request, month: int, year: int
-    ) -> str:
-        workbook = Workbook()
+        # a dealer that was already sent the same payload is skipped, a changed
+        # payload gets a new idempotency key and is sent again
+        new_dispatches = []
+        for forecast in forecasts:
+            payload = self.get_allocation_payload(forecast)
+            idempotency_key = hashlib.sha256(
+                json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+
+            dispatch = dispatches.get(forecast.id)
+            if dispatch is None:
+                new_dispatches.append(
+                    AllocationDispatch(
+                        month=approval_request.month,
+                        year=approval_request.year,
+                        forecast_id=forecast.id,
+                        dealer_id=forecast.dealer_id,
+                        payload=payload,
+                        idempotency_key=idempotency_key,
+                        status=AllocationDispatchStatusEnum.PENDING,
+                        attempts=0,
+                    )
+                )
+            elif dispatch.idempotency_key != idempotency_key:
+                dispatch.payload = payload
+                dispatch.idempotency_key = idempotency_key
+                dispatch.status = AllocationDispatchStatusEnum.PENDING
+                dispatch.last_error = None
+                dispatch.sent_at = None
+            elif dispatch.status != AllocationDispatchStatusEnum.SENT:
+                dispatch.status = AllocationDispatchStatusEnum.PENDING
 
-        sheet = workbook.active
-        sheet.title = "Template-Monthly target"
+        self.allocation_repo.create_allocation_dispatches(request, new_dispatches)
 
-        headers = ["Dealer name", "Category"]
+        commit(request, Database.VEHICLE_ALLOCATION)
 
-        for i in range(12):
-            if i > 0:
-                month += 1
-                if month > 12:
-                    month = 1
-                    year += 1
-            headers.append(f"{year}-{month:02}")
-
-        for col_index, header in enumerate(headers, start=1):
-            cell = sheet.cell(row=1, column=col_index, value=header)
-            thin_border = Border(
-                left=Side(style="thin"),
-                right=Side(style="thin"),
-                top=Side(style="thin"),
-                bottom=Side(style="thin"),
+    def send_allocation_to_hoyu(
+        self, request: Request, approval_request: ApprovalAllocationRequest
+    ):
+        begin_transaction(request, Database.VEHICLE_ALLOCATION)
+
+        dispatches = [
+            i
+            for i in self.allocation_repo.get_allocation_dispatches(
+                request, approval_request.month, approval_request.year
             )
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="center")
-            sheet.column_dimensions[cell.column_letter].width = len(header) + 2
+            if i.status != AllocationDispatchStatusEnum.SENT
+        ]
+        pending = [
+            (i.id, i.dealer_id, i.payload, i.idempotency_key) for i in dispatches
+        ]
+        for i in dispatches:
+            i.status = AllocationDispatchStatusEnum.SENDING
+
+        commit(request, Database.VEHICLE_ALLOCATION)
+
+        # workers only talk to HOYU, the statuses are written from this thread
+        with ThreadPoolExecutor(
+            max_workers=get_config().outbound["hoyu"].pool_size
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self.push_allocation_data, request, payload, idempotency_key
+                ): (dispatch_id, dealer_id)
+                for dispatch_id, dealer_id, payload, idempotency_key in pending
+            }
+            for future in as_completed(futures):
+                dispatch_id, dealer_id = futures[future]
+                attempts, error = future.result()
+                if error is None:
+                    logger.info("allocation sent to HOYU for dealer %s", dealer_id)
+                else:
+                    logger.error(
+                        "allocation for dealer %s was not sent to HOYU: %s",
+                        dealer_id,
+                        error,
+                    )
+
+                begin_transaction(request, Database.VEHICLE_ALLOCATION)
+                self.allocation_repo.update_allocation_dispatch(
+                    request,
+                    dispatch_id,
+                    {
+                        "status": (
+                            AllocationDispatchStatusEnum.SENT
+                            if error is None
+                            else AllocationDispatchStatusEnum.FAILED
+                        ),
+                        "attempts": AllocationDispatch.attempts + attempts,
+                        "last_error": error,
+                        "sent_at": datetime.now() if error is None else None,
+                    },
+                )
+                commit(request, Database.VEHICLE_ALLOCATION)
+
+    def push_allocation_data(
+        self, request: Request, payload: dict, idempotency_key: str
+    ) -> tuple[int, str | None]:
+        # connection errors, timeouts, 429 and 5xx are retried with exponential
+        # backoff, any other response is final
+        outbound = get_config().outbound["hoyu"]
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                self.allocation_repo.approve_allocation_data(
+                    request, payload, idempotency_key
+                )
+                return attempts, None
+            except HTTPException as ex:
+                error = f"{ex.status_code} {ex.detail}"[:1000]
+                retryable = (
+                    ex.status_code == http.HTTPStatus.TOO_MANY_REQUESTS
+                    or ex.status_code >= 500
+                )
+            except requests.RequestException as ex:
+                error = repr(ex)[:1000]
+                retryable = True
+
+            if not retryable or attempts > outbound.max_retries:
+                return attempts, error
+
+            time.sleep(outbound.retry_backoff * 2 ** (attempts - 1))
 
-        relative_path = (
-            "/temp/template/allocations/monthly-target-" + str(uuid.uuid4()) + ".xlsx"
+    def get_allocation_dispatch(
+        self, request: Request, approval_request: ApprovalAllocationRequest
+    ) -> GetAllocationDispatchResponse:
+        dispatches = self.allocation_repo.get_allocation_dispatches(
+            request, approval_request.month, approval_request.year
         )
-        dest = get_full_path(relative_path)
-        upload_dir = os.path.join(os.getcwd(), "storage/temp/template/allocations")
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
+        statuses = [i.status for i in dispatches]
+
+        return GetAllocationDispatchResponse(
+            month=approval_request.month,
+            year=approval_request.year,
+            total=len(dispatches),
+            pending=statuses.count(AllocationDispatchStatusEnum.PENDING),
+            sending=statuses.count(AllocationDispatchStatusEnum.SENDING),
+            sent=statuses.count(AllocationDispatchStatusEnum.SENT),
+            failed=statuses.count(AllocationDispatchStatusEnum.FAILED),
+            dispatches=[
+                AllocationDispatchResponse(
+                    forecast_id=i.forecast_id,
+                    dealer_id=i.dealer_id,
+                    status=i.status,
+                    attempts=i.attempts,
+                    last_error=i.last_error,
+                    sent_at=i.sent_at,
+                )
+                for i in dispatches
+            ],
+        )
+
+    def download_monthly_target_excel_template(
+        self, request: Request, month: int, year: int
+    ) -> ExcelTemplateDto:
+        headers = ["Dealer name", "Category"]
 
-        workbook.save(dest)
-        return dest
+        return get_excel_template(
+            "Template-Monthly target",
+            tuple(headers + get_template_months(month, year, 12)),
+        )
@@ -12,6 +12,7 @@ from sqlalchemy import (
     Text,
     text,
     and_,
+    Index,
 )
 from sqlalchemy.orm import mapped_column, relationship, Mapped
 
@@ -23,6 +24,14 @@ from src.shared.utils.xid import generate_xid
 
 class AllocationApproval(BaseModel):
     __tablename__ = "va_allocation_approvals"
+    __table_args__ = (
+        Index(
+            "ix_va_allocation_approvals_period",
+            "year",
+            "month",
+            postgresql_where=text("deletable = 0"),
+        ),
+    )
     id = mapped_column(String(255), primary_key=True)
     month = mapped_column(Integer, nullable=False)
     year = mapped_column(Integer, nullable=False)
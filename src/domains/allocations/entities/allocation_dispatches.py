@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON,
+    DateTime,
+    Enum,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.orm import MappedColumn, mapped_column
+
+from src.domains.allocations.enums import AllocationDispatchStatusEnum
+from src.shared.entities.basemodel import BaseModel
+from src.shared.utils.xid import generate_xid
+
+
+class AllocationDispatch(BaseModel):
+    __tablename__ = "va_allocation_dispatches"
+    __table_args__ = (
+        UniqueConstraint(
+            "year",
+            "month",
+            "forecast_id",
+            name="uq_va_allocation_dispatches_period_forecast",
+        ),
+    )
+
+    id: MappedColumn[str] = mapped_column(String(255), primary_key=True)
+    month: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    year: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    forecast_id: MappedColumn[str] = mapped_column(String(255), nullable=False)
+    dealer_id: MappedColumn[str] = mapped_column(String(255), nullable=False)
+    payload: MappedColumn[dict] = mapped_column(JSON, nullable=False)
+    idempotency_key: MappedColumn[str] = mapped_column(String(64), nullable=False)
+    status: MappedColumn[AllocationDispatchStatusEnum] = mapped_column(
+        Enum(AllocationDispatchStatusEnum), nullable=False
+    )
+    attempts: MappedColumn[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0")
+    )
+    last_error: MappedColumn[str] = mapped_column(Text, nullable=True)
+    sent_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+@event.listens_for(AllocationDispatch, "before_insert")
+def before_insert(mapper, connection, target: AllocationDispatch):
+    target.id = generate_xid()
+
+
+@event.listens_for(AllocationDispatch, "before_update")
+def before_update(mapper, connection, target: AllocationDispatch):
+    target.updated_at = datetime.now()
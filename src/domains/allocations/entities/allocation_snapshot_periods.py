@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy.orm import MappedColumn, mapped_column
+
+from src.shared.entities.basemodel import BaseModel
+
+
+class AllocationSnapshotPeriod(BaseModel):
+    __tablename__ = "va_allocation_snapshot_periods"
+
+    year: MappedColumn[int] = mapped_column(Integer, primary_key=True)
+    month: MappedColumn[int] = mapped_column(Integer, primary_key=True)
+    fingerprint: MappedColumn[str] = mapped_column(String(64), nullable=False)
+    refreshed_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
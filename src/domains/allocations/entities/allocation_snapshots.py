@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, Integer, String, func
+from sqlalchemy.orm import MappedColumn, mapped_column
+
+from src.shared.entities.basemodel import BaseModel
+
+
+class AllocationSnapshot(BaseModel):
+    __tablename__ = "va_allocation_snapshots"
+    __table_args__ = (
+        Index("ix_va_allocation_snapshots_period_model", "year", "month", "model_id"),
+    )
+
+    id: MappedColumn[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    month: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    year: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    forecast_detail_month_id: MappedColumn[str] = mapped_column(
+        String(255), nullable=False
+    )
+    dealer_id: MappedColumn[str] = mapped_column(String(255), nullable=False)
+    model_id: MappedColumn[str] = mapped_column(String(255), nullable=False)
+    segment_id: MappedColumn[str] = mapped_column(String(255), nullable=True)
+    category_id: MappedColumn[str] = mapped_column(String(255), nullable=True)
+    forecast_month: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    adjustment: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    ws: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    ws_percentage: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    allocation: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    confirmed_total_ws: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    end_stock: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    created_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -38,3 +38,10 @@ class ApprovalStatusEnum(Enum):
 class AllocationSubmissionStatusEnum(Enum):
     SUBMIT = "SUBMIT"
     DRAFT = "DRAFT"
+
+
+class AllocationDispatchStatusEnum(Enum):
+    PENDING = "PENDING"
+    SENDING = "SENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
@@ -3,13 +3,19 @@ import math
 
 from fastapi import APIRouter, Depends, Form, UploadFile, HTTPException
 from starlette.requests import Request
-from starlette.responses import FileResponse
+from starlette.responses import Response
 
 from src.dependencies.auth_dependency import bearer_auth
 from src.domains.calculations.calculation_interface import ICalculationUseCase
 from src.domains.calculations.calculation_usecase import CalculationUseCase
 from src.domains.forecasts.forecast_interface import IForecastUseCase
 from src.domains.forecasts.forecast_usecase import ForecastUseCase
+from src.domains.jobs.enums import JobTypeEnum
+from src.domains.jobs.job_interface import IJobUseCase
+from src.domains.jobs.job_usecase import JobUseCase
+from src.domains.uploads.enums import UploadKindEnum
+from src.domains.uploads.upload_interface import IUploadUseCase
+from src.domains.uploads.upload_usecase import UploadUseCase
 from src.models.requests.calculation_request import (
     GetCalculationRequest,
     UpdateCalculationRequest,
@@ -27,7 +33,10 @@ from src.models.responses.basic_response import (
 )
 from src.models.responses.calculation_response import GetCalculationResponse
 from src.models.responses.forecast_response import GetForecastSummaryResponse
-from src.shared.utils.storage_utils import save_file
+from src.models.responses.job_response import JobResponse
+from src.shared.utils.checksum import get_file_checksum
+from src.shared.utils.excel import get_excel_template_response
+from src.shared.utils.storage_utils import save_upload
 
 router = APIRouter(prefix="/api/calculations", tags=["Calculations"])
 
@@ -42,12 +51,12 @@ def download_booking_template(
     month: int,
     year: int,
     calculation_uc: ICalculationUseCase = Depends(CalculationUseCase),
-) -> FileResponse:
-    path = calculation_uc.download_booking_excel_template(request, month, year)
-    return FileResponse(
-        path,
-        media_type="application/octet-stream",
-        filename="{}-{}-calculation-booking-template.xlsx".format(month, year),
+) -> Response:
+    template = calculation_uc.download_booking_excel_template(request, month, year)
+    return get_excel_template_response(
+        request,
+        template,
+        "{}-{}-calculation-booking-template.xlsx".format(month, year),
     )
 
 
@@ -61,28 +70,31 @@ def download_takeoff_template(
     month: int,
     year: int,
     calculation_uc: ICalculationUseCase = Depends(CalculationUseCase),
-) -> FileResponse:
-    path = calculation_uc.download_takeoff_excel_template(request, month, year)
-    return FileResponse(
-        path,
-        media_type="application/octet-stream",
-        filename="{}-{}-calculation-take-off-template.xlsx".format(month, year),
+) -> Response:
+    template = calculation_uc.download_takeoff_excel_template(request, month, year)
+    return get_excel_template_response(
+        request,
+        template,
+        "{}-{}-calculation-take-off-template.xlsx".format(month, year),
     )
 
 
 @router.post(
     "/take-off",
-    response_model=NoDataResponse,
+    response_model=BasicResponse[JobResponse | None],
+    status_code=http.HTTPStatus.ACCEPTED,
     summary="Upsert slot calculation take off data",
-    description="Upsert slot calculation take off data",
+    description="Queue the upsert of slot calculation take off data, the progress is available at /api/jobs/{id}",
 )
 def upsert_take_off_data(
     request: Request,
+    response: Response,
     file: UploadFile,
     month: int = Form(...),
     year: int = Form(...),
-    calculation_uc: ICalculationUseCase = Depends(CalculationUseCase),
-) -> NoDataResponse:
+    job_uc: IJobUseCase = Depends(JobUseCase),
+    upload_uc: IUploadUseCase = Depends(UploadUseCase),
+) -> BasicResponse[JobResponse | None]:
     if (
         file.content_type
         != "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -91,26 +103,43 @@ def upsert_take_off_data(
             status_code=http.HTTPStatus.BAD_REQUEST,
             detail="Please upload excel file",
         )
-    path = save_file("calculations", file)
-    calculation_uc.upsert_take_off_data(request, path, month, year)
 
-    return NoDataResponse(message="Success uploading take off data!")
+    content_hash = get_file_checksum(file.file)
+    if upload_uc.is_upload_current(
+        request, UploadKindEnum.TAKE_OFF, month, year, content_hash
+    ):
+        response.status_code = http.HTTPStatus.OK
+        return BasicResponse(data=None, message="Take off data is already up to date")
+
+    path = save_upload("calculations", file)
+    res = job_uc.enqueue_job(
+        request,
+        JobTypeEnum.CALCULATION_TAKE_OFF,
+        month,
+        year,
+        {"path": path, "content_hash": content_hash},
+    )
+
+    return BasicResponse(data=res, message="Success queueing take off data!")
 
 
 @router.post(
     # temporary
     "/booking",
-    response_model=NoDataResponse,
+    response_model=BasicResponse[JobResponse | None],
+    status_code=http.HTTPStatus.ACCEPTED,
     summary="Upsert slot calculation SOA, BO",
-    description="Upsert slot calculation take off data",
+    description="Queue the upsert of slot calculation SOA, SO, BO, OC and booking data, the progress is available at /api/jobs/{id}",
 )
 def upsert_soa_bo_oc_booking_data(
     request: Request,
+    response: Response,
     file: UploadFile,
     month: int = Form(...),
     year: int = Form(...),
-    calculation_uc: ICalculationUseCase = Depends(CalculationUseCase),
-) -> NoDataResponse:
+    job_uc: IJobUseCase = Depends(JobUseCase),
+    upload_uc: IUploadUseCase = Depends(UploadUseCase),
+) -> BasicResponse[JobResponse | None]:
     if (
         file.content_type
         != "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -120,9 +149,26 @@ def upsert_soa_bo_oc_booking_data(
             detail="Please upload excel file",
         )
 
-    path = save_file("calculations", file)
-    calculation_uc.upsert_bo_soa_oc_booking_prospect(request, path, month, year)
-    return NoDataResponse(message="Success uploading SOA, SO, BO, OC, Booking data")
+    content_hash = get_file_checksum(file.file)
+    if upload_uc.is_upload_current(
+        request, UploadKindEnum.BOOKING, month, year, content_hash
+    ):
+        response.status_code = http.HTTPStatus.OK
+        return BasicResponse(
+            data=None, message="SOA, SO, BO, OC, Booking data is already up to date"
+        )
+
+    path = save_upload("calculations", file)
+    res = job_uc.enqueue_job(
+        request,
+        JobTypeEnum.CALCULATION_BOOKING,
+        month,
+        year,
+        {"path": path, "content_hash": content_hash},
+    )
+    return BasicResponse(
+        data=res, message="Success queueing SOA, SO, BO, OC, Booking data"
+    )
 
 
 @router.get(
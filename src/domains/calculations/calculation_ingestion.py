@@ -0,0 +1,124 @@
+import http
+from typing import Dict, List
+
+import numpy
+import pandas
+from fastapi import HTTPException
+
+from src.shared.utils.date import get_month_difference
+
+BO_SOA_OC_BOOKING_PROSPECT_COLUMNS = ["soa", "bo", "oc", "so", "booking_prospect"]
+TAKE_OFF_COLUMNS = ["take_off"]
+
+
+def get_forecast_month_offsets(
+    forecast_months: List[str], month: int, year: int
+) -> Dict[str, int]:
+    offsets = {i: get_month_difference(f"{year}-{month}", i) for i in forecast_months}
+
+    if any(i < 0 for i in offsets.values()):
+        raise HTTPException(
+            status_code=http.HTTPStatus.BAD_REQUEST,
+            detail=f"Forecast month cannot be less than the current month",
+        )
+
+    return offsets
+
+
+def _upper(series: pandas.Series) -> pandas.Series:
+    return series.astype(str).str.upper()
+
+
+def _aggregate(
+    df: pandas.DataFrame,
+    model_column: str,
+    masks: Dict[str, pandas.Series],
+    forecast_months: List[str],
+    month: int,
+    year: int,
+) -> pandas.DataFrame:
+    columns = list(masks.keys())
+
+    if len(df) == 0 or len(forecast_months) == 0:
+        return pandas.DataFrame(columns=["model_id", "forecast_month"] + columns)
+
+    offsets = get_forecast_month_offsets(forecast_months, month, year)
+
+    values = df[forecast_months]
+    frames = {}
+    for column, mask in masks.items():
+        frames[column] = values.where(mask, other=numpy.nan, axis=0)
+
+    # one wide frame indexed by model with (column, header) pairs, summed once
+    wide = pandas.concat(frames, axis=1)
+    wide[("model_id", "")] = df[model_column].values
+    totals = wide.groupby(("model_id", ""), sort=False).sum(min_count=0)
+    totals.index.name = "model_id"
+    totals.columns.names = ["column", "header"]
+
+    result = totals.stack("header", future_stack=True).reset_index()
+    result["forecast_month"] = result["header"].map(offsets)
+
+    return _as_int_when_whole(result[["model_id", "forecast_month"] + columns], columns)
+
+
+def _as_int_when_whole(
+    result: pandas.DataFrame, columns: List[str]
+) -> pandas.DataFrame:
+    whole = [i for i in columns if (result[i] % 1 == 0).all()]
+    return result.astype({i: "int64" for i in whole})
+
+
+def to_frame(
+    rows: List[tuple], columns: List[str], forecast_months: List[str]
+) -> pandas.DataFrame:
+    df = pandas.DataFrame(rows, columns=columns)
+    df[forecast_months] = df[forecast_months].astype("float64")
+    return df
+
+
+def combine_totals(
+    totals: List[pandas.DataFrame], columns: List[str]
+) -> pandas.DataFrame:
+    # partial totals of every chunk summed again, so a model spread over
+    # several chunks ends up in one row per forecast month
+    if len(totals) == 0:
+        return pandas.DataFrame(columns=["model_id", "forecast_month"] + columns)
+
+    result = (
+        pandas.concat(totals, ignore_index=True)
+        .groupby(["model_id", "forecast_month"], sort=False, as_index=False)[columns]
+        .sum()
+    )
+    return _as_int_when_whole(result, columns)
+
+
+def aggregate_bo_soa_oc_booking_prospect(
+    df: pandas.DataFrame, forecast_months: List[str], month: int, year: int
+) -> pandas.DataFrame:
+    is_so_number = _upper(df["SO Number"]).str[:2] == "SO"
+    status_so = _upper(df["Status SO"])
+    is_pilot = _upper(df["Status Pilot"]) == "PILOT"
+    source = _upper(df["Source"])
+    is_forecast_order = source == "FCST ORDER"
+
+    masks = {
+        "soa": is_so_number & (status_so == "ACCEPTED") & is_pilot & is_forecast_order,
+        "bo": pandas.Series(False, index=df.index),
+        "oc": ~is_so_number
+        & status_so.isin(["ACCEPTED", "PROSPECT"])
+        & is_pilot
+        & is_forecast_order,
+        "so": is_so_number & (status_so == "PROSPECT") & is_pilot & is_forecast_order,
+        "booking_prospect": ~is_so_number & (source == "URGENT ORDER"),
+    }
+
+    return _aggregate(df, "Model", masks, forecast_months, month, year)
+
+
+def aggregate_take_off(
+    df: pandas.DataFrame, forecast_months: List[str], month: int, year: int
+) -> pandas.DataFrame:
+    masks = {"take_off": pandas.Series(True, index=df.index)}
+
+    return _aggregate(df, "Sales Name", masks, forecast_months, month, year)
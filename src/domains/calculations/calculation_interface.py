@@ -1,4 +1,5 @@
 import abc
+from typing import Any, BinaryIO, Dict, List
 
 from fastapi import Request, UploadFile
 
@@ -6,6 +7,7 @@ from src.domains.calculations.entities.va_slot_calculation_details import (
     SlotCalculationDetail,
 )
 from src.domains.calculations.entities.va_slot_calculations import SlotCalculation
+from src.models.dtos.excel_dto import ExcelTemplateDto
 from src.models.requests.calculation_request import (
     GetCalculationRequest,
     UpdateCalculationRequest,
@@ -17,13 +19,23 @@ from src.models.responses.calculation_response import GetCalculationResponse
 class ICalculationUseCase:
     @abc.abstractmethod
     def upsert_take_off_data(
-        self, request: Request, file: str, month: int, year: int
+        self,
+        request: Request,
+        file: str | BinaryIO,
+        month: int,
+        year: int,
+        content_hash: str | None = None,
     ) -> None:
         pass
 
     @abc.abstractmethod
     def upsert_bo_soa_oc_booking_prospect(
-        self, request: Request, path: str, month: int, year: int
+        self,
+        request: Request,
+        path: str | BinaryIO,
+        month: int,
+        year: int,
+        content_hash: str | None = None,
     ) -> None:
         pass
 
@@ -42,11 +54,13 @@ class ICalculationUseCase:
     @abc.abstractmethod
     def download_booking_excel_template(
         self, request: Request, month: int, year: int
-    ) -> str:
+    ) -> ExcelTemplateDto:
         pass
 
     @abc.abstractmethod
-    def download_takeoff_excel_template(self, request: Request, month: int, year: int):
+    def download_takeoff_excel_template(
+        self, request: Request, month: int, year: int
+    ) -> ExcelTemplateDto:
         pass
 
 
@@ -70,6 +84,16 @@ class ICalculationRepository:
     ) -> None:
         pass
 
+    @abc.abstractmethod
+    def bulk_upsert_calculation_details(
+        self,
+        request: Request,
+        slot_calculation_id: str,
+        rows: List[Dict[str, Any]],
+        columns: List[str],
+    ) -> None:
+        pass
+
     @abc.abstractmethod
     def find_calculation_detail(
         self,
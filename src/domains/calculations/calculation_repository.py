@@ -1,4 +1,8 @@
+from typing import Any, Dict, List
+
 from fastapi import Depends, Request
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from src.domains.calculations.calculation_interface import ICalculationRepository
@@ -9,6 +13,9 @@ from src.domains.calculations.entities.va_slot_calculation_details import (
 from src.domains.calculations.entities.va_slot_calculations import SlotCalculation
 
 
+CALCULATION_DETAIL_BATCH_SIZE = 1000
+
+
 class CalculationRepository(ICalculationRepository):
 
     def __init__(self, va_db: Session = Depends(get_va_db)):
@@ -80,3 +87,31 @@ class CalculationRepository(ICalculationRepository):
     ) -> None:
         self.get_va_db(request).add(calculation_detail)
         self.get_va_db(request).flush()
+
+    def bulk_upsert_calculation_details(
+        self,
+        request: Request,
+        slot_calculation_id: str,
+        rows: List[Dict[str, Any]],
+        columns: List[str],
+    ) -> None:
+        for start in range(0, len(rows), CALCULATION_DETAIL_BATCH_SIZE):
+            statement = insert(SlotCalculationDetail).values(
+                [
+                    dict(i, slot_calculation_id=slot_calculation_id)
+                    for i in rows[start : start + CALCULATION_DETAIL_BATCH_SIZE]
+                ]
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[
+                    SlotCalculationDetail.slot_calculation_id,
+                    SlotCalculationDetail.model_id,
+                    SlotCalculationDetail.forecast_month,
+                ],
+                set_={
+                    **{i: statement.excluded[i] for i in columns},
+                    "deletable": 0,
+                    "updated_at": func.now(),
+                },
+            )
+            self.get_va_db(request).execute(statement)
@@ -1,27 +1,33 @@
-import re
-import uuid
-from typing import List, Dict
+from typing import BinaryIO, List, Dict
 
 import pandas
 from fastapi import Depends, HTTPException, Request, UploadFile
-import os
 import http
 import openpyxl
-from openpyxl.styles import Border, Side, Alignment
-from openpyxl.workbook import Workbook
 
+from src.domains.allocations.allocation_interface import IAllocationRepository
+from src.domains.allocations.allocation_repository import AllocationRepository
+from src.domains.calculations.calculation_ingestion import (
+    BO_SOA_OC_BOOKING_PROSPECT_COLUMNS,
+    TAKE_OFF_COLUMNS,
+    aggregate_bo_soa_oc_booking_prospect,
+    aggregate_take_off,
+    combine_totals,
+    to_frame,
+)
 from src.domains.calculations.calculation_interface import (
     ICalculationRepository,
     ICalculationUseCase,
 )
 from src.domains.calculations.calculation_repository import CalculationRepository
-from src.domains.calculations.entities.va_slot_calculation_details import (
-    SlotCalculationDetail,
-)
 from src.domains.calculations.entities.va_slot_calculations import SlotCalculation
-from src.domains.masters.entities.va_models import Model
+from src.domains.uploads.enums import UploadKindEnum
+from src.domains.uploads.upload_interface import IUploadRepository
+from src.domains.uploads.upload_repository import UploadRepository
 from src.domains.masters.master_interface import IMasterRepository
 from src.domains.masters.master_repository import MasterRepository
+from src.models.dtos.excel_dto import ExcelTemplateDto
+from src.models.dtos.master_dto import ModelDto
 from src.models.requests.calculation_request import (
     GetCalculationRequest,
     UpdateCalculationRequest,
@@ -39,10 +45,15 @@ from src.models.responses.master_response import (
     SegmentResponse,
 )
 from src.shared.enums import Database
+from src.shared.utils.checksum import get_rows_checksum
 from src.shared.utils.database_utils import begin_transaction, commit
-from src.shared.utils.date import get_month_difference, is_date_string_format
+from src.shared.utils.date import is_date_string_format
 from src.shared.utils.excel import (
+    FORECAST_MONTH_PATTERN,
+    ExcelRowReader,
+    get_excel_template,
     get_header_column_index,
+    get_template_months,
     get_worksheet,
     open_excel_workbook,
 )
@@ -51,7 +62,7 @@ from src.shared.utils.file_utils import (
     get_file_extension,
     save_upload_file,
 )
-from src.shared.utils.storage_utils import is_file_exist, get_full_path
+from src.shared.utils.storage_utils import get_upload_source
 from src.shared.utils.xid import generate_xid
 from pathlib import Path
 
@@ -62,20 +73,73 @@ class CalculationUseCase(ICalculationUseCase):
         self,
         calculation_repo: ICalculationRepository = Depends(CalculationRepository),
         master_repository: IMasterRepository = Depends(MasterRepository),
+        allocation_repo: IAllocationRepository = Depends(AllocationRepository),
+        upload_repo: IUploadRepository = Depends(UploadRepository),
     ):
         self.calculation_repo = calculation_repo
         self.master_repository = master_repository
+        self.allocation_repo = allocation_repo
+        self.upload_repo = upload_repo
 
-    def upsert_bo_soa_oc_booking_prospect(
-        self, request, file: str, month: int, year: int
-    ):
-        if not is_file_exist(file):
+    def _find_models(
+        self, request: Request, model_ids: pandas.Series
+    ) -> Dict[str, ModelDto]:
+        model_ids = model_ids.unique().tolist()
+        models = self.master_repository.find_models_by_ids(request, model_ids)
+
+        not_found = [str(i) for i in model_ids if i not in models]
+        if len(not_found) > 0:
             raise HTTPException(
-                status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
-                detail="Excel file is not found",
+                http.HTTPStatus.BAD_REQUEST,
+                detail=f"Model {', '.join(not_found)} is not found",
+            )
+
+        return {i: models[i] for i in model_ids}
+
+    def _upsert_calculation_details(
+        self,
+        request: Request,
+        month: int,
+        year: int,
+        model_dict: Dict[str, ModelDto],
+        totals: pandas.DataFrame,
+        columns: List[str],
+    ) -> List[Dict]:
+        calculation = self.calculation_repo.find_calculation(
+            request, month=month, year=year
+        )
+
+        if calculation is None:
+            calculation = self.calculation_repo.create_calculation(
+                request, SlotCalculation(month=month, year=year)
             )
 
-        df = pandas.read_excel(os.getcwd() + "/storage" + file)
+        rows = []
+        for i in totals.to_dict("records"):
+            row = {
+                "model_id": model_dict[i["model_id"]].id,
+                "forecast_month": i["forecast_month"],
+            }
+            for column in columns:
+                row[column] = i[column]
+            rows.append(row)
+
+        self.calculation_repo.bulk_upsert_calculation_details(
+            request, calculation.id, rows, columns
+        )
+        self.allocation_repo.refresh_allocation_snapshot(
+            request, month, year, [i["model_id"] for i in rows]
+        )
+        return rows
+
+    def upsert_bo_soa_oc_booking_prospect(
+        self,
+        request,
+        file: str | BinaryIO,
+        month: int,
+        year: int,
+        content_hash: str | None = None,
+    ):
         columns = [
             "SO Number",
             "Status SO",
@@ -91,187 +155,57 @@ class CalculationUseCase(ICalculationUseCase):
             "Year",
         ]
 
-        not_found_index = [i for i in columns if i not in df.columns.tolist()]
-        forecast_months = [
-            i for i in df.columns.tolist() if re.match(r"^\d{4}-(0[1-9]|1[0-2])$", i)
-        ]
-
-        if len(not_found_index) > 0:
-            raise HTTPException(
-                http.HTTPStatus.BAD_REQUEST,
-                detail=f"{not_found_index[0]} field is required.",
-            )
-
-        begin_transaction(request, Database.VEHICLE_ALLOCATION)
-
-        calculation_details: List[SlotCalculationDetail] = []
-        calculation_detail_map = {}
-
-        model_dict: Dict[str, Model] = {}
-
-        for idx, row in df.iterrows():
-            so_number = row["SO Number"]
-            status_so = row["Status SO"]
-            status_pilot = row["Status Pilot"]
-            dealer = row["Dealer"]
-            model_id = row["Model"]
-            cat = row["Cat"]
-            region = row["Region"]
-            customer_name = row["Customer Name"]
-            vin_year_rev = row["Vin Year Rev"]
-            src = row["SRC"]
-            source = row["Source"]
-            row_year = row["Year"]
-
-            if model_id not in model_dict:
-                model = self.master_repository.find_model(request, model_id)
-                if model is None:
-                    raise HTTPException(
-                        http.HTTPStatus.BAD_REQUEST,
-                        detail=f"Model {model_id} is not found",
-                    )
-                model_dict[model_id] = model
-
-            model = model_dict[model_id]
-
-            is_soa = (
-                so_number[:2].upper() == "SO"
-                and status_so.upper() == "ACCEPTED"
-                and status_pilot.upper() == "PILOT"
-                and source.upper() == "FCST ORDER"
-            )
-
-            is_so = (
-                so_number[:2].upper() == "SO"
-                and status_so.upper() == "PROSPECT"
-                and status_pilot.upper() == "PILOT"
-                and source.upper() == "FCST ORDER"
-            )
-
-            is_oc = (
-                so_number[:2].upper() != "SO"
-                and (status_so.upper() == "ACCEPTED" or status_so.upper() == "PROSPECT")
-                and status_pilot.upper() == "PILOT"
-                and source.upper() == "FCST ORDER"
-            )
-
-            is_booking = (
-                so_number[:2].upper() != "SO" and source.upper() == "URGENT ORDER"
-            )
-
-            for j in forecast_months:
-                forecast_month = get_month_difference(f"{year}-{month}", j)
-
-                if forecast_month < 0:
-                    raise HTTPException(
-                        status_code=http.HTTPStatus.BAD_REQUEST,
-                        detail=f"Forecast month cannot be less than the current month",
-                    )
-
-                if model.id not in calculation_detail_map:
-                    calculation_detail_map[model.id] = {}
-
-                if forecast_month not in calculation_detail_map[model.id]:
-                    calculation_detail_map[model.id][forecast_month] = (
-                        SlotCalculationDetail(
-                            model_id=model.id,
-                            forecast_month=forecast_month,
-                            soa=0,
-                            bo=0,
-                            oc=0,
-                            so=0,
-                            booking_prospect=0,
-                        )
+        with ExcelRowReader(get_upload_source(file)) as reader:
+            reader.validate_header(columns)
+            forecast_months = reader.get_columns(FORECAST_MONTH_PATTERN)
+            columns = columns + forecast_months
+
+            model_ids = {}
+            totals = []
+            row_count = 0
+            for rows in reader.iter_chunks(columns, forecast_months):
+                row_count += len(rows)
+                df = to_frame(rows, columns, forecast_months)
+                model_ids.update(dict.fromkeys(df["Model"].tolist()))
+                totals.append(
+                    aggregate_bo_soa_oc_booking_prospect(
+                        df, forecast_months, month, year
                     )
-
-                calculation_detail_map[model.id][forecast_month].soa += (
-                    row[j] if is_soa and not pandas.isna(row[j]) else 0
-                )
-                calculation_detail_map[model.id][forecast_month].bo += 0
-                calculation_detail_map[model.id][forecast_month].oc += (
-                    row[j] if is_oc and not pandas.isna(row[j]) else 0
-                )
-                calculation_detail_map[model.id][forecast_month].so += (
-                    row[j] if is_so and not pandas.isna(row[j]) else 0
-                )
-                calculation_detail_map[model.id][forecast_month].booking_prospect += (
-                    row[j] if is_booking and not pandas.isna(row[j]) else 0
                 )
 
-        calculation = self.calculation_repo.find_calculation(
-            request, month=month, year=year
-        )
+        begin_transaction(request, Database.VEHICLE_ALLOCATION)
 
-        if calculation is None:
-            self.calculation_repo.create_calculation(
+        model_dict = self._find_models(request, pandas.Series(list(model_ids)))
+        details = self._upsert_calculation_details(
+            request,
+            month,
+            year,
+            model_dict,
+            combine_totals(totals, BO_SOA_OC_BOOKING_PROSPECT_COLUMNS),
+            BO_SOA_OC_BOOKING_PROSPECT_COLUMNS,
+        )
+        if content_hash is not None:
+            self.upload_repo.upsert_upload_ledger(
                 request,
-                SlotCalculation(month=month, year=year, details=calculation_details),
+                UploadKindEnum.BOOKING,
+                month,
+                year,
+                content_hash,
+                row_count,
+                len(details),
+                get_rows_checksum(details),
             )
-        else:
-            detail_maps = {}
-            for i in calculation.details:
-                if i.deletable == 0:
-                    if i.model_id not in detail_maps:
-                        detail_maps[i.model_id] = {}
-                    if i.forecast_month not in detail_maps[i.model_id]:
-                        detail_maps[i.model_id][i.forecast_month] = i
-
-            for model_id, forecast_month_map in calculation_detail_map.items():
-                if model_id in detail_maps:
-                    for (
-                        forecast_month,
-                        calculation_detail,
-                    ) in forecast_month_map.items():
-                        calculation_detail.slot_calculation_id = calculation.id
-                        if forecast_month not in detail_maps[model_id]:
-                            self.calculation_repo.create_calculation_detail(
-                                request, calculation_detail
-                            )
-                        else:
-                            detail_maps[model_id][forecast_month].model_id = (
-                                calculation_detail_map[model_id][
-                                    forecast_month
-                                ].model_id
-                            )
-                            detail_maps[model_id][forecast_month].soa = (
-                                calculation_detail_map[model_id][forecast_month].soa
-                            )
-                            detail_maps[model_id][forecast_month].bo = (
-                                calculation_detail_map[model_id][forecast_month].bo
-                            )
-                            detail_maps[model_id][forecast_month].oc = (
-                                calculation_detail_map[model_id][forecast_month].oc
-                            )
-                            detail_maps[model_id][forecast_month].so = (
-                                calculation_detail_map[model_id][forecast_month].so
-                            )
-                            detail_maps[model_id][forecast_month].booking_prospect = (
-                                calculation_detail_map[model_id][
-                                    forecast_month
-                                ].booking_prospect
-                            )
-                else:
-                    for (
-                        forecast_month,
-                        calculation_detail,
-                    ) in forecast_month_map.items():
-                        calculation_detail.slot_calculation_id = calculation.id
-                        self.calculation_repo.create_calculation_detail(
-                            request, calculation_detail
-                        )
 
         commit(request, Database.VEHICLE_ALLOCATION)
 
     def upsert_take_off_data(
-        self, request: Request, file: str, month: int, year: int
+        self,
+        request: Request,
+        file: str | BinaryIO,
+        month: int,
+        year: int,
+        content_hash: str | None = None,
     ) -> None:
-        if not is_file_exist(file):
-            raise HTTPException(
-                status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
-                detail="Excel file is not found",
-            )
-
-        df = pandas.read_excel(os.getcwd() + "/storage" + file)
         columns = [
             "Category",
             "Sub Name",
@@ -284,112 +218,43 @@ class CalculationUseCase(ICalculationUseCase):
             "Item name",
         ]
 
-        not_found_index = [i for i in columns if i not in df.columns.tolist()]
-        forecast_months = [
-            i for i in df.columns.tolist() if re.match(r"^\d{4}-(0[1-9]|1[0-2])$", i)
-        ]
-
-        if len(not_found_index) > 0:
-            raise HTTPException(
-                http.HTTPStatus.BAD_REQUEST,
-                detail=f"{not_found_index[0]} field is required.",
-            )
+        with ExcelRowReader(get_upload_source(file)) as reader:
+            reader.validate_header(columns)
+            forecast_months = reader.get_columns(FORECAST_MONTH_PATTERN)
+            # only the model and the months are aggregated
+            columns = ["Sales Name"] + forecast_months
+
+            model_ids = {}
+            totals = []
+            row_count = 0
+            for rows in reader.iter_chunks(columns, forecast_months):
+                row_count += len(rows)
+                df = to_frame(rows, columns, forecast_months)
+                model_ids.update(dict.fromkeys(df["Sales Name"].tolist()))
+                totals.append(aggregate_take_off(df, forecast_months, month, year))
 
         begin_transaction(request, Database.VEHICLE_ALLOCATION)
 
-        calculation_details: List[SlotCalculationDetail] = []
-        calculation_detail_map = {}
-
-        model_dict: Dict[str, Model] = {}
-
-        for idx, row in df.iterrows():
-            model_id = row["Sales Name"]
-
-            if model_id not in model_dict:
-                model = self.master_repository.find_model(request, model_id)
-                if model is None:
-                    raise HTTPException(
-                        http.HTTPStatus.BAD_REQUEST,
-                        detail=f"Model {model_id} is not found",
-                    )
-                model_dict[model_id] = model
-
-            model = model_dict[model_id]
-
-            for j in forecast_months:
-                forecast_month = get_month_difference(f"{year}-{month}", j)
-
-                if forecast_month < 0:
-                    raise HTTPException(
-                        status_code=http.HTTPStatus.BAD_REQUEST,
-                        detail=f"Forecast month cannot be less than the current month",
-                    )
-
-                if model.id not in calculation_detail_map:
-                    calculation_detail_map[model.id] = {}
-
-                if forecast_month not in calculation_detail_map[model.id]:
-                    calculation_detail_map[model.id][forecast_month] = (
-                        SlotCalculationDetail(
-                            model_id=model.id,
-                            forecast_month=forecast_month,
-                            take_off=0,
-                        )
-                    )
-
-                calculation_detail_map[model.id][forecast_month].take_off += (
-                    row[j] if not pandas.isna(row[j]) else 0
-                )
-
-        calculation = self.calculation_repo.find_calculation(
-            request, month=month, year=year
+        model_dict = self._find_models(request, pandas.Series(list(model_ids)))
+        details = self._upsert_calculation_details(
+            request,
+            month,
+            year,
+            model_dict,
+            combine_totals(totals, TAKE_OFF_COLUMNS),
+            TAKE_OFF_COLUMNS,
         )
-
-        if calculation is None:
-            self.calculation_repo.create_calculation(
+        if content_hash is not None:
+            self.upload_repo.upsert_upload_ledger(
                 request,
-                SlotCalculation(month=month, year=year, details=calculation_details),
+                UploadKindEnum.TAKE_OFF,
+                month,
+                year,
+                content_hash,
+                row_count,
+                len(details),
+                get_rows_checksum(details),
             )
-        else:
-            detail_maps = {}
-            for i in calculation.details:
-                if i.deletable == 0:
-                    if i.model_id not in detail_maps:
-                        detail_maps[i.model_id] = {}
-                    if i.forecast_month not in detail_maps[i.model_id]:
-                        detail_maps[i.model_id][i.forecast_month] = i
-
-            for model_id, forecast_month_map in calculation_detail_map.items():
-                if model_id in detail_maps:
-                    for (
-                        forecast_month,
-                        calculation_detail,
-                    ) in forecast_month_map.items():
-                        calculation_detail.slot_calculation_id = calculation.id
-                        if forecast_month not in detail_maps[model_id]:
-                            self.calculation_repo.create_calculation_detail(
-                                request, calculation_detail
-                            )
-                        else:
-                            detail_maps[model_id][forecast_month].model_id = (
-                                calculation_detail_map[model_id][
-                                    forecast_month
-                                ].model_id
-                            )
-                            detail_maps[model_id][forecast_month].take_off = (
-                                calculation_detail_map[model_id][
-                                    forecast_month
-                                ].take_off
-                            )
-                else:
-                    for (
-                        forecast_month,
-                        calculation_detail,
-                    ) in forecast_month_map.items():
-                        calculation_detail.slot_calculation_id = calculation.id
-                        self.calculation_repo.create_calculation_detail(
-                            request, calculation_detail
-                        )
 
         commit(request, Database.VEHICLE_ALLOCATION)
 
@@ -469,16 +334,18 @@ class CalculationUseCase(ICalculationUseCase):
         calculation_detail.slot_1 = update_calculation_request.slot_1
         calculation_detail.slot_2 = update_calculation_request.slot_2
 
+        self.allocation_repo.refresh_allocation_snapshot(
+            request,
+            calculation_detail.slot_calculation.month,
+            calculation_detail.slot_calculation.year,
+            [calculation_detail.model_id],
+        )
+
         commit(request, Database.VEHICLE_ALLOCATION)
 
     def download_booking_excel_template(
         self, request: Request, month: int, year: int
-    ) -> str:
-        workbook = Workbook()
-
-        sheet = workbook.active
-        sheet.title = "Template-Rundown"
-
+    ) -> ExcelTemplateDto:
         headers = [
             "SO Number",
             "Status SO",
@@ -495,43 +362,13 @@ class CalculationUseCase(ICalculationUseCase):
             "VRF QTY",
         ]
 
-        for i in range(5):
-            if i > 0:
-                month += 1
-                if month > 12:
-                    month = 1
-                    year += 1
-            headers.append(f"{year}-{month:02}")
-
-        for col_index, header in enumerate(headers, start=1):
-            cell = sheet.cell(row=1, column=col_index, value=header)
-            thin_border = Border(
-                left=Side(style="thin"),
-                right=Side(style="thin"),
-                top=Side(style="thin"),
-                bottom=Side(style="thin"),
-            )
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="center")
-            sheet.column_dimensions[cell.column_letter].width = len(header) + 2
-
-        relative_path = (
-            "/temp/template/calculations/booking-" + str(uuid.uuid4()) + ".xlsx"
+        return get_excel_template(
+            "Template-Rundown", tuple(headers + get_template_months(month, year, 5))
         )
-        dest = get_full_path(relative_path)
-        upload_dir = os.path.join(os.getcwd(), "storage/temp/template/calculations")
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-
-        workbook.save(dest)
-        return dest
-
-    def download_takeoff_excel_template(self, request: Request, month: int, year: int):
-        workbook = Workbook()
-
-        sheet = workbook.active
-        sheet.title = "Template-Rundown"
 
+    def download_takeoff_excel_template(
+        self, request: Request, month: int, year: int
+    ) -> ExcelTemplateDto:
         headers = [
             "Category",
             "Sub Name",
@@ -544,33 +381,6 @@ class CalculationUseCase(ICalculationUseCase):
             "Item name",
         ]
 
-        for i in range(7):
-            if i > 0:
-                month += 1
-                if month > 12:
-                    month = 1
-                    year += 1
-            headers.append(f"{year}-{month:02}")
-
-        for col_index, header in enumerate(headers, start=1):
-            cell = sheet.cell(row=1, column=col_index, value=header)
-            thin_border = Border(
-                left=Side(style="thin"),
-                right=Side(style="thin"),
-                top=Side(style="thin"),
-                bottom=Side(style="thin"),
-            )
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="center")
-            sheet.column_dimensions[cell.column_letter].width = len(header) + 2
-
-        relative_path = (
-            "/temp/template/calculations/takeoff-" + str(uuid.uuid4()) + ".xlsx"
+        return get_excel_template(
+            "Template-Rundown", tuple(headers + get_template_months(month, year, 7))
         )
-        dest = get_full_path(relative_path)
-        upload_dir = os.path.join(os.getcwd(), "storage/temp/template/calculations")
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-
-        workbook.save(dest)
-        return dest
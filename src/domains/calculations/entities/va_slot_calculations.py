@@ -5,12 +5,20 @@ from src.domains.calculations.entities.va_slot_calculation_details import SlotCa
 from src.domains.calculations.entities.va_slot_calculation_stock_pilots import SlotCalculationStockPilot
 from src.shared.entities.basemodel import BaseModel
 from sqlalchemy.orm import MappedColumn, mapped_column, Mapped, relationship
-from sqlalchemy import DateTime, Integer, String, func, text, event
+from sqlalchemy import DateTime, Index, Integer, String, func, text, event
 
 from src.shared.utils.xid import generate_xid
 
 class SlotCalculation(BaseModel):
     __tablename__ = "va_slot_calculations"
+    __table_args__ = (
+        Index(
+            "ix_va_slot_calculations_period",
+            "year",
+            "month",
+            postgresql_where=text("deletable = 0"),
+        ),
+    )
     
     id: MappedColumn[str] = mapped_column(String(255), primary_key=True, nullable=False)
     month: MappedColumn[int] = mapped_column(Integer, nullable=False)
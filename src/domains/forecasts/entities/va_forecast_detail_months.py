@@ -1,6 +1,6 @@
 from src.shared.entities.basemodel import BaseModel
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func, text, event
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func, text, event
 from src.shared.entities.basemodel import BaseModel
 from sqlalchemy.orm import mapped_column, MappedColumn, relationship, Mapped
 from datetime import datetime
@@ -10,6 +10,13 @@ from src.shared.utils.xid import generate_xid
 
 class ForecastDetailMonth(BaseModel):
     __tablename__ = "va_forecast_detail_months"
+    __table_args__ = (
+        Index(
+            "ix_va_forecast_detail_months_detail_month",
+            "forecast_detail_id",
+            "forecast_month",
+        ),
+    )
     id: MappedColumn[str] = mapped_column(String(255), primary_key=True, nullable=False)
     forecast_detail_id: MappedColumn[str] = mapped_column(String(255), ForeignKey("va_forecast_details.id", onupdate="CASCADE"),nullable=False)
     forecast_month: MappedColumn[int] = mapped_column(Integer, nullable=False)
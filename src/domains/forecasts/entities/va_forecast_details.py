@@ -1,6 +1,6 @@
 from typing import List
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func, text, event
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func, text, event
 from src.shared.entities.basemodel import BaseModel
 from sqlalchemy.orm import mapped_column, MappedColumn, relationship, Mapped
 from datetime import datetime
@@ -8,6 +8,13 @@ from datetime import datetime
 
 class ForecastDetail(BaseModel):
     __tablename__ = "va_forecast_details"
+    __table_args__ = (
+        Index(
+            "ix_va_forecast_details_forecast_model",
+            "forecast_id",
+            "model_id",
+        ),
+    )
     id: MappedColumn[str] = mapped_column(String(255), primary_key=True, nullable=False)
     forecast_id: MappedColumn[str] = mapped_column(
         String(255),
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, func, text
+from sqlalchemy.orm import MappedColumn, mapped_column
+
+from src.shared.entities.basemodel import BaseModel
+
+
+class ForecastPeriodStat(BaseModel):
+    __tablename__ = "va_forecast_period_stats"
+
+    year: MappedColumn[int] = mapped_column(Integer, primary_key=True)
+    month: MappedColumn[int] = mapped_column(Integer, primary_key=True)
+    dealer_submit: MappedColumn[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0")
+    )
+    order_confirmation: MappedColumn[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0")
+    )
+    updated_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
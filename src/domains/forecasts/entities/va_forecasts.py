@@ -2,7 +2,7 @@ from typing import List
 
 from sqlalchemy import ForeignKey
 
-from sqlalchemy import DateTime, Integer, String, func, text, event
+from sqlalchemy import DateTime, Index, Integer, String, func, text, event
 from src.shared.entities.basemodel import BaseModel
 
 from sqlalchemy.orm import mapped_column, MappedColumn, relationship, Mapped
@@ -11,6 +11,15 @@ from datetime import datetime
 
 class Forecast(BaseModel):
     __tablename__ = "va_forecasts"
+    __table_args__ = (
+        Index(
+            "ix_va_forecasts_period_dealer",
+            "year",
+            "month",
+            "dealer_id",
+            postgresql_where=text("deletable = 0"),
+        ),
+    )
     id: MappedColumn[str] = mapped_column(String(255), primary_key=True, nullable=False)
     name: MappedColumn[str] = mapped_column(String(255), nullable=False)
     month: MappedColumn[int] = mapped_column(Integer, nullable=False)
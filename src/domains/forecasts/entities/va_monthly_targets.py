@@ -4,7 +4,7 @@ from src.domains.forecasts.entities.va_monthly_target_details import MonthlyTarg
 from src.shared.entities.basemodel import BaseModel
 from src.shared.entities.basemodel import BaseModel
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func, text, event
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func, text, event
 from src.shared.entities.basemodel import BaseModel
 from sqlalchemy.orm import mapped_column, MappedColumn, relationship, Mapped
 from datetime import datetime
@@ -13,6 +13,14 @@ from src.shared.utils.xid import generate_xid
 
 class MonthlyTarget(BaseModel):
     __tablename__ = "va_monthly_targets"
+    __table_args__ = (
+        Index(
+            "ix_va_monthly_targets_period",
+            "year",
+            "month",
+            postgresql_where=text("deletable = 0"),
+        ),
+    )
     id: MappedColumn[str] = mapped_column(String(255), primary_key=True, nullable=False)
     month: MappedColumn[int] = mapped_column(Integer, nullable=False)    
     year: MappedColumn[int] = mapped_column(Integer, nullable=False)
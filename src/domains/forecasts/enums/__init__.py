@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class ForecastUpsertModeEnum(Enum):
+    DIFF = "diff"
+    REPLACE = "replace"
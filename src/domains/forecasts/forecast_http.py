@@ -1,10 +1,11 @@
 import base64
+import http
 import math
 from io import BytesIO
 
 from fastapi import APIRouter, Depends, File, Form, UploadFile
 from starlette.requests import Request
-from starlette.responses import FileResponse
+from starlette.responses import Response
 
 from src.dependencies.auth_dependency import api_key_auth
 from src.domains.forecasts.forecast_interface import IForecastUseCase
@@ -52,12 +53,12 @@ def upsert_forecast(
     summary="Get Forecast Summaries",
     description="Get Forecast Summaries",
 )
-def get_forecast_summaries(
+async def get_forecast_summaries(
     request: Request,
     query: GetForecastSummaryRequest = Depends(),
     forecast_uc: IForecastUseCase = Depends(ForecastUseCase),
 ) -> PaginationResponse[GetForecastSummaryResponse]:
-    res, cnt = forecast_uc.get_forecast_summary(request, query)
+    res, cnt, next_cursor = await forecast_uc.get_forecast_summary(request, query)
 
     return PaginationResponse(
         data=res,
@@ -66,18 +67,19 @@ def get_forecast_summaries(
             size=query.size,
             total_count=cnt,
             page_count=math.ceil(cnt / query.size),
+            next_cursor=next_cursor,
         ),
         message="Success getting summaries",
     )
 
 
 @router.get("")
-def get_forecast_detail(
+async def get_forecast_detail(
     request: Request,
     get_forecast_detail_request: GetForecastDetailRequest = Depends(),
     forecast_uc: IForecastUseCase = Depends(ForecastUseCase),
 ):
-    res = forecast_uc.get_forecast_detail(request, get_forecast_detail_request)
+    res = await forecast_uc.get_forecast_detail(request, get_forecast_detail_request)
 
     return BasicResponse(data=res, message="Success getting forecast detail")
 
@@ -102,17 +104,16 @@ def confirm_forecast(
     "/pdf",
     summary="Generate Order Confirmation PDF",
 )
-def generate_forecast_pdf(
+async def generate_forecast_pdf(
     request: Request,
     get_forecast_detail_request: GetForecastDetailRequest = Depends(),
     forecast_uc: IForecastUseCase = Depends(ForecastUseCase),
 ):
-    print(request.base_url)
-    pdf_path = forecast_uc.generate_forecast_pdf(request, get_forecast_detail_request)
-
-    return FileResponse(
-        pdf_path,
-        media_type="application/pdf",
-        filename="forecast.pdf",
-        headers={"Content-Disposition": "inline; filename=forecast.pdf"},
-    )
+    pdf = await forecast_uc.generate_forecast_pdf(request, get_forecast_detail_request)
+
+    headers = {"ETag": pdf.etag, "Cache-Control": "no-cache"}
+    if pdf.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=http.HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    headers["Content-Disposition"] = "inline; filename=forecast.pdf"
+    return Response(pdf.content, media_type="application/pdf", headers=headers)
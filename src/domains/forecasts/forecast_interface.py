@@ -1,18 +1,13 @@
 import abc
-from typing import List
+from typing import Dict, List, Tuple
 
 from starlette.requests import Request
 
 from src.domains.forecasts.entities.va_forecast_detail_months import ForecastDetailMonth
 from src.domains.forecasts.entities.va_forecast_details import ForecastDetail
 from src.domains.forecasts.entities.va_forecasts import Forecast
-from src.domains.forecasts.entities.va_forecasts_archive import ForecastArchive
-from src.domains.forecasts.entities.va_forecasts_detail_archive import (
-    ForecastDetailArchive,
-)
-from src.domains.forecasts.entities.va_forecasts_detail_month_archive import (
-    ForecastDetailMonthArchive,
-)
+from src.models.dtos.pdf_dto import PdfDto
+from src.models.requests.allocation_request import SubmitAllocationAdjustmentRequest
 from src.models.requests.forecast_request import (
     CreateForecastRequest,
     GetForecastSummaryRequest,
@@ -36,13 +31,13 @@ class IForecastUseCase:
         pass
 
     @abc.abstractmethod
-    def get_forecast_summary(
+    async def get_forecast_summary(
         self, request: Request, query: GetForecastSummaryRequest
-    ) -> tuple[List[GetForecastSummaryResponse], int]:
+    ) -> tuple[List[GetForecastSummaryResponse], int, str | None]:
         pass
 
     @abc.abstractmethod
-    def get_forecast_detail(
+    async def get_forecast_detail(
         self, request: Request, get_forecast_detail_request: GetForecastDetailRequest
     ) -> GetForecastResponse:
         pass
@@ -59,9 +54,9 @@ class IForecastUseCase:
     ) -> None:
         pass
 
-    def generate_forecast_pdf(
+    async def generate_forecast_pdf(
         self, request: Request, get_pdf_request: GetForecastDetailRequest
-    ) -> str:
+    ) -> PdfDto:
         pass
 
 
@@ -81,6 +76,17 @@ class IForecastRepository:
     ) -> Forecast | None:
         pass
 
+    @abc.abstractmethod
+    async def find_forecast_async(
+        self,
+        request: Request,
+        forecast_id: str = None,
+        dealer_id: str = None,
+        month: int = None,
+        year: int = None,
+    ) -> Forecast | None:
+        pass
+
     @abc.abstractmethod
     def get_forecast(
         self,
@@ -92,6 +98,20 @@ class IForecastRepository:
     ) -> List[Forecast] | None:
         pass
 
+    @abc.abstractmethod
+    def count_forecast(self, request: Request, month: int, year: int) -> int:
+        pass
+
+    @abc.abstractmethod
+    def update_forecast_detail_month_adjustments(
+        self,
+        request: Request,
+        month: int,
+        year: int,
+        adjustments: List[SubmitAllocationAdjustmentRequest],
+    ) -> Dict[str, str]:
+        pass
+
     @abc.abstractmethod
     def create_forecast_detail(
         self, request: Request, forecast_detail: ForecastDetail
@@ -105,21 +125,47 @@ class IForecastRepository:
         pass
 
     @abc.abstractmethod
-    def get_forecast_summary_response(
+    async def get_forecast_summary_response(
         self, request: Request, query: GetForecastSummaryRequest
-    ) -> tuple[List[GetForecastSummaryResponse], int]:
+    ) -> tuple[List[GetForecastSummaryResponse], int, str | None]:
+        pass
+
+    @abc.abstractmethod
+    def refresh_forecast_period_stats(
+        self, request: Request, month: int, year: int
+    ) -> None:
         pass
 
     @abc.abstractmethod
-    def add_forecast_archive(
+    def get_forecast_stat_periods(self, request: Request) -> List[Tuple[int, int]]:
+        pass
+
+    @abc.abstractmethod
+    def archive_forecast(
         self,
         request: Request,
-        forecast_archive: ForecastArchive,
-        forecast_detail_archive: List[ForecastDetailArchive],
-        forecast_detail_month_archive: List[ForecastDetailMonthArchive],
+        forecast_id: str,
+        detail_ids: List[str] | None = None,
+        detail_month_ids: List[str] | None = None,
     ) -> None:
         pass
 
     @abc.abstractmethod
-    def delete_forecast(self, request: Request, forecast: Forecast) -> None:
+    def delete_forecast(self, request: Request, forecast_id: str) -> None:
+        pass
+
+    @abc.abstractmethod
+    def bulk_create_forecast(self, request: Request, forecast: Forecast) -> None:
+        pass
+
+    @abc.abstractmethod
+    def bulk_create_forecast_details(
+        self, request: Request, forecast_id: str, details: List[ForecastDetail]
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    def bulk_create_forecast_detail_months(
+        self, request: Request, months: List[ForecastDetailMonth]
+    ) -> None:
         pass
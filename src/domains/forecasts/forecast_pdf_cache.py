@@ -0,0 +1,49 @@
+import hashlib
+import json
+import threading
+from typing import Dict, Set, Tuple
+
+from cachetools import LRUCache
+
+from src.config.config import get_config
+
+_pdf_cache: LRUCache | None = None
+# (dealer_id, month, year) -> keys of the pdfs rendered for that forecast
+_pdf_keys: Dict[Tuple[str, int, int], Set[str]] = {}
+_pdf_cache_lock = threading.Lock()
+
+
+def _get_pdf_cache() -> LRUCache:
+    global _pdf_cache
+    if _pdf_cache is None:
+        _pdf_cache = LRUCache(maxsize=get_config().app.pdf_cache_size, getsizeof=len)
+    return _pdf_cache
+
+
+def get_forecast_pdf_key(data: dict) -> str:
+    # the pdf only depends on the forecast data, a changed forecast gets
+    # another key so a stale pdf is never served even before invalidation
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def get_cached_pdf(key: str) -> bytes | None:
+    with _pdf_cache_lock:
+        return _get_pdf_cache().get(key)
+
+
+def cache_pdf(dealer_id: str, month: int, year: int, key: str, content: bytes):
+    with _pdf_cache_lock:
+        cache = _get_pdf_cache()
+        if len(content) > cache.maxsize:
+            return
+        cache[key] = content
+        _pdf_keys.setdefault((dealer_id, month, year), set()).add(key)
+
+
+def invalidate_forecast_pdf(dealer_id: str, month: int, year: int) -> None:
+    with _pdf_cache_lock:
+        cache = _get_pdf_cache()
+        for key in _pdf_keys.pop((dealer_id, month, year), set()):
+            cache.pop(key, None)
@@ -2,17 +2,36 @@ import http
 import json
 
 import requests
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
 
 from fastapi import Depends, HTTPException
-from sqlalchemy import func, and_
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import (
+    Integer,
+    String,
+    and_,
+    column,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    union,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, selectinload
 from starlette.requests import Request
 
 from src.config.config import get_config
-from src.dependencies.database_dependency import get_va_db
+from src.dependencies.database_dependency import get_va_db, get_va_async_db
 from src.domains.forecasts.entities.va_forecast_detail_months import ForecastDetailMonth
 from src.domains.forecasts.entities.va_forecast_details import ForecastDetail
+from src.domains.forecasts.entities.va_forecast_period_stats import (
+    ForecastPeriodStat,
+)
 from src.domains.forecasts.entities.va_forecasts import Forecast
 from src.domains.forecasts.entities.va_forecasts_archive import ForecastArchive
 from src.domains.forecasts.entities.va_forecasts_detail_archive import (
@@ -24,19 +43,88 @@ from src.domains.forecasts.entities.va_forecasts_detail_month_archive import (
 from src.domains.forecasts.forecast_interface import IForecastRepository
 from src.domains.masters.entities.va_dealers import Dealer
 from src.domains.masters.entities.va_models import Model
+from src.models.requests.allocation_request import (
+    SubmitAllocationAdjustmentRequest,
+)
 from src.models.requests.forecast_request import (
     GetForecastSummaryRequest,
 )
 from src.models.responses.forecast_response import (
     GetForecastSummaryResponse,
 )
-from src.shared.utils.pagination import paginate
+from src.shared.entities.basemodel import BaseModel
+from src.shared.enums import PaginationCountEnum
+from src.shared.utils.date import is_date_string_format
+from src.shared.utils.pagination import count_async, paginate_keyset_async
+from src.shared.utils.xid import generate_xid
+
+FORECAST_INSERT_BATCH_SIZE = 1000
+FORECAST_UPDATE_BATCH_SIZE = 1000
+FORECAST_ARCHIVE_COLUMNS = [
+    "name",
+    "month",
+    "year",
+    "dealer_id",
+    "confirmed_at",
+    "created_by",
+    "updated_by",
+    "deleted_by",
+    "created_at",
+    "updated_at",
+]
+FORECAST_DETAIL_ARCHIVE_COLUMNS = [
+    "model_id",
+    "end_stock",
+    "forecast_id",
+    "created_by",
+    "updated_by",
+    "deleted_by",
+    "created_at",
+    "updated_at",
+]
+FORECAST_DETAIL_MONTH_ARCHIVE_COLUMNS = [
+    "forecast_month",
+    "forecast_detail_id",
+    "rs_gov",
+    "ws_gov",
+    "rs_priv",
+    "ws_priv",
+    "total_rs",
+    "prev_rs_gov",
+    "prev_rs_priv",
+    "total_prev_rs",
+    "total_ws",
+    "total_prev_final_conf_allocation",
+    "new_ws_req",
+    "hmsi_allocation",
+    "created_by",
+    "updated_by",
+    "deleted_by",
+    "created_at",
+    "updated_at",
+]
+
+
+def _get_rows(entities: List[BaseModel]) -> List[Dict[str, Any]]:
+    # a multi row VALUES needs the same keys in every row, attributes that
+    # were never set on any entity are left to their server defaults
+    columns = [
+        i.key
+        for i in inspect(type(entities[0])).column_attrs
+        if any(i.key in j.__dict__ for j in entities)
+    ]
+    return [{i: getattr(j, i) for i in columns} for j in entities]
 
 
 class ForecastRepository(IForecastRepository):
 
-    def __init__(self, va_db: Session = Depends(get_va_db)):
+    def __init__(
+        self,
+        va_db: Session = Depends(get_va_db),
+        va_async_db: AsyncSession = Depends(get_va_async_db),
+    ):
         self.va_db = va_db
+        self.va_async_db = va_async_db
 
     def get_va_db(self, request: Request) -> Session:
         return request.state.va_db if request.state.va_db is not None else self.va_db
@@ -67,15 +155,64 @@ class ForecastRepository(IForecastRepository):
         if year is not None:
             query = query.filter(Forecast.year == year)
 
-        query = query.join(
-            ForecastDetail,
-            and_(
-                ForecastDetail.forecast_id == Forecast.id, ForecastDetail.deletable == 0
-            ),
-        ).join(Model, and_(Model.id == ForecastDetail.model_id))
+        # a forecast whose details were all removed still owns its id
+        query = query.options(
+            selectinload(Forecast.details).selectinload(ForecastDetail.months)
+        )
 
         return query.first()
 
+    async def find_forecast_async(
+        self,
+        request: Request,
+        forecast_id: str = None,
+        dealer_id: str = None,
+        month: int = None,
+        year: int = None,
+    ) -> Forecast | None:
+        statement = select(Forecast).where(Forecast.deletable == 0)
+
+        if forecast_id is not None:
+            statement = statement.where(Forecast.id == forecast_id)
+
+        if dealer_id is not None:
+            statement = statement.where(Forecast.dealer_id == dealer_id)
+
+        if month is not None:
+            statement = statement.where(Forecast.month == month)
+
+        if year is not None:
+            statement = statement.where(Forecast.year == year)
+
+        # the forecast is picked first so the joined detail rows are never cut
+        # by the limit, details and models come with it in one statement and
+        # the months of every detail in one more
+        statement = (
+            select(Forecast)
+            .join(
+                ForecastDetail,
+                and_(
+                    ForecastDetail.forecast_id == Forecast.id,
+                    ForecastDetail.deletable == 0,
+                ),
+            )
+            .join(Model, Model.id == ForecastDetail.model_id)
+            .outerjoin(Dealer, Dealer.id == Forecast.dealer_id)
+            .where(
+                Forecast.id
+                == statement.with_only_columns(Forecast.id).limit(1).scalar_subquery()
+            )
+            .options(
+                contains_eager(Forecast.details).contains_eager(ForecastDetail.model),
+                contains_eager(Forecast.details).selectinload(
+                    ForecastDetail.months.and_(ForecastDetailMonth.deletable == 0)
+                ),
+                contains_eager(Forecast.dealer),
+            )
+        )
+
+        return (await self.va_async_db.execute(statement)).unique().scalars().first()
+
     def get_forecast(
         self,
         request: Request,
@@ -98,8 +235,79 @@ class ForecastRepository(IForecastRepository):
         if year is not None:
             query = query.filter(Forecast.year == year)
 
+        # only the live details and months are loaded, a whole month takes
+        # three statements whatever the number of dealers
+        query = query.options(
+            selectinload(
+                Forecast.details.and_(ForecastDetail.deletable == 0)
+            ).selectinload(
+                ForecastDetail.months.and_(ForecastDetailMonth.deletable == 0)
+            )
+        )
+
         return query.all()
 
+    def count_forecast(self, request: Request, month: int, year: int) -> int:
+        return self.get_va_db(request).scalar(
+            select(func.count(Forecast.id)).where(
+                and_(
+                    Forecast.month == month,
+                    Forecast.year == year,
+                    Forecast.deletable == 0,
+                )
+            )
+        )
+
+    def update_forecast_detail_month_adjustments(
+        self,
+        request: Request,
+        month: int,
+        year: int,
+        adjustments: List[SubmitAllocationAdjustmentRequest],
+    ) -> Dict[str, str]:
+        # one UPDATE ... FROM (VALUES ...) per batch, only live months of live
+        # forecasts of the period are touched, the model of every updated
+        # month is returned so the caller knows what was found. The table is
+        # updated directly since the ORM update drops RETURNING columns of the
+        # joined tables
+        updated = {}
+        for start in range(0, len(adjustments), FORECAST_UPDATE_BATCH_SIZE):
+            rows = values(
+                column("id", String),
+                column("adjustment", Integer),
+                column("hmsi_allocation", Integer),
+                name="adjustments",
+            ).data(
+                [
+                    (i.forecast_detail_month_id, i.adjustment, i.hmsi_allocation)
+                    for i in adjustments[start : start + FORECAST_UPDATE_BATCH_SIZE]
+                ]
+            )
+            statement = (
+                update(ForecastDetailMonth.__table__)
+                .where(
+                    and_(
+                        ForecastDetailMonth.id == rows.c.id,
+                        ForecastDetailMonth.deletable == 0,
+                        ForecastDetail.id == ForecastDetailMonth.forecast_detail_id,
+                        ForecastDetail.deletable == 0,
+                        Forecast.id == ForecastDetail.forecast_id,
+                        Forecast.deletable == 0,
+                        Forecast.month == month,
+                        Forecast.year == year,
+                    )
+                )
+                .values(
+                    adjustment=rows.c.adjustment,
+                    hmsi_allocation=rows.c.hmsi_allocation,
+                    updated_at=datetime.now(),
+                )
+                .returning(ForecastDetailMonth.id, ForecastDetail.model_id)
+            )
+            updated.update(self.get_va_db(request).execute(statement).tuples().all())
+
+        return updated
+
     def create_forecast_detail(
         self, request: Request, forecast_detail: ForecastDetail
     ) -> None:
@@ -112,125 +320,265 @@ class ForecastRepository(IForecastRepository):
         self.get_va_db(request).add(forecast_detail_month)
         self.get_va_db(request).flush()
 
-    def get_forecast_summary_response(
+    async def get_forecast_summary_response(
         self, request: Request, get_summary_request: GetForecastSummaryRequest
-    ) -> tuple[List[GetForecastSummaryResponse], int]:
+    ) -> tuple[List[GetForecastSummaryResponse], int, str | None]:
+        after = None
+        if get_summary_request.after is not None:
+            if not is_date_string_format(get_summary_request.after, "%Y-%m"):
+                raise HTTPException(
+                    status_code=http.HTTPStatus.BAD_REQUEST,
+                    detail="after must be in YYYY-MM format",
+                )
+            after = tuple(int(i) for i in get_summary_request.after.split("-"))
 
-        total_dealer = (
-            self.get_va_db(request).query(func.count(Dealer.id)).scalar_subquery()
-        )
+        total_dealer = select(func.count(Dealer.id)).scalar_subquery()
 
-        forecast_alias = aliased(Forecast)
+        # a period whose forecasts were all removed keeps its row with zeros
+        statement = select(
+            ForecastPeriodStat.month,
+            ForecastPeriodStat.year,
+            ForecastPeriodStat.dealer_submit,
+            (total_dealer - ForecastPeriodStat.dealer_submit).label(
+                "remaining_dealer_submit"
+            ),
+            ForecastPeriodStat.order_confirmation,
+        ).where(ForecastPeriodStat.dealer_submit > 0)
 
-        dealer_submit = (
-            self.get_va_db(request)
-            .query(
-                func.count(forecast_alias.dealer_id.distinct()).label("dealer_submit")
-            )
-            .filter(
-                forecast_alias.deletable == 0,
-                Forecast.year == forecast_alias.year,
-                Forecast.month == forecast_alias.month,
+        if (
+            get_summary_request.month is not None
+            and get_summary_request.year is not None
+        ):
+            statement = statement.where(
+                ForecastPeriodStat.month == get_summary_request.month,
+                ForecastPeriodStat.year == get_summary_request.year,
             )
-            .scalar_subquery()
+
+        res, has_next = await paginate_keyset_async(
+            self.va_async_db,
+            statement,
+            [ForecastPeriodStat.year, ForecastPeriodStat.month],
+            after,
+            get_summary_request.size,
+            (
+                0
+                if after is not None
+                else (get_summary_request.page - 1) * get_summary_request.size
+            ),
+        )
+        cnt = await count_async(
+            self.va_async_db,
+            statement,
+            get_summary_request.count == PaginationCountEnum.estimate,
         )
 
-        order_confirmation = (
-            self.get_va_db(request)
-            .query(func.count(forecast_alias.dealer_id.distinct()).label("total_oc"))
-            .join(
-                ForecastDetail,
-                and_(
-                    forecast_alias.id == ForecastDetail.forecast_id,
-                    ForecastDetail.deletable == 0,
-                ),
+        next_cursor = None
+        if has_next:
+            next_cursor = "{:04d}-{:02d}".format(res[-1].year, res[-1].month)
+
+        return (
+            [
+                GetForecastSummaryResponse(
+                    year=year,
+                    month=month,
+                    dealer_submit=dealer_submit,
+                    remaining_dealer_submit=remaining_dealer_submit,
+                    order_confirmation=order_confirmation,
+                )
+                for month, year, dealer_submit, remaining_dealer_submit, order_confirmation in res
+            ],
+            cnt,
+            next_cursor,
+        )
+
+    def refresh_forecast_period_stats(
+        self, request: Request, month: int, year: int
+    ) -> None:
+        session = self.get_va_db(request)
+        session.flush()
+
+        # writers of a period queue on its row, the counts are read once the
+        # lock is held so they include every forecast committed before
+        session.execute(
+            pg_insert(ForecastPeriodStat)
+            .values(year=year, month=month)
+            .on_conflict_do_nothing(index_elements=["year", "month"])
+        )
+        session.execute(
+            select(ForecastPeriodStat.year)
+            .where(
+                and_(ForecastPeriodStat.year == year, ForecastPeriodStat.month == month)
             )
+            .with_for_update()
+        )
+
+        confirmed_forecast_ids = (
+            select(ForecastDetail.forecast_id)
             .join(
                 ForecastDetailMonth,
                 and_(
                     ForecastDetailMonth.forecast_detail_id == ForecastDetail.id,
-                    ForecastDetail.deletable == 0,
+                    ForecastDetailMonth.deletable == 0,
                 ),
             )
-            .filter(
+            .where(
                 and_(
-                    forecast_alias.deletable == 0,
-                    forecast_alias.month == Forecast.month,
-                    forecast_alias.year == Forecast.year,
+                    ForecastDetail.deletable == 0,
                     ForecastDetailMonth.confirmed_total_ws.isnot(None),
                 )
             )
-            .scalar_subquery()
         )
+        dealer_submit, order_confirmation = session.execute(
+            select(
+                func.count(Forecast.dealer_id.distinct()),
+                func.count(Forecast.dealer_id.distinct()).filter(
+                    Forecast.id.in_(confirmed_forecast_ids)
+                ),
+            ).where(
+                and_(
+                    Forecast.month == month,
+                    Forecast.year == year,
+                    Forecast.deletable == 0,
+                )
+            )
+        ).one()
 
-        query = (
-            self.get_va_db(request)
-            .query(
-                Forecast.month.label("month"),
-                Forecast.year.label("year"),
-                dealer_submit.label("dealer_submit"),
-                (total_dealer - dealer_submit).label("remaining_dealer_submit"),
-                order_confirmation.label("order_confirmation"),
+        session.execute(
+            update(ForecastPeriodStat)
+            .where(
+                and_(ForecastPeriodStat.year == year, ForecastPeriodStat.month == month)
             )
-            .filter(Forecast.deletable == 0)
-            .group_by(
-                Forecast.month,
-                Forecast.year,
+            .values(
+                dealer_submit=dealer_submit,
+                order_confirmation=order_confirmation,
+                updated_at=datetime.now(),
             )
         )
 
-        if (
-            get_summary_request.month is not None
-            and get_summary_request.year is not None
-        ):
-            query = query.filter(
-                Forecast.month == get_summary_request.month,
-                Forecast.year == get_summary_request.year,
+    def get_forecast_stat_periods(self, request: Request) -> List[Tuple[int, int]]:
+        # every period with forecasts or a stats row, the reconciliation counts
+        # them again to repair writes that bypassed refresh_forecast_period_stats
+        periods = self.get_va_db(request).execute(
+            union(
+                select(Forecast.month, Forecast.year).where(Forecast.deletable == 0),
+                select(ForecastPeriodStat.month, ForecastPeriodStat.year),
             )
-
-        query = query.order_by(Forecast.year.desc(), Forecast.month.desc())
-
-        res, cnt = paginate(
-            query,
-            get_summary_request.page,
-            get_summary_request.size,
         )
+        return [(month, year) for month, year in periods.all()]
 
-        return [
-            GetForecastSummaryResponse(
-                year=year,
-                month=month,
-                dealer_submit=dealer_submit,
-                remaining_dealer_submit=remaining_dealer_submit,
-                order_confirmation=order_confirmation,
-            )
-            for month, year, dealer_submit, remaining_dealer_submit, order_confirmation in res
-        ], cnt
-
-    def add_forecast_archive(
+    def archive_forecast(
         self,
         request: Request,
-        forecast_archive: ForecastArchive,
-        forecast_detail_archive: List[ForecastDetailArchive],
-        forecast_detail_month_archive: List[ForecastDetailMonthArchive],
+        forecast_id: str,
+        detail_ids: List[str] | None = None,
+        detail_month_ids: List[str] | None = None,
     ) -> None:
-        self.get_va_db(request).add(forecast_archive)
-        self.get_va_db(request).add_all(forecast_detail_archive)
-        self.get_va_db(request).add_all(forecast_detail_month_archive)
-        self.get_va_db(request).flush()
+        # without ids the whole forecast is copied, with ids only those rows
+        session = self.get_va_db(request)
+
+        session.execute(
+            insert(ForecastArchive).from_select(
+                ["record_id", *FORECAST_ARCHIVE_COLUMNS],
+                select(
+                    Forecast.id,
+                    *[getattr(Forecast, i) for i in FORECAST_ARCHIVE_COLUMNS],
+                ).where(Forecast.id == forecast_id),
+            )
+        )
 
-    def delete_forecast(self, request: Request, forecast: Forecast) -> None:
-        for i in forecast.details:
-            self.get_va_db(request).query(ForecastDetailMonth).filter(
-                ForecastDetailMonth.forecast_detail_id.in_([i.id])
-            ).delete()
+        if detail_ids is None or len(detail_ids) > 0:
+            statement = select(
+                ForecastDetail.id,
+                *[getattr(ForecastDetail, i) for i in FORECAST_DETAIL_ARCHIVE_COLUMNS],
+            ).where(ForecastDetail.forecast_id == forecast_id)
+            if detail_ids is not None:
+                statement = statement.where(ForecastDetail.id.in_(detail_ids))
+
+            session.execute(
+                insert(ForecastDetailArchive).from_select(
+                    ["record_id", *FORECAST_DETAIL_ARCHIVE_COLUMNS], statement
+                )
+            )
 
-        self.get_va_db(request).query(ForecastDetail).filter(
-            ForecastDetail.forecast_id.in_([forecast.id])
-        ).delete()
+        if detail_month_ids is None or len(detail_month_ids) > 0:
+            statement = select(
+                ForecastDetailMonth.id,
+                *[
+                    getattr(ForecastDetailMonth, i)
+                    for i in FORECAST_DETAIL_MONTH_ARCHIVE_COLUMNS
+                ],
+            ).where(
+                ForecastDetailMonth.forecast_detail_id.in_(
+                    select(ForecastDetail.id).where(
+                        ForecastDetail.forecast_id == forecast_id
+                    )
+                )
+            )
+            if detail_month_ids is not None:
+                statement = statement.where(
+                    ForecastDetailMonth.id.in_(detail_month_ids)
+                )
 
-        self.get_va_db(request).query(Forecast).filter(
-            and_(Forecast.id == forecast.id)
-        ).delete()
+            session.execute(
+                insert(ForecastDetailMonthArchive).from_select(
+                    ["record_id", *FORECAST_DETAIL_MONTH_ARCHIVE_COLUMNS], statement
+                )
+            )
 
-        self.get_va_db(request).flush()
+    def delete_forecast(self, request: Request, forecast_id: str) -> None:
+        session = self.get_va_db(request)
+
+        session.execute(
+            delete(ForecastDetailMonth).where(
+                ForecastDetailMonth.forecast_detail_id.in_(
+                    select(ForecastDetail.id).where(
+                        ForecastDetail.forecast_id == forecast_id
+                    )
+                )
+            )
+        )
+        session.execute(
+            delete(ForecastDetail).where(ForecastDetail.forecast_id == forecast_id)
+        )
+        session.execute(delete(Forecast).where(Forecast.id == forecast_id))
+
+    def bulk_create_forecast(self, request: Request, forecast: Forecast) -> None:
+        # core inserts skip the mapper events, ids and created_at are set here
+        forecast.created_at = datetime.now()
+        self.get_va_db(request).execute(insert(Forecast).values(_get_rows([forecast])))
+        self.bulk_create_forecast_details(request, forecast.id, forecast.details)
+
+    def bulk_create_forecast_details(
+        self, request: Request, forecast_id: str, details: List[ForecastDetail]
+    ) -> None:
+        now = datetime.now()
+        for i in details:
+            i.forecast_id = forecast_id
+            i.created_at = now
+            for j in i.months:
+                j.forecast_detail_id = i.id
+
+        self._bulk_insert(request, ForecastDetail, details)
+        self.bulk_create_forecast_detail_months(
+            request, [j for i in details for j in i.months]
+        )
+
+    def bulk_create_forecast_detail_months(
+        self, request: Request, months: List[ForecastDetailMonth]
+    ) -> None:
+        now = datetime.now()
+        for i in months:
+            i.id = generate_xid()
+            i.created_at = now
+
+        self._bulk_insert(request, ForecastDetailMonth, months)
+
+    def _bulk_insert(
+        self, request: Request, entity: type[BaseModel], rows: List[BaseModel]
+    ) -> None:
+        for start in range(0, len(rows), FORECAST_INSERT_BATCH_SIZE):
+            self.get_va_db(request).execute(
+                insert(entity).values(
+                    _get_rows(rows[start : start + FORECAST_INSERT_BATCH_SIZE])
+                )
+            )
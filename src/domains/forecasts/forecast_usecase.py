@@ -1,40 +1,45 @@
 import base64
 import http
-import os
 import uuid
 from datetime import datetime, timezone, timedelta
-from pathlib import Path
-import re
-from typing import List, Dict
-import requests
+from typing import Any, List, Dict, Set, Tuple
+import httpx
 
 from src.config.config import get_config
 from fastapi import Depends, HTTPException, UploadFile
+from fastapi.encoders import jsonable_encoder
 import openpyxl
 from starlette.requests import Request
 
+from src.domains.allocations.allocation_interface import IAllocationRepository
+from src.domains.allocations.allocation_repository import AllocationRepository
 from src.domains.calculations.calculation_interface import ICalculationRepository
 from src.domains.calculations.calculation_repository import CalculationRepository
 from src.domains.forecasts.entities.va_forecast_detail_months import ForecastDetailMonth
 from src.domains.forecasts.entities.va_forecast_details import ForecastDetail
 from src.domains.forecasts.entities.va_forecasts import Forecast
-from src.domains.forecasts.entities.va_forecasts_archive import ForecastArchive
-from src.domains.forecasts.entities.va_forecasts_detail_archive import (
-    ForecastDetailArchive,
-)
-from src.domains.forecasts.entities.va_forecasts_detail_month_archive import (
-    ForecastDetailMonthArchive,
-)
 from src.domains.forecasts.entities.va_monthly_target_details import MonthlyTargetDetail
 from src.domains.forecasts.entities.va_monthly_targets import MonthlyTarget
+from src.domains.forecasts.enums import ForecastUpsertModeEnum
 from src.domains.forecasts.forecast_interface import (
     IForecastUseCase,
     IForecastRepository,
 )
+from src.domains.forecasts.forecast_pdf_cache import (
+    cache_pdf,
+    get_cached_pdf,
+    get_forecast_pdf_key,
+    invalidate_forecast_pdf,
+)
 from src.domains.forecasts.forecast_repository import ForecastRepository
 from src.domains.masters.entities.va_dealers import Dealer
 from src.domains.masters.master_interface import IMasterRepository
 from src.domains.masters.master_repository import MasterRepository
+from src.infrastructures.outbounds.session import (
+    outbound_async_client,
+    outbound_semaphore,
+)
+from src.models.dtos.pdf_dto import PdfDto
 from src.models.requests.allocation_request import GetAllocationRequest
 from src.models.requests.forecast_request import (
     CreateForecastRequest,
@@ -42,6 +47,8 @@ from src.models.requests.forecast_request import (
     GetForecastDetailRequest,
     ConfirmForecastRequest,
     ApprovalAllocationRequest,
+    ForecastDetailRequest,
+    FORECAST_DETAIL_MONTH_FIELDS,
 )
 from src.models.responses.allocation_response import (
     GetAllocationAdjustmentResponse,
@@ -66,7 +73,6 @@ from src.shared.utils.file_utils import (
     save_upload_file,
 )
 from src.shared.utils.parser import to_dict
-from src.shared.utils.xid import generate_xid
 
 
 class ForecastUseCase(IForecastUseCase):
@@ -76,10 +82,12 @@ class ForecastUseCase(IForecastUseCase):
         forecast_repo: IForecastRepository = Depends(ForecastRepository),
         master_repo: IMasterRepository = Depends(MasterRepository),
         calculation_repo: ICalculationRepository = Depends(CalculationRepository),
+        allocation_repo: IAllocationRepository = Depends(AllocationRepository),
     ):
         self.forecast_repo = forecast_repo
         self.master_repo = master_repo
         self.calculation_repo = calculation_repo
+        self.allocation_repo = allocation_repo
 
     def upsert_forecast(
         self, request: Request, create_forecast_request: CreateForecastRequest
@@ -89,6 +97,15 @@ class ForecastUseCase(IForecastUseCase):
         forecast = self.forecast_repo.find_forecast(
             request, create_forecast_request.record_id
         )
+        stale_pdfs = {
+            (
+                create_forecast_request.dealer_code,
+                create_forecast_request.month,
+                create_forecast_request.year,
+            )
+        }
+        if forecast is not None:
+            stale_pdfs.add((forecast.dealer_id, forecast.month, forecast.year))
 
         dealer = self.master_repo.upsert_dealer(
             request,
@@ -98,9 +115,61 @@ class ForecastUseCase(IForecastUseCase):
             ),
         )
 
+        model_ids = [i.model_variant for i in create_forecast_request.details]
+        models = self.master_repo.find_models_by_ids(request, model_ids)
+        not_found = list(dict.fromkeys(i for i in model_ids if i not in models))
+        if len(not_found) > 0:
+            raise HTTPException(
+                status_code=http.HTTPStatus.BAD_REQUEST,
+                detail=f"Model {', '.join(not_found)} not found",
+            )
+
+        new_details: Dict[str, ForecastDetail] = {
+            i.record_id: self.convert_request_to_detail(request, i)
+            for i in create_forecast_request.details
+        }
+
+        if (
+            forecast is not None
+            and get_config().app.forecast_upsert_mode
+            == ForecastUpsertModeEnum.DIFF.value
+            and forecast.month == create_forecast_request.month
+            and forecast.year == create_forecast_request.year
+        ):
+            changed, affected_model_ids = self.diff_forecast(
+                request,
+                forecast,
+                {
+                    "name": create_forecast_request.record_name,
+                    "dealer_id": dealer.id,
+                },
+                new_details,
+            )
+            if not changed:
+                # only a renamed dealer may have been written
+                commit(request, Database.VEHICLE_ALLOCATION)
+                return
+
+            if len(affected_model_ids) > 0:
+                self.allocation_repo.refresh_allocation_snapshot(
+                    request, forecast.month, forecast.year, affected_model_ids
+                )
+            self.forecast_repo.refresh_forecast_period_stats(
+                request, forecast.month, forecast.year
+            )
+
+            commit(request, Database.VEHICLE_ALLOCATION)
+            for i in stale_pdfs:
+                invalidate_forecast_pdf(*i)
+            return
+
+        affected_periods = {}
         if forecast is not None:
-            self.archive_forecast(request, forecast)
-            self.forecast_repo.delete_forecast(request, forecast)
+            affected_periods[(forecast.month, forecast.year)] = {
+                i.model_id for i in forecast.details
+            }
+            self.forecast_repo.archive_forecast(request, forecast.id)
+            self.forecast_repo.delete_forecast(request, forecast.id)
 
         forecast = Forecast()
 
@@ -110,88 +179,155 @@ class ForecastUseCase(IForecastUseCase):
         forecast.year = create_forecast_request.year
         forecast.month = create_forecast_request.month
 
-        new_details: Dict[str, ForecastDetail] = {
-            i["record_id"]: self.convert_request_to_detail(request, i)
-            for i in create_forecast_request.details
-        }
+        forecast.details = list(new_details.values())
+        self.forecast_repo.bulk_create_forecast(request, forecast)
 
-        new_detail_months: Dict[str, Dict[int, ForecastDetailMonth]] = {}
+        affected_periods.setdefault((forecast.month, forecast.year), set()).update(
+            model_ids
+        )
+        # periods are locked in order, an upsert moving a forecast the other
+        # way round would otherwise wait on ours while we wait on it
+        for (month, year), period_model_ids in sorted(
+            affected_periods.items(), key=lambda i: (i[0][1], i[0][0])
+        ):
+            self.allocation_repo.refresh_allocation_snapshot(
+                request, month, year, period_model_ids
+            )
+            self.forecast_repo.refresh_forecast_period_stats(request, month, year)
 
-        for i in new_details.values():
-            if i.id not in new_detail_months:
-                new_detail_months[i.id] = {}
+        commit(request, Database.VEHICLE_ALLOCATION)
+        for i in stale_pdfs:
+            invalidate_forecast_pdf(*i)
 
-            for j in i.months:
-                new_detail_months[i.id][j.forecast_month] = j
+    def diff_forecast(
+        self,
+        request: Request,
+        forecast: Forecast,
+        forecast_values: Dict[str, Any],
+        new_details: Dict[str, ForecastDetail],
+    ) -> Tuple[bool, Set[str]]:
+        # only the columns sent by HOYU are compared, adjustments and
+        # confirmations of the months that are kept stay as they are, returns
+        # whether anything changed and the models whose allocation did
+        changes: List[Tuple[Any, Dict[str, Any]]] = []
+        inserted_details: List[ForecastDetail] = []
+        inserted_months: List[ForecastDetailMonth] = []
+        affected_model_ids = set()
+
+        forecast_changes = {
+            k: v for k, v in forecast_values.items() if getattr(forecast, k) != v
+        }
+        if len(forecast_changes) > 0:
+            changes.append((forecast, forecast_changes))
+        if "dealer_id" in forecast_changes:
+            # every snapshot row of the forecast carries its dealer
+            affected_model_ids.update(
+                i.model_id for i in forecast.details if i.deletable == 0
+            )
 
-        forecast.details = list(new_details.values())
-        self.forecast_repo.create_forecast(request, forecast)
-        commit(request, Database.VEHICLE_ALLOCATION)
+        stored_details = {i.id: i for i in forecast.details}
+        for detail in new_details.values():
+            stored_detail = stored_details.get(detail.id)
+            if stored_detail is None:
+                inserted_details.append(detail)
+                affected_model_ids.add(detail.model_id)
+                continue
+
+            detail_changes = {
+                k: getattr(detail, k)
+                for k in ["model_id", "end_stock"]
+                if getattr(stored_detail, k) != getattr(detail, k)
+            }
+            stored_months = {
+                j.forecast_month: j for j in stored_detail.months if j.deletable == 0
+            }
+            if stored_detail.deletable != 0:
+                detail_changes["deletable"] = 0
+                stored_months = {}
+            if len(detail_changes) > 0:
+                changes.append((stored_detail, detail_changes))
+                affected_model_ids.update([stored_detail.model_id, detail.model_id])
+
+            for month in detail.months:
+                stored_month = stored_months.pop(month.forecast_month, None)
+                if stored_month is None:
+                    month.forecast_detail_id = stored_detail.id
+                    inserted_months.append(month)
+                    affected_model_ids.add(detail.model_id)
+                    continue
+
+                month_changes = {
+                    k: getattr(month, k)
+                    for k in FORECAST_DETAIL_MONTH_FIELDS
+                    if getattr(stored_month, k) != getattr(month, k)
+                }
+                if len(month_changes) > 0:
+                    changes.append((stored_month, month_changes))
+                    affected_model_ids.add(detail.model_id)
+
+            for month in stored_months.values():
+                changes.append((month, {"deletable": 1}))
+                affected_model_ids.add(stored_detail.model_id)
+
+        for detail in stored_details.values():
+            if detail.deletable == 0 and detail.id not in new_details:
+                changes.append((detail, {"deletable": 1}))
+                changes += [
+                    (j, {"deletable": 1}) for j in detail.months if j.deletable == 0
+                ]
+                affected_model_ids.add(detail.model_id)
+
+        if (
+            len(changes) == 0
+            and len(inserted_details) == 0
+            and len(inserted_months) == 0
+        ):
+            return False, affected_model_ids
+
+        # the archive keeps the previous version of the rows that change
+        self.forecast_repo.archive_forecast(
+            request,
+            forecast.id,
+            [i.id for i, _ in changes if isinstance(i, ForecastDetail)],
+            [i.id for i, _ in changes if isinstance(i, ForecastDetailMonth)],
+        )
 
-    def get_forecast_summary(
-        self, request: Request, query: GetForecastSummaryRequest
-    ) -> tuple[List[GetForecastSummaryResponse], int]:
-        data, total_count = self.forecast_repo.get_forecast_summary_response(
-            request, query
+        for entity, values in changes:
+            for k, v in values.items():
+                setattr(entity, k, v)
+
+        self.forecast_repo.bulk_create_forecast_details(
+            request, forecast.id, inserted_details
         )
+        self.forecast_repo.bulk_create_forecast_detail_months(request, inserted_months)
 
-        return data, total_count
+        return True, affected_model_ids
+
+    async def get_forecast_summary(
+        self, request: Request, query: GetForecastSummaryRequest
+    ) -> tuple[List[GetForecastSummaryResponse], int, str | None]:
+        return await self.forecast_repo.get_forecast_summary_response(request, query)
 
     def convert_request_to_detail(
-        self, request: Request, detail: dict
+        self, request: Request, detail: ForecastDetailRequest
     ) -> ForecastDetail:
-        pattern = r"n(\d+)_(rs_gov|ws_gov|rs_priv|ws_priv|total_rs|prev_rs_gov|prev_rs_priv|total_prev_rs|total_ws|new_ws_req|hmsi_allocation)$"
-        months_map: Dict[str, ForecastDetailMonth] = {}
-        for k, v in detail.items():
-            match = re.match(pattern, k)
-            if match:
-                if match.group(1) not in months_map:
-                    months_map[match.group(1)] = ForecastDetailMonth(
-                        forecast_month=int(match.group(1)),
-                        forecast_detail_id=detail["dealer_forecast_id"],
-                    )
-                if match.group(2) == "rs_gov":
-                    months_map[match.group(1)].rs_gov = v
-                if match.group(2) == "ws_gov":
-                    months_map[match.group(1)].ws_gov = v
-                if match.group(2) == "rs_priv":
-                    months_map[match.group(1)].rs_priv = v
-                if match.group(2) == "ws_priv":
-                    months_map[match.group(1)].ws_priv = v
-                if match.group(2) == "total_rs":
-                    months_map[match.group(1)].total_rs = v
-                if match.group(2) == "prev_rs_gov":
-                    months_map[match.group(1)].prev_rs_gov = v
-                if match.group(2) == "prev_rs_priv":
-                    months_map[match.group(1)].prev_rs_priv = v
-                if match.group(2) == "total_prev_rs":
-                    months_map[match.group(1)].total_prev_rs = v
-                if match.group(2) == "total_ws":
-                    months_map[match.group(1)].total_ws = v
-                if match.group(2) == "new_ws_req":
-                    months_map[match.group(1)].new_ws_req = v
-                if match.group(2) == "hmsi_allocation":
-                    months_map[match.group(1)].hmsi_allocation = v
-
-        model = self.master_repo.find_model(request, detail["model_variant"])
-
-        if model is None:
-            raise HTTPException(
-                status_code=http.HTTPStatus.BAD_REQUEST,
-                detail=f"Model {detail['model_variant']} not found",
-            )
-
         return ForecastDetail(
-            model_id=detail["model_variant"],
-            end_stock=detail["end_stock"],
-            id=detail["record_id"],
-            months=[i for i in months_map.values()],
+            model_id=detail.model_variant,
+            end_stock=detail.end_stock,
+            id=detail.record_id,
+            months=[
+                ForecastDetailMonth(
+                    forecast_detail_id=detail.dealer_forecast_id,
+                    **i.model_dump(exclude_unset=True),
+                )
+                for i in detail.months.values()
+            ],
         )
 
-    def get_forecast_detail(
+    async def get_forecast_detail(
         self, request: Request, get_forecast_detail_request: GetForecastDetailRequest
     ) -> GetForecastResponse:
-        data = self.forecast_repo.find_forecast(
+        data = await self.forecast_repo.find_forecast_async(
             request,
             month=get_forecast_detail_request.month,
             year=get_forecast_detail_request.year,
@@ -212,9 +348,15 @@ class ForecastUseCase(IForecastUseCase):
         )
 
         for i in data.details:
+            if i.deletable != 0:
+                continue
+
             months = []
 
             for j in i.months:
+                if j.deletable != 0:
+                    continue
+
                 months.append(
                     GetForecastDetailMonthResponse(
                         forecast_month=j.forecast_month,
@@ -282,141 +424,73 @@ class ForecastUseCase(IForecastUseCase):
 
         detail_map = {}
         for detail in forecast.details:
-            detail_map[detail.id] = detail
+            if detail.deletable == 0:
+                detail_map[detail.id] = detail
 
         for request_detail in confirm_request.data:
-            if request_detail["record_id"] in detail_map:
-                i = detail_map[request_detail["record_id"]]
-                if i.model_id == request_detail["model_variant"]:
-                    pattern = r"n(\d+)_(ws_gov_conf|ws_priv_conf|total_ws_conf)"
-                    detail_months_map = {}
-                    for k, v in request_detail.items():
-                        match = re.match(pattern, k)
-                        if match:
-                            if match.group(1) not in detail_months_map:
-                                detail_months_map[match.group(1)] = {}
-                            if match.group(2) == "ws_gov_conf":
-                                detail_months_map[match.group(1)]["ws_gov_conf"] = v
-                            if match.group(2) == "ws_priv_conf":
-                                detail_months_map[match.group(1)]["ws_priv_conf"] = v
-                            if match.group(2) == "total_ws_conf":
-                                detail_months_map[match.group(1)]["total_ws_conf"] = v
-
-                    for j in detail_map[request_detail["record_id"]].months:
-                        if str(j.forecast_month) in detail_months_map:
-                            j.confirmed_total_ws = detail_months_map[
-                                str(j.forecast_month)
-                            ]["total_ws_conf"]
-                            j.confirmed_ws_gov = detail_months_map[
-                                str(j.forecast_month)
-                            ]["ws_gov_conf"]
-                            j.confirmed_ws_priv = detail_months_map[
-                                str(j.forecast_month)
-                            ]["ws_priv_conf"]
+            if request_detail.record_id in detail_map:
+                i = detail_map[request_detail.record_id]
+                if i.model_id == request_detail.model_variant:
+                    for j in i.months:
+                        if (
+                            j.deletable == 0
+                            and j.forecast_month in request_detail.months
+                        ):
+                            month = request_detail.months[j.forecast_month]
+                            j.confirmed_total_ws = month.total_ws_conf
+                            j.confirmed_ws_gov = month.ws_gov_conf
+                            j.confirmed_ws_priv = month.ws_priv_conf
+
+        self.allocation_repo.refresh_allocation_snapshot(
+            request,
+            forecast.month,
+            forecast.year,
+            [i.model_id for i in forecast.details],
+        )
+        self.forecast_repo.refresh_forecast_period_stats(
+            request, forecast.month, forecast.year
+        )
 
         commit(request, Database.VEHICLE_ALLOCATION)
+        invalidate_forecast_pdf(forecast.dealer_id, forecast.month, forecast.year)
         return res
 
-    def archive_forecast(self, request: Request, forecast: Forecast):
-        archive = ForecastArchive(
-            record_id=forecast.id,
-            name=forecast.name,
-            month=forecast.month,
-            year=forecast.year,
-            dealer_id=forecast.dealer_id,
-            confirmed_at=forecast.confirmed_at,
-            created_by=forecast.created_by,
-            updated_by=forecast.updated_by,
-            deleted_by=forecast.deleted_by,
-            created_at=forecast.created_at,
-            updated_at=forecast.updated_at,
-        )
-
-        archive_details = []
-        archive_month_details = []
-
-        for i in forecast.details:
-            archive_details.append(
-                ForecastDetailArchive(
-                    record_id=i.id,
-                    model_id=i.model_id,
-                    end_stock=i.end_stock,
-                    forecast_id=i.forecast_id,
-                    created_by=i.created_by,
-                    updated_by=i.updated_by,
-                    deleted_by=i.deleted_by,
-                    created_at=i.created_at,
-                    updated_at=i.updated_at,
-                )
-            )
-
-            for j in i.months:
-                archive_month_details.append(
-                    ForecastDetailMonthArchive(
-                        record_id=j.id,
-                        forecast_month=j.forecast_month,
-                        forecast_detail_id=j.forecast_detail_id,
-                        rs_gov=j.rs_gov,
-                        ws_gov=j.ws_gov,
-                        rs_priv=j.rs_priv,
-                        ws_priv=j.ws_priv,
-                        total_rs=j.total_rs,
-                        prev_rs_gov=j.prev_rs_gov,
-                        prev_rs_priv=j.prev_rs_priv,
-                        total_prev_rs=j.total_prev_rs,
-                        total_ws=j.total_ws,
-                        total_prev_final_conf_allocation=j.total_prev_final_conf_allocation,
-                        new_ws_req=j.new_ws_req,
-                        hmsi_allocation=j.hmsi_allocation,
-                        created_by=j.created_by,
-                        updated_by=j.updated_by,
-                        deleted_by=j.deleted_by,
-                        created_at=j.created_at,
-                        updated_at=j.updated_at,
-                    )
-                )
-
-        self.forecast_repo.add_forecast_archive(
-            request, archive, archive_details, archive_month_details
-        )
-
-    def generate_forecast_pdf(
+    async def generate_forecast_pdf(
         self, request: Request, get_pdf_request: GetForecastDetailRequest
-    ) -> str:
-        try:
-            forecast = self.get_forecast_detail(
-                request,
-                get_pdf_request,
-            )
+    ) -> PdfDto:
+        forecast = await self.get_forecast_detail(request, get_pdf_request)
+        forecast_data_dict = forecast.model_dump()
 
-            forecast_data_dict = forecast.model_dump()
+        key = get_forecast_pdf_key(forecast_data_dict)
+        content = get_cached_pdf(key)
+        if content is not None:
+            return PdfDto(content=content, etag='"{}"'.format(key))
 
-            res = requests.post(
-                "{}/pdf/vehicle-allocation/oc?api_key={}".format(
-                    get_config().outbound["pdf"].base_url,
-                    get_config().outbound["pdf"].api_key,
-                ),
-                json={"data": forecast_data_dict},
-                timeout=10,
-                headers={"Content-Type": "application/json"},
-            )
-
-            if res.status_code != 200:
-                raise HTTPException(
-                    status_code=res.status_code, detail="Failed to generate pdf"
+        outbound = get_config().outbound["pdf"]
+        try:
+            async with outbound_semaphore("pdf"):
+                res = await outbound_async_client("pdf").post(
+                    "/pdf/vehicle-allocation/oc",
+                    params={"api_key": outbound.api_key},
+                    json={"data": jsonable_encoder(forecast_data_dict)},
                 )
-
-            upload_dir = os.path.join(os.getcwd(), "storage/temp/pdfs")
-            if not os.path.exists(upload_dir):
-                os.makedirs(upload_dir)
-            file_name = upload_dir + "/" + generate_xid() + ".pdf"
-
-            with open(file_name, "wb") as f:
-                file_content = base64.b64decode(res.text)
-                f.write(file_content)
-            return file_name
-        except requests.exceptions.Timeout as e:
+        except httpx.TimeoutException:
             raise HTTPException(
                 status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
                 detail="Outbound Timeout: pdf/vehicle-allocation/oc",
             )
+
+        if res.status_code != 200:
+            raise HTTPException(
+                status_code=res.status_code, detail="Failed to generate pdf"
+            )
+
+        content = base64.b64decode(res.text)
+        cache_pdf(
+            get_pdf_request.dealer_id,
+            get_pdf_request.month,
+            get_pdf_request.year,
+            key,
+            content,
+        )
+        return PdfDto(content=content, etag='"{}"'.format(key))
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    JSON,
+    DateTime,
+    Enum,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.orm import MappedColumn, mapped_column
+
+from src.domains.jobs.enums import JobStatusEnum, JobTypeEnum
+from src.shared.entities.basemodel import BaseModel
+from src.shared.utils.xid import generate_xid
+
+
+class Job(BaseModel):
+    __tablename__ = "va_jobs"
+    __table_args__ = (
+        Index("ix_va_jobs_type_period", "type", "year", "month"),
+        Index("ix_va_jobs_status_created_at", "status", "created_at"),
+    )
+
+    id: MappedColumn[str] = mapped_column(String(255), primary_key=True)
+    type: MappedColumn[JobTypeEnum] = mapped_column(Enum(JobTypeEnum), nullable=False)
+    status: MappedColumn[JobStatusEnum] = mapped_column(
+        Enum(JobStatusEnum), nullable=False
+    )
+    month: MappedColumn[int] = mapped_column(Integer, nullable=True)
+    year: MappedColumn[int] = mapped_column(Integer, nullable=True)
+    params: MappedColumn[dict] = mapped_column(JSON, nullable=False)
+    progress: MappedColumn[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0")
+    )
+    attempts: MappedColumn[int] = mapped_column(
+        Integer, nullable=False, server_default=text("0")
+    )
+    error: MappedColumn[str] = mapped_column(Text, nullable=True)
+    created_by: MappedColumn[str] = mapped_column(String(255), nullable=True)
+    started_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    finished_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    created_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+@event.listens_for(Job, "before_insert")
+def before_insert(mapper, connection, target: Job):
+    target.id = generate_xid()
+    target.created_at = datetime.now()
+
+
+@event.listens_for(Job, "before_update")
+def before_update(mapper, connection, target: Job):
+    target.updated_at = datetime.now()
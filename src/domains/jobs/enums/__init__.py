@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class JobTypeEnum(Enum):
+    CALCULATION_TAKE_OFF = "CALCULATION_TAKE_OFF"
+    CALCULATION_BOOKING = "CALCULATION_BOOKING"
+    MONTHLY_TARGET = "MONTHLY_TARGET"
+    HOYU_DISPATCH = "HOYU_DISPATCH"
+
+
+class JobStatusEnum(Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
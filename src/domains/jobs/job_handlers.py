@@ -0,0 +1,80 @@
+from typing import Callable, Dict
+
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from src.domains.allocations.allocation_repository import AllocationRepository
+from src.domains.allocations.allocation_usecase import AllocationUseCase
+from src.domains.calculations.calculation_repository import CalculationRepository
+from src.domains.calculations.calculation_usecase import CalculationUseCase
+from src.domains.forecasts.forecast_repository import ForecastRepository
+from src.domains.jobs.entities.jobs import Job
+from src.domains.jobs.enums import JobTypeEnum
+from src.domains.masters.master_repository import MasterRepository
+from src.domains.uploads.upload_repository import UploadRepository
+from src.models.requests.forecast_request import ApprovalAllocationRequest
+
+# the use cases are built by hand because there is no FastAPI dependency
+# injection outside of a request
+
+
+def _calculation_uc(va_db: Session) -> CalculationUseCase:
+    return CalculationUseCase(
+        CalculationRepository(va_db),
+        MasterRepository(va_db),
+        AllocationRepository(va_db, None),
+        UploadRepository(va_db),
+    )
+
+
+def _allocation_uc(va_db: Session) -> AllocationUseCase:
+    return AllocationUseCase(
+        AllocationRepository(va_db, None),
+        MasterRepository(va_db),
+        ForecastRepository(va_db, None),
+        UploadRepository(va_db),
+    )
+
+
+def run_calculation_take_off(request: Request, va_db: Session, job: Job) -> None:
+    _calculation_uc(va_db).upsert_take_off_data(
+        request,
+        job.params["path"],
+        job.month,
+        job.year,
+        job.params.get("content_hash"),
+    )
+
+
+def run_calculation_booking(request: Request, va_db: Session, job: Job) -> None:
+    _calculation_uc(va_db).upsert_bo_soa_oc_booking_prospect(
+        request,
+        job.params["path"],
+        job.month,
+        job.year,
+        job.params.get("content_hash"),
+    )
+
+
+def run_monthly_target(request: Request, va_db: Session, job: Job) -> None:
+    _allocation_uc(va_db).upsert_monthly_target(
+        request,
+        job.params["path"],
+        job.month,
+        job.year,
+        job.params.get("content_hash"),
+    )
+
+
+def run_hoyu_dispatch(request: Request, va_db: Session, job: Job) -> None:
+    _allocation_uc(va_db).send_allocation_to_hoyu(
+        request, ApprovalAllocationRequest(month=job.month, year=job.year)
+    )
+
+
+JOB_HANDLERS: Dict[JobTypeEnum, Callable[[Request, Session, Job], None]] = {
+    JobTypeEnum.CALCULATION_TAKE_OFF: run_calculation_take_off,
+    JobTypeEnum.CALCULATION_BOOKING: run_calculation_booking,
+    JobTypeEnum.MONTHLY_TARGET: run_monthly_target,
+    JobTypeEnum.HOYU_DISPATCH: run_hoyu_dispatch,
+}
@@ -0,0 +1,56 @@
+import math
+
+from fastapi import APIRouter, Depends
+from starlette.requests import Request
+
+from src.domains.jobs.job_interface import IJobUseCase
+from src.domains.jobs.job_usecase import JobUseCase
+from src.models.requests.job_request import GetJobsRequest
+from src.models.responses.basic_response import (
+    BasicResponse,
+    PaginationMetadata,
+    PaginationResponse,
+)
+from src.models.responses.job_response import JobResponse
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+@router.get(
+    "",
+    response_model=PaginationResponse[JobResponse],
+    summary="Get Jobs",
+    description="Get background jobs filtered by type, status and period",
+)
+def get_jobs(
+    request: Request,
+    query: GetJobsRequest = Depends(),
+    job_uc: IJobUseCase = Depends(JobUseCase),
+) -> PaginationResponse[JobResponse]:
+    res, cnt = job_uc.get_jobs(request, query)
+
+    return PaginationResponse(
+        data=res,
+        metadata=PaginationMetadata(
+            page=query.page,
+            size=query.size,
+            total_count=cnt,
+            page_count=math.ceil(cnt / query.size),
+        ),
+        message="Success getting jobs",
+    )
+
+
+@router.get(
+    "/{id}",
+    response_model=BasicResponse[JobResponse],
+    summary="Get Job",
+    description="Get the status, progress and error of a background job",
+)
+def get_job(
+    request: Request,
+    id: str,
+    job_uc: IJobUseCase = Depends(JobUseCase),
+) -> BasicResponse[JobResponse]:
+    res = job_uc.get_job(request, id)
+    return BasicResponse(data=res, message="Success getting job")
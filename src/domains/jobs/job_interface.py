@@ -0,0 +1,71 @@
+import abc
+from datetime import datetime
+from typing import List, Set
+
+from starlette.requests import Request
+
+from src.domains.jobs.entities.jobs import Job
+from src.domains.jobs.enums import JobTypeEnum
+from src.models.requests.job_request import GetJobsRequest
+from src.models.responses.job_response import JobResponse
+
+
+class IJobRepository:
+    @abc.abstractmethod
+    def create_job(self, request: Request, job: Job) -> Job:
+        pass
+
+    @abc.abstractmethod
+    def find_job(self, request: Request, id: str) -> Job | None:
+        pass
+
+    @abc.abstractmethod
+    def get_jobs(
+        self, request: Request, query: GetJobsRequest
+    ) -> tuple[List[Job], int]:
+        pass
+
+    @abc.abstractmethod
+    def claim_jobs(self, request: Request, limit: int) -> List[Job]:
+        pass
+
+    @abc.abstractmethod
+    def requeue_stale_jobs(
+        self, request: Request, stale_before: datetime, max_attempts: int
+    ) -> int:
+        pass
+
+    @abc.abstractmethod
+    def touch_jobs(self, request: Request, ids: List[str]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def get_pending_job_paths(self, request: Request) -> Set[str]:
+        pass
+
+    @abc.abstractmethod
+    def update_job(self, request: Request, id: str, values: dict) -> None:
+        pass
+
+
+class IJobUseCase:
+    @abc.abstractmethod
+    def enqueue_job(
+        self,
+        request: Request,
+        type: JobTypeEnum,
+        month: int | None,
+        year: int | None,
+        params: dict,
+    ) -> JobResponse:
+        pass
+
+    @abc.abstractmethod
+    def get_job(self, request: Request, id: str) -> JobResponse:
+        pass
+
+    @abc.abstractmethod
+    def get_jobs(
+        self, request: Request, query: GetJobsRequest
+    ) -> tuple[List[JobResponse], int]:
+        pass
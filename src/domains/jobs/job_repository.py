@@ -0,0 +1,153 @@
+from datetime import datetime
+from typing import List, Set
+
+from fastapi import Depends
+from sqlalchemy import and_, case, literal, select, update
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from src.dependencies.database_dependency import get_va_db
+from src.domains.jobs.entities.jobs import Job
+from src.domains.jobs.enums import JobStatusEnum
+from src.domains.jobs.job_interface import IJobRepository
+from src.models.requests.job_request import GetJobsRequest
+from src.shared.enums import TableOrderEnum
+from src.shared.utils.pagination import paginate
+
+
+class JobRepository(IJobRepository):
+    def __init__(self, va_db: Session = Depends(get_va_db)):
+        self.va_db = va_db
+
+    def get_va_db(self, request: Request) -> Session:
+        return request.state.va_db if request.state.va_db is not None else self.va_db
+
+    def create_job(self, request: Request, job: Job) -> Job:
+        self.get_va_db(request).add(job)
+        self.get_va_db(request).flush()
+        return job
+
+    def find_job(self, request: Request, id: str) -> Job | None:
+        return self.get_va_db(request).get(Job, id)
+
+    def get_jobs(
+        self, request: Request, query: GetJobsRequest
+    ) -> tuple[List[Job], int]:
+        jobs = self.get_va_db(request).query(Job)
+
+        if query.type is not None:
+            jobs = jobs.filter(Job.type == query.type)
+        if query.status is not None:
+            jobs = jobs.filter(Job.status == query.status)
+        if query.month is not None:
+            jobs = jobs.filter(Job.month == query.month)
+        if query.year is not None:
+            jobs = jobs.filter(Job.year == query.year)
+
+        order_by = getattr(Job, query.order_by or "created_at", Job.created_at)
+        jobs = jobs.order_by(
+            order_by.asc() if query.order == TableOrderEnum.asc else order_by.desc()
+        )
+
+        return paginate(jobs, query.page, query.size)
+
+    def claim_jobs(self, request: Request, limit: int) -> List[Job]:
+        # SKIP LOCKED lets every worker process poll the same table without
+        # two of them picking up the same job
+        queued = (
+            select(Job.id)
+            .where(Job.status == JobStatusEnum.QUEUED)
+            .order_by(Job.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        now = datetime.now()
+        ids = (
+            self.get_va_db(request)
+            .scalars(
+                update(Job)
+                .where(Job.id.in_(queued))
+                .values(
+                    status=JobStatusEnum.RUNNING,
+                    attempts=Job.attempts + 1,
+                    error=None,
+                    started_at=now,
+                    updated_at=now,
+                )
+                .returning(Job.id)
+                .execution_options(synchronize_session=False)
+            )
+            .all()
+        )
+        if len(ids) == 0:
+            return []
+
+        return (
+            self.get_va_db(request)
+            .scalars(
+                select(Job)
+                .where(Job.id.in_(ids))
+                .order_by(Job.created_at)
+                .execution_options(populate_existing=True)
+            )
+            .all()
+        )
+
+    def requeue_stale_jobs(
+        self, request: Request, stale_before: datetime, max_attempts: int
+    ) -> int:
+        # a running job whose heartbeat stopped belonged to a worker that died
+        status_type = Job.__table__.c.status.type
+        res = self.get_va_db(request).execute(
+            update(Job)
+            .where(
+                and_(
+                    Job.status == JobStatusEnum.RUNNING,
+                    Job.updated_at < stale_before,
+                )
+            )
+            .values(
+                status=case(
+                    (
+                        Job.attempts >= max_attempts,
+                        literal(JobStatusEnum.FAILED, status_type),
+                    ),
+                    else_=literal(JobStatusEnum.QUEUED, status_type),
+                ),
+                error="Worker stopped while running the job",
+                finished_at=case(
+                    (Job.attempts >= max_attempts, datetime.now()), else_=None
+                ),
+                updated_at=datetime.now(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return res.rowcount
+
+    def touch_jobs(self, request: Request, ids: List[str]) -> None:
+        if len(ids) == 0:
+            return
+        self.get_va_db(request).execute(
+            update(Job)
+            .where(and_(Job.id.in_(ids), Job.status == JobStatusEnum.RUNNING))
+            .values(updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    def get_pending_job_paths(self, request: Request) -> Set[str]:
+        # files of jobs that may still run, a terminal job discards its own
+        params = self.get_va_db(request).scalars(
+            select(Job.params).where(
+                Job.status.in_([JobStatusEnum.QUEUED, JobStatusEnum.RUNNING])
+            )
+        )
+        return {i["path"] for i in params if i.get("path") is not None}
+
+    def update_job(self, request: Request, id: str, values: dict) -> None:
+        self.get_va_db(request).execute(
+            update(Job)
+            .where(Job.id == id)
+            .values(**values, updated_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
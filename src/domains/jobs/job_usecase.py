@@ -0,0 +1,64 @@
+import http
+from typing import List
+
+from fastapi import Depends, HTTPException
+from starlette.requests import Request
+
+from src.domains.jobs.entities.jobs import Job
+from src.domains.jobs.enums import JobStatusEnum, JobTypeEnum
+from src.domains.jobs.job_interface import IJobRepository, IJobUseCase
+from src.domains.jobs.job_repository import JobRepository
+from src.domains.jobs.job_worker import wake_job_worker
+from src.models.requests.job_request import GetJobsRequest
+from src.models.responses.job_response import JobResponse
+from src.shared.enums import Database
+from src.shared.utils.database_utils import begin_transaction, commit
+
+
+class JobUseCase(IJobUseCase):
+    def __init__(self, job_repo: IJobRepository = Depends(JobRepository)):
+        self.job_repo = job_repo
+
+    def enqueue_job(
+        self,
+        request: Request,
+        type: JobTypeEnum,
+        month: int | None,
+        year: int | None,
+        params: dict,
+    ) -> JobResponse:
+        user = getattr(request.state, "user", None)
+
+        begin_transaction(request, Database.VEHICLE_ALLOCATION)
+        job = self.job_repo.create_job(
+            request,
+            Job(
+                type=type,
+                status=JobStatusEnum.QUEUED,
+                month=month,
+                year=year,
+                params=params,
+                progress=0,
+                attempts=0,
+                created_by=user.username if user is not None else None,
+            ),
+        )
+        res = JobResponse.model_validate(job)
+        commit(request, Database.VEHICLE_ALLOCATION)
+
+        wake_job_worker()
+        return res
+
+    def get_job(self, request: Request, id: str) -> JobResponse:
+        job = self.job_repo.find_job(request, id)
+        if job is None:
+            raise HTTPException(
+                status_code=http.HTTPStatus.NOT_FOUND, detail="Job not found"
+            )
+        return JobResponse.model_validate(job)
+
+    def get_jobs(
+        self, request: Request, query: GetJobsRequest
+    ) -> tuple[List[JobResponse], int]:
+        jobs, total_count = self.job_repo.get_jobs(request, query)
+        return [JobResponse.model_validate(i) for i in jobs], total_count
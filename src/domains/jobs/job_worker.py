@@ -0,0 +1,253 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Set
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from src.config.config import get_config
+from src.domains.allocations.allocation_repository import AllocationRepository
+from src.domains.forecasts.forecast_repository import ForecastRepository
+from src.domains.jobs.enums import JobStatusEnum
+from src.domains.jobs.job_handlers import JOB_HANDLERS
+from src.domains.jobs.job_repository import JobRepository
+from src.infrastructures.databases.database import postgres
+from src.shared.enums import Database
+from src.shared.utils.database_utils import close_request_va_db, rollback_all
+from src.shared.utils.storage_utils import discard_temp_upload, purge_temp_files
+
+POLL_JOB_ID = "poll_jobs"
+PURGE_TEMP_JOB_ID = "purge_temp_files"
+RECONCILE_FORECAST_STATS_JOB_ID = "reconcile_forecast_period_stats"
+REFRESH_ALLOCATION_SNAPSHOTS_JOB_ID = "refresh_allocation_snapshots"
+
+logger = logging.getLogger(__name__)
+
+_scheduler: BackgroundScheduler | None = None
+_executor: ThreadPoolExecutor | None = None
+_running: Set[str] = set()
+_running_lock = threading.Lock()
+
+
+def _job_request(path: str) -> Request:
+    # use cases and repositories expect a request to carry the transaction
+    request = Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": path,
+            "headers": [],
+            "query_string": b"",
+        }
+    )
+    request.state.va_db = None
+    request.state.va_session = None
+    request.state.user = None
+    return request
+
+
+def _run_job(job_id: str) -> None:
+    config = get_config().app
+    session = postgres(Database.VEHICLE_ALLOCATION.value)
+    request = _job_request("/jobs/{}".format(job_id))
+    job_repo = JobRepository(session)
+    try:
+        job = job_repo.find_job(request, job_id)
+        if job is None:
+            return
+        values = {"error": None}
+        try:
+            JOB_HANDLERS[job.type](request, session, job)
+            values["status"] = JobStatusEnum.SUCCEEDED
+            values["progress"] = 100
+        except HTTPException as ex:
+            # validation errors will not go away by retrying
+            rollback_all(request)
+            values["status"] = JobStatusEnum.FAILED
+            values["error"] = str(ex.detail)
+        except Exception as ex:
+            logger.exception("job %s failed", job_id)
+            rollback_all(request)
+            values["status"] = (
+                JobStatusEnum.QUEUED
+                if job.attempts < config.job_max_attempts
+                else JobStatusEnum.FAILED
+            )
+            values["error"] = str(ex)
+        close_request_va_db(request)
+        session.rollback()
+
+        if values["status"] != JobStatusEnum.QUEUED:
+            values["finished_at"] = datetime.now()
+            discard_temp_upload(job.params.get("path"))
+        job_repo.update_job(request, job_id, values)
+        session.commit()
+    except Exception:
+        logger.exception("could not record the result of job %s", job_id)
+        session.rollback()
+    finally:
+        close_request_va_db(request)
+        session.close()
+        with _running_lock:
+            _running.discard(job_id)
+
+
+def _poll_jobs() -> None:
+    config = get_config().app
+    session = postgres(Database.VEHICLE_ALLOCATION.value)
+    request = _job_request("/jobs/poll")
+    job_repo = JobRepository(session)
+    try:
+        with _running_lock:
+            running = list(_running)
+
+        job_repo.touch_jobs(request, running)
+        requeued = job_repo.requeue_stale_jobs(
+            request,
+            datetime.now() - timedelta(seconds=config.job_stale_timeout),
+            config.job_max_attempts,
+        )
+        if requeued > 0:
+            logger.warning("requeued %s stale jobs", requeued)
+
+        jobs = []
+        if config.job_workers - len(running) > 0:
+            jobs = job_repo.claim_jobs(request, config.job_workers - len(running))
+        job_ids = [i.id for i in jobs]
+        session.commit()
+    except Exception:
+        logger.exception("could not poll jobs")
+        session.rollback()
+        return
+    finally:
+        session.close()
+
+    for i in job_ids:
+        with _running_lock:
+            _running.add(i)
+        _executor.submit(_run_job, i)
+
+
+def _purge_temp_files() -> None:
+    session = postgres(Database.VEHICLE_ALLOCATION.value)
+    request = _job_request("/jobs/purge-temp-files")
+    try:
+        # a backlog or a stopped worker must not lose the uploads it has yet
+        # to ingest
+        keep = JobRepository(session).get_pending_job_paths(request)
+    except Exception:
+        logger.exception("could not read the files of pending jobs")
+        return
+    finally:
+        session.close()
+
+    count = purge_temp_files(get_config().app.temp_retention, keep)
+    if count > 0:
+        logger.info("purged %s temp files", count)
+
+
+def _reconcile_forecast_period_stats() -> None:
+    session = postgres(Database.VEHICLE_ALLOCATION.value)
+    request = _job_request("/jobs/reconcile-forecast-period-stats")
+    forecast_repo = ForecastRepository(session, None)
+    try:
+        periods = forecast_repo.get_forecast_stat_periods(request)
+        session.rollback()
+        # one transaction per period, holding every stats row until the end
+        # would block the writers of all periods for the whole pass
+        for month, year in periods:
+            forecast_repo.refresh_forecast_period_stats(request, month, year)
+            session.commit()
+    except Exception:
+        logger.exception("could not reconcile forecast period stats")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def _refresh_allocation_snapshots() -> None:
+    session = postgres(Database.VEHICLE_ALLOCATION.value)
+    request = _job_request("/jobs/refresh-allocation-snapshots")
+    allocation_repo = AllocationRepository(session, None)
+    try:
+        periods = allocation_repo.find_stale_allocation_snapshot_periods(request)
+        session.rollback()
+        # one transaction per period so a rebuild holds its period lock only
+        # while that period is written
+        for month, year in periods:
+            allocation_repo.refresh_allocation_snapshot(request, month, year)
+            session.commit()
+        if len(periods) > 0:
+            logger.info("rebuilt %s stale allocation snapshots", len(periods))
+    except Exception:
+        logger.exception("could not refresh allocation snapshots")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def start_job_worker() -> None:
+    global _scheduler, _executor
+    config = get_config().app
+    if not config.job_worker or _scheduler is not None:
+        return
+
+    _executor = ThreadPoolExecutor(
+        max_workers=config.job_workers, thread_name_prefix="job-worker"
+    )
+    _scheduler = BackgroundScheduler()
+    _scheduler.add_job(
+        _poll_jobs,
+        "interval",
+        id=POLL_JOB_ID,
+        seconds=config.job_poll_interval,
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.add_job(
+        _purge_temp_files,
+        "interval",
+        id=PURGE_TEMP_JOB_ID,
+        seconds=config.temp_purge_interval,
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.add_job(
+        _reconcile_forecast_period_stats,
+        "interval",
+        id=RECONCILE_FORECAST_STATS_JOB_ID,
+        seconds=config.forecast_stats_reconcile_interval,
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.add_job(
+        _refresh_allocation_snapshots,
+        "interval",
+        id=REFRESH_ALLOCATION_SNAPSHOTS_JOB_ID,
+        seconds=config.allocation_snapshot_refresh_interval,
+        max_instances=1,
+        coalesce=True,
+    )
+    _scheduler.start()
+
+
+def wake_job_worker() -> None:
+    # jobs enqueued by this process are picked up without waiting for the
+    # next poll, other processes find them on their own interval
+    if _scheduler is not None and _scheduler.running:
+        _scheduler.modify_job(POLL_JOB_ID, next_run_time=datetime.now())
+
+
+def stop_job_worker() -> None:
+    global _scheduler, _executor
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=False)
+        _scheduler = None
+    if _executor is not None:
+        # unfinished jobs stay RUNNING and are requeued once they go stale
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,197 @@
+import logging
+import select
+import threading
+import time
+from typing import Callable, Dict, List
+
+import psycopg2
+from sqlalchemy import event, select as sql_select, text
+from sqlalchemy.orm import Session
+
+from src.config.config import get_config
+from src.domains.masters.entities.va_categories import Category
+from src.domains.masters.entities.va_dealers import Dealer
+from src.domains.masters.entities.va_models import Model
+from src.domains.masters.entities.va_order_configurations import OrderConfiguration
+from src.domains.masters.entities.va_segments import Segment
+from src.domains.masters.entities.va_stock_pilots import StockPilot
+from src.infrastructures.databases.database import postgres
+from src.models.dtos.master_dto import (
+    CategoryDto,
+    DealerDto,
+    MasterSnapshotDto,
+    ModelDto,
+    OrderConfigurationDto,
+    SegmentDto,
+    StockPilotDto,
+)
+from src.shared.enums import Database
+
+MASTER_CACHE_CHANNEL = "va_master_data"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_version = 0
+_snapshot: MasterSnapshotDto | None = None
+_loaded_at = 0.0
+
+_listener_thread: threading.Thread | None = None
+_listener_stop = threading.Event()
+
+
+def _is_fresh(snapshot: MasterSnapshotDto | None, loaded_at: float) -> bool:
+    return (
+        snapshot is not None
+        and snapshot.version == _version
+        and time.monotonic() - loaded_at < get_config().app.master_cache_ttl
+    )
+
+
+def _group(rows: List, dto, key: Callable) -> Dict:
+    grouped = {}
+    for i in rows:
+        grouped.setdefault(key(i), []).append(dto.model_validate(i))
+    return {k: tuple(v) for k, v in grouped.items()}
+
+
+def _load_snapshot(session: Session, version: int) -> MasterSnapshotDto:
+    return MasterSnapshotDto(
+        version=version,
+        models={
+            i.id: ModelDto.model_validate(i)
+            for i in session.scalars(sql_select(Model)).all()
+        },
+        dealers={
+            i.id: DealerDto.model_validate(i)
+            for i in session.scalars(sql_select(Dealer)).all()
+        },
+        categories={
+            i.id: CategoryDto.model_validate(i)
+            for i in session.scalars(sql_select(Category)).all()
+        },
+        segments={
+            i.id: SegmentDto.model_validate(i)
+            for i in session.scalars(sql_select(Segment)).all()
+        },
+        order_configurations=_group(
+            session.scalars(sql_select(OrderConfiguration)).all(),
+            OrderConfigurationDto,
+            lambda i: (i.month, i.year),
+        ),
+        stock_pilots=_group(
+            session.scalars(sql_select(StockPilot)).all(),
+            StockPilotDto,
+            lambda i: (i.month, i.year),
+        ),
+    )
+
+
+def get_cached_snapshot() -> MasterSnapshotDto | None:
+    snapshot, loaded_at = _snapshot, _loaded_at
+    return snapshot if _is_fresh(snapshot, loaded_at) else None
+
+
+def get_master_snapshot() -> MasterSnapshotDto:
+    global _snapshot, _loaded_at
+
+    snapshot = get_cached_snapshot()
+    if snapshot is not None:
+        return snapshot
+
+    with _lock:
+        if _is_fresh(_snapshot, _loaded_at):
+            return _snapshot
+
+        # a dedicated session keeps uncommitted rows of the caller's transaction
+        # out of the shared snapshot
+        session = postgres(Database.VEHICLE_ALLOCATION.value)
+        try:
+            _snapshot = _load_snapshot(session, _version)
+            _loaded_at = time.monotonic()
+        finally:
+            session.close()
+        return _snapshot
+
+
+def invalidate_master_cache() -> None:
+    global _version, _snapshot
+    with _lock:
+        _version += 1
+        _snapshot = None
+
+
+def mark_master_data_changed(session: Session) -> None:
+    # invalidation happens after commit so readers never cache uncommitted rows,
+    # pg_notify is transactional and is only delivered if the commit succeeds
+    session.info["master_data_changed"] = True
+    if get_config().app.master_cache_listen:
+        session.execute(
+            text("SELECT pg_notify(:channel, '')"),
+            {"channel": MASTER_CACHE_CHANNEL},
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    if session.info.pop("master_data_changed", False):
+        invalidate_master_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop("master_data_changed", None)
+
+
+def _listen():
+    database = get_config().database[Database.VEHICLE_ALLOCATION.value]
+    while not _listener_stop.is_set():
+        connection = None
+        try:
+            connection = psycopg2.connect(
+                host=database.host,
+                port=database.port,
+                dbname=database.name,
+                user=database.username,
+                password=database.password,
+            )
+            connection.set_isolation_level(
+                psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT
+            )
+            connection.cursor().execute(f"LISTEN {MASTER_CACHE_CHANNEL}")
+            # notifications sent while we were disconnected are lost
+            invalidate_master_cache()
+
+            while not _listener_stop.is_set():
+                if select.select([connection], [], [], 5) == ([], [], []):
+                    continue
+                connection.poll()
+                if len(connection.notifies) > 0:
+                    connection.notifies.clear()
+                    invalidate_master_cache()
+        except Exception:
+            logger.exception("master data listener disconnected")
+            _listener_stop.wait(5)
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+def start_master_cache_listener() -> None:
+    global _listener_thread
+    if not get_config().app.master_cache_listen or _listener_thread is not None:
+        return
+
+    _listener_stop.clear()
+    _listener_thread = threading.Thread(
+        target=_listen, name="master-cache-listener", daemon=True
+    )
+    _listener_thread.start()
+
+
+def stop_master_cache_listener() -> None:
+    global _listener_thread
+    _listener_stop.set()
+    if _listener_thread is not None:
+        _listener_thread.join(timeout=10)
+        _listener_thread = None
@@ -22,12 +22,12 @@ router = APIRouter(prefix="/api/master", tags=["Master"])
     summary="Dealer Options",
     description="Dealer Options",
 )
-def get_dealer_options(
+async def get_dealer_options(
     request: Request,
     search: str | None = "",
     dealer_uc: IMasterUseCase = Depends(MasterUseCase),
 ) -> ListResponse[TextValueResponse]:
-    dealers = dealer_uc.get_dealer_options(request, search)
+    dealers = await dealer_uc.get_dealer_options(request, search)
     return ListResponse(data=dealers, message="Success Fetching Dealer Options")
 
 
@@ -37,12 +37,12 @@ def get_dealer_options(
     summary="Model Options",
     description="Model Options",
 )
-def get_model_options(
+async def get_model_options(
     request: Request,
     search: str | None = "",
     model_uc: IMasterUseCase = Depends(MasterUseCase),
 ) -> ListResponse[TextValueResponse]:
-    models = model_uc.get_model_options(request, search)
+    models = await model_uc.get_model_options(request, search)
     return ListResponse(data=models, message="Success Fetching Model Options")
 
 
@@ -1,14 +1,18 @@
 import abc
-from typing import List, Type
+from typing import Dict, Iterable, List
 
 from starlette.requests import Request
 
-from src.domains.masters.entities.va_categories import Category
 from src.domains.masters.entities.va_dealers import Dealer
 from src.domains.masters.entities.va_models import Model
-from src.domains.masters.entities.va_order_configurations import OrderConfiguration
-from src.domains.masters.entities.va_segments import Segment
-from src.domains.masters.entities.va_stock_pilots import StockPilot
+from src.models.dtos.master_dto import (
+    CategoryDto,
+    DealerDto,
+    ModelDto,
+    OrderConfigurationDto,
+    SegmentDto,
+    StockPilotDto,
+)
 from src.models.requests.master_request import (
     GetOrderConfigurationRequest,
     GetStockPilotRequest,
@@ -23,25 +27,25 @@ from src.models.responses.master_response import (
 class IMasterUseCase:
 
     @abc.abstractmethod
-    def get_dealer_options(
+    async def get_dealer_options(
         self, request: Request, search: str
     ) -> List[TextValueResponse]:
         pass
 
     @abc.abstractmethod
-    def get_model_options(
+    async def get_model_options(
         self, request: Request, search: str
     ) -> List[TextValueResponse]:
         pass
 
     @abc.abstractmethod
-    def get_category_options(
+    async def get_category_options(
         self, request: Request, search: str
     ) -> List[TextValueResponse]:
         pass
 
     @abc.abstractmethod
-    def get_segment_options(
+    async def get_segment_options(
         self, request: Request, search: str
     ) -> List[TextValueResponse]:
         pass
@@ -61,7 +65,25 @@ class IMasterUseCase:
 
 class IMasterRepository:
     @abc.abstractmethod
-    def find_model(self, request: Request, model_id: str) -> Model | None:
+    def find_model(self, request: Request, model_id: str) -> ModelDto | None:
+        pass
+
+    @abc.abstractmethod
+    def find_models_by_ids(
+        self, request: Request, model_ids: Iterable[str]
+    ) -> Dict[str, ModelDto]:
+        pass
+
+    @abc.abstractmethod
+    def find_dealers_by_ids(
+        self, request: Request, dealer_ids: Iterable[str]
+    ) -> Dict[str, DealerDto]:
+        pass
+
+    @abc.abstractmethod
+    def find_categories_by_ids(
+        self, request: Request, category_ids: Iterable[str]
+    ) -> Dict[str, CategoryDto]:
         pass
 
     @abc.abstractmethod
@@ -79,31 +101,39 @@ class IMasterRepository:
         pass
 
     @abc.abstractmethod
-    def get_dealer_options(self, request: Request, search: str) -> List[Dealer]:
+    async def get_dealer_options(
+        self, request: Request, search: str
+    ) -> List[DealerDto]:
         pass
 
     @abc.abstractmethod
-    def get_model_options(self, request: Request, search: str) -> List[Model]:
+    async def get_model_options(self, request: Request, search: str) -> List[ModelDto]:
+        pass
+
+    @abc.abstractmethod
+    async def get_category_options(
+        self, request: Request, search: str
+    ) -> List[CategoryDto]:
         pass
 
     @abc.abstractmethod
-    def get_category_options(
+    async def get_segment_options(
         self, request: Request, search: str
-    ) -> list[Type[Category]]:
+    ) -> List[SegmentDto]:
         pass
 
     @abc.abstractmethod
     def get_order_configuration(
         self, request: Request, month: int, year: int
-    ) -> List[OrderConfiguration]:
+    ) -> List[OrderConfigurationDto]:
         pass
 
     @abc.abstractmethod
     def get_stock_pilots(
         self, request: Request, month: int, year: int
-    ) -> List[StockPilot]:
+    ) -> List[StockPilotDto]:
         pass
 
     @abc.abstractmethod
-    def find_category(self, request: Request, category_id: str) -> Category | None:
+    def find_category(self, request: Request, category_id: str) -> CategoryDto | None:
         pass
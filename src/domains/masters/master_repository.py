@@ -1,17 +1,29 @@
-from typing import List, Type
+from typing import Dict, Iterable, List
 
 from fastapi import Depends
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 
 from src.dependencies.database_dependency import get_va_db
 from src.domains.masters.entities.va_categories import Category
 from src.domains.masters.entities.va_dealers import Dealer
 from src.domains.masters.entities.va_models import Model
-from src.domains.masters.entities.va_order_configurations import OrderConfiguration
-from src.domains.masters.entities.va_segments import Segment
-from src.domains.masters.entities.va_stock_pilots import StockPilot
+from src.domains.masters.master_cache import (
+    get_cached_snapshot,
+    get_master_snapshot,
+    mark_master_data_changed,
+)
 from src.domains.masters.master_interface import IMasterRepository
+from src.models.dtos.master_dto import (
+    CategoryDto,
+    DealerDto,
+    MasterSnapshotDto,
+    ModelDto,
+    OrderConfigurationDto,
+    SegmentDto,
+    StockPilotDto,
+)
 
 
 class MasterRepository(IMasterRepository):
@@ -21,6 +33,12 @@ class MasterRepository(IMasterRepository):
     def get_va_db(self, request: Request) -> Session:
         return request.state.va_db if request.state.va_db is not None else self.va_db
 
+    async def _get_master_snapshot_async(self) -> MasterSnapshotDto:
+        snapshot = get_cached_snapshot()
+        if snapshot is None:
+            snapshot = await run_in_threadpool(get_master_snapshot)
+        return snapshot
+
     def find_model_by_variant(self, request: Request, variant: str) -> Model | None:
         return (
             self.get_va_db(request)
@@ -29,16 +47,56 @@ class MasterRepository(IMasterRepository):
             .first()
         )
 
-    def find_category(self, request: Request, category_id: str) -> Model | None:
-        return (
-            self.get_va_db(request)
-            .query(Category)
-            .filter(Category.id == category_id)
-            .first()
+    def find_category(self, request: Request, category_id: str) -> CategoryDto | None:
+        return self.find_categories_by_ids(request, [category_id]).get(category_id)
+
+    def find_model(self, request: Request, model_id: str) -> ModelDto | None:
+        return self.find_models_by_ids(request, [model_id]).get(model_id)
+
+    def _find_by_ids(
+        self, request: Request, cached: Dict, entity, dto, ids: Iterable[str]
+    ) -> Dict:
+        ids = set(ids)
+        found = {i: cached[i] for i in ids if i in cached}
+
+        # rows added after the snapshot was taken are still resolved from the
+        # database, so a stale cache can never reject a valid key
+        missing = [i for i in ids if i not in found]
+        if len(missing) > 0:
+            for i in (
+                self.get_va_db(request)
+                .query(entity)
+                .filter(entity.id.in_(missing))
+                .all()
+            ):
+                found[i.id] = dto.model_validate(i)
+
+        return found
+
+    def find_models_by_ids(
+        self, request: Request, model_ids: Iterable[str]
+    ) -> Dict[str, ModelDto]:
+        return self._find_by_ids(
+            request, get_master_snapshot().models, Model, ModelDto, model_ids
         )
 
-    def find_model(self, request: Request, model_id: str) -> Model | None:
-        return self.get_va_db(request).query(Model).filter(Model.id == model_id).first()
+    def find_dealers_by_ids(
+        self, request: Request, dealer_ids: Iterable[str]
+    ) -> Dict[str, DealerDto]:
+        return self._find_by_ids(
+            request, get_master_snapshot().dealers, Dealer, DealerDto, dealer_ids
+        )
+
+    def find_categories_by_ids(
+        self, request: Request, category_ids: Iterable[str]
+    ) -> Dict[str, CategoryDto]:
+        return self._find_by_ids(
+            request,
+            get_master_snapshot().categories,
+            Category,
+            CategoryDto,
+            category_ids,
+        )
 
     def upsert_dealer(self, request: Request, dealer: Dealer) -> Dealer | None:
         temp = (
@@ -47,8 +105,10 @@ class MasterRepository(IMasterRepository):
         if temp is None:
             self.get_va_db(request).add(dealer)
             self.get_va_db(request).flush()
-        else:
+            mark_master_data_changed(self.get_va_db(request))
+        elif temp.name != dealer.name:
             temp.name = dealer.name
+            mark_master_data_changed(self.get_va_db(request))
         return dealer
 
     def find_dealer(
@@ -63,60 +123,50 @@ class MasterRepository(IMasterRepository):
 
         return query.first()
 
-    def get_dealer_options(self, request: Request, search: str) -> List[Dealer]:
-        dealer = (
-            self.get_va_db(request)
-            .query(Dealer)
-            .filter(Dealer.name.ilike("%" + search + "%"))
-            .all()
+    async def get_dealer_options(
+        self, request: Request, search: str
+    ) -> List[DealerDto]:
+        snapshot = await self._get_master_snapshot_async()
+        search = (search or "").lower()
+        return sorted(
+            [i for i in snapshot.dealers.values() if search in i.name.lower()],
+            key=lambda x: x.name,
         )
-        if dealer is not None:
-            return dealer
 
-    def get_model_options(self, request: Request, search: str) -> list[Type[Model]]:
-        return (
-            self.get_va_db(request)
-            .query(Model)
-            .filter(Model.id.ilike("%" + search + "%"))
-            .all()
+    async def get_model_options(self, request: Request, search: str) -> List[ModelDto]:
+        snapshot = await self._get_master_snapshot_async()
+        search = (search or "").lower()
+        return sorted(
+            [i for i in snapshot.models.values() if search in i.id.lower()],
+            key=lambda x: x.id,
         )
 
     def get_order_configuration(
         self, request: Request, month: int, year: int
-    ) -> List[OrderConfiguration]:
-        order = (
-            self.get_va_db(request)
-            .query(OrderConfiguration)
-            .filter(OrderConfiguration.month == month, OrderConfiguration.year == year)
-            .all()
-        )
-        return order
+    ) -> List[OrderConfigurationDto]:
+        return list(get_master_snapshot().order_configurations.get((month, year), ()))
 
     def get_stock_pilots(
         self, request: Request, month: int, year: int
-    ) -> List[StockPilot]:
-        stock_pilots = (
-            self.get_va_db(request)
-            .query(StockPilot)
-            .filter(StockPilot.month == month, StockPilot.year == year)
-            .all()
-        )
-        return stock_pilots
+    ) -> List[StockPilotDto]:
+        return list(get_master_snapshot().stock_pilots.get((month, year), ()))
 
-    def get_segment_options(self, request: Request, search: str) -> list[Type[Segment]]:
-        return (
-            self.get_va_db(request)
-            .query(Segment)
-            .filter(Segment.id.ilike("%" + search + "%"))
-            .all()
+    async def get_segment_options(
+        self, request: Request, search: str
+    ) -> List[SegmentDto]:
+        snapshot = await self._get_master_snapshot_async()
+        search = (search or "").lower()
+        return sorted(
+            [i for i in snapshot.segments.values() if search in i.id.lower()],
+            key=lambda x: x.id,
         )
 
-    def get_category_options(
+    async def get_category_options(
         self, request: Request, search: str
-    ) -> list[Type[Category]]:
-        return (
-            self.get_va_db(request)
-            .query(Category)
-            .filter(Category.id.ilike("%" + search + "%"))
-            .all()
+    ) -> List[CategoryDto]:
+        snapshot = await self._get_master_snapshot_async()
+        search = (search or "").lower()
+        return sorted(
+            [i for i in snapshot.categories.values() if search in i.id.lower()],
+            key=lambda x: x.id,
         )
@@ -28,10 +28,10 @@ class MasterUseCase(IMasterUseCase):
         self.forecast_repo = forecast_repo
         self.master_repo = master_repo
 
-    def get_dealer_options(
+    async def get_dealer_options(
         self, request: Request, search: str | None = None
     ) -> List[TextValueResponse]:
-        dealers = self.master_repo.get_dealer_options(request, search)
+        dealers = await self.master_repo.get_dealer_options(request, search)
 
         return [
             TextValueResponse(
@@ -41,10 +41,10 @@ class MasterUseCase(IMasterUseCase):
             for i in dealers
         ]
 
-    def get_model_options(
+    async def get_model_options(
         self, request: Request, search: str | None = None
     ) -> List[TextValueResponse]:
-        models = self.master_repo.get_model_options(request, search)
+        models = await self.master_repo.get_model_options(request, search)
 
         return [
             TextValueResponse(
@@ -85,10 +85,10 @@ class MasterUseCase(IMasterUseCase):
             for i in stock_pilots
         ]
 
-    def get_segment_options(
+    async def get_segment_options(
         self, request: Request, search: str | None = None
     ) -> List[TextValueResponse]:
-        segments = self.master_repo.get_segment_options(request, search)
+        segments = await self.master_repo.get_segment_options(request, search)
         return [
             TextValueResponse(
                 text=i.id,
@@ -97,10 +97,10 @@ class MasterUseCase(IMasterUseCase):
             for i in segments
         ]
 
-    def get_category_options(
+    async def get_category_options(
         self, request: Request, search: str | None = None
     ) -> List[TextValueResponse]:
-        categories = self.master_repo.get_category_options(request, search)
+        categories = await self.master_repo.get_category_options(request, search)
         return [
             TextValueResponse(
                 text=i.id,
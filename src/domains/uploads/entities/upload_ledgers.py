@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    DateTime,
+    Enum,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    event,
+    func,
+)
+from sqlalchemy.orm import MappedColumn, mapped_column
+
+from src.domains.uploads.enums import UploadKindEnum
+from src.shared.entities.basemodel import BaseModel
+from src.shared.utils.xid import generate_xid
+
+
+class UploadLedger(BaseModel):
+    __tablename__ = "va_upload_ledgers"
+    __table_args__ = (
+        UniqueConstraint(
+            "kind",
+            "year",
+            "month",
+            "content_hash",
+            name="uq_va_upload_ledgers_period_hash",
+        ),
+        Index(
+            "ix_va_upload_ledgers_period_updated_at",
+            "kind",
+            "year",
+            "month",
+            "updated_at",
+        ),
+    )
+
+    id: MappedColumn[str] = mapped_column(String(255), primary_key=True)
+    kind: MappedColumn[UploadKindEnum] = mapped_column(
+        Enum(UploadKindEnum), nullable=False
+    )
+    month: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    year: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    content_hash: MappedColumn[str] = mapped_column(String(64), nullable=False)
+    row_count: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    detail_count: MappedColumn[int] = mapped_column(Integer, nullable=False)
+    detail_checksum: MappedColumn[str] = mapped_column(String(64), nullable=False)
+    created_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    updated_at: MappedColumn[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+@event.listens_for(UploadLedger, "before_insert")
+def before_insert(mapper, connection, target: UploadLedger):
+    target.id = generate_xid()
+
+
+@event.listens_for(UploadLedger, "before_update")
+def before_update(mapper, connection, target: UploadLedger):
+    target.updated_at = datetime.now()
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class UploadKindEnum(Enum):
+    TAKE_OFF = "TAKE_OFF"
+    BOOKING = "BOOKING"
+    MONTHLY_TARGET = "MONTHLY_TARGET"
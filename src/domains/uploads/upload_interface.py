@@ -0,0 +1,41 @@
+import abc
+
+from starlette.requests import Request
+
+from src.domains.uploads.entities.upload_ledgers import UploadLedger
+from src.domains.uploads.enums import UploadKindEnum
+
+
+class IUploadRepository:
+    @abc.abstractmethod
+    def find_last_upload_ledger(
+        self, request: Request, kind: UploadKindEnum, month: int, year: int
+    ) -> UploadLedger | None:
+        pass
+
+    @abc.abstractmethod
+    def upsert_upload_ledger(
+        self,
+        request: Request,
+        kind: UploadKindEnum,
+        month: int,
+        year: int,
+        content_hash: str,
+        row_count: int,
+        detail_count: int,
+        detail_checksum: str,
+    ) -> None:
+        pass
+
+
+class IUploadUseCase:
+    @abc.abstractmethod
+    def is_upload_current(
+        self,
+        request: Request,
+        kind: UploadKindEnum,
+        month: int,
+        year: int,
+        content_hash: str,
+    ) -> bool:
+        pass
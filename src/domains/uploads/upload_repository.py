@@ -0,0 +1,67 @@
+from fastapi import Depends
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from src.dependencies.database_dependency import get_va_db
+from src.domains.uploads.entities.upload_ledgers import UploadLedger
+from src.domains.uploads.enums import UploadKindEnum
+from src.domains.uploads.upload_interface import IUploadRepository
+from src.shared.utils.xid import generate_xid
+
+
+class UploadRepository(IUploadRepository):
+    def __init__(self, va_db: Session = Depends(get_va_db)):
+        self.va_db = va_db
+
+    def get_va_db(self, request: Request) -> Session:
+        return request.state.va_db if request.state.va_db is not None else self.va_db
+
+    def find_last_upload_ledger(
+        self, request: Request, kind: UploadKindEnum, month: int, year: int
+    ) -> UploadLedger | None:
+        return self.get_va_db(request).scalar(
+            select(UploadLedger)
+            .where(
+                and_(
+                    UploadLedger.kind == kind,
+                    UploadLedger.month == month,
+                    UploadLedger.year == year,
+                )
+            )
+            .order_by(UploadLedger.updated_at.desc())
+            .limit(1)
+        )
+
+    def upsert_upload_ledger(
+        self,
+        request: Request,
+        kind: UploadKindEnum,
+        month: int,
+        year: int,
+        content_hash: str,
+        row_count: int,
+        detail_count: int,
+        detail_checksum: str,
+    ) -> None:
+        statement = insert(UploadLedger).values(
+            id=generate_xid(),
+            kind=kind,
+            month=month,
+            year=year,
+            content_hash=content_hash,
+            row_count=row_count,
+            detail_count=detail_count,
+            detail_checksum=detail_checksum,
+        )
+        statement = statement.on_conflict_do_update(
+            constraint="uq_va_upload_ledgers_period_hash",
+            set_={
+                "row_count": statement.excluded.row_count,
+                "detail_count": statement.excluded.detail_count,
+                "detail_checksum": statement.excluded.detail_checksum,
+                "updated_at": func.now(),
+            },
+        )
+        self.get_va_db(request).execute(statement)
@@ -0,0 +1,24 @@
+from fastapi import Depends
+from starlette.requests import Request
+
+from src.domains.uploads.enums import UploadKindEnum
+from src.domains.uploads.upload_interface import IUploadRepository, IUploadUseCase
+from src.domains.uploads.upload_repository import UploadRepository
+
+
+class UploadUseCase(IUploadUseCase):
+    def __init__(self, upload_repo: IUploadRepository = Depends(UploadRepository)):
+        self.upload_repo = upload_repo
+
+    def is_upload_current(
+        self,
+        request: Request,
+        kind: UploadKindEnum,
+        month: int,
+        year: int,
+        content_hash: str,
+    ) -> bool:
+        # uploads only write their own columns, so the data is current as long
+        # as the last file ingested for the period is the same file
+        ledger = self.upload_repo.find_last_upload_ledger(request, kind, month, year)
+        return ledger is not None and ledger.content_hash == content_hash
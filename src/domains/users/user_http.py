@@ -7,6 +7,8 @@ from src.domains.users.user_repository import UserRepository
 from src.models.requests.auth_request import LoginRequest
 
 from src.models.responses.auth_response import LoginResponse
+from src.models.responses.basic_response import NoDataResponse
+from src.shared.utils.token_cache import invalidate_token
 
 
 router = APIRouter(prefix="/api/auth", tags=["Auth (Dev Only)"])
@@ -41,3 +43,17 @@ def get_auth_user(
     request: Request,
 ):
     return request.state.user
+
+
+@router.post(
+    "/logout",
+    response_model=NoDataResponse,
+    summary="User Logout",
+    description="This endpoint drops the cached verification of the current access token so the next request with it is verified against IAM again.",
+    dependencies=[Depends(bearer_auth)],
+)
+def logout(
+    request: Request,
+) -> NoDataResponse:
+    invalidate_token(request.state.access_token)
+    return NoDataResponse(message="Success logging out")
@@ -19,5 +19,5 @@ class IUserRepository:
         pass
 
     @abc.abstractmethod
-    def upsert_user(self, request: Request, user_dto: IamUserDto):
+    def upsert_user(self, request: Request, user_dto: IamUserDto) -> bool:
         pass
@@ -19,7 +19,7 @@ class UserRepository(IUserRepository):
 
     def get_va_db(self, request: Request) -> Session:
         return (
-            request.state.va_db if request.state.va_db is not None else self.get_va_db
+            request.state.va_db if request.state.va_db is not None else self.va_db
         )
 
     def login(
@@ -83,7 +83,7 @@ class UserRepository(IUserRepository):
                 detail="Outbound Timeout: iam/v1/verify-user",
             )
 
-    def upsert_user(self, request: Request, user_dto: IamUserDto):
+    def upsert_user(self, request: Request, user_dto: IamUserDto) -> bool:
         user = (
             self.get_va_db(request)
             .query(User)
@@ -98,8 +98,16 @@ class UserRepository(IUserRepository):
                 email=user_dto.email,
             )
             self.get_va_db(request).add(user)
-
-        else:
-            user.name = user_dto.name
-            user.role_id = None
-            user.email = user_dto.email
+            return True
+
+        if (
+            user.name == user_dto.name
+            and user.email == user_dto.email
+            and user.role_id is None
+        ):
+            return False
+
+        user.name = user_dto.name
+        user.role_id = None
+        user.email = user_dto.email
+        return True
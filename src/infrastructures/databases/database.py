@@ -1,15 +1,159 @@
-from sqlalchemy import create_engine
+import threading
+from typing import Dict
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from src.config.config import get_config
 
+_engines: Dict[str, Engine] = {}
+_session_makers: Dict[str, sessionmaker] = {}
+_async_engines: Dict[str, AsyncEngine] = {}
+_async_session_makers: Dict[str, async_sessionmaker] = {}
+_engine_lock = threading.Lock()
 
-def postgres(name: str) -> Session:
+_pool_stats_lock = threading.Lock()
+_pool_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _count(name: str, key: str) -> None:
+    with _pool_stats_lock:
+        _pool_stats.setdefault(
+            name, {"hits": 0, "misses": 0, "checkouts": 0, "checkins": 0}
+        )[key] += 1
+
+
+def _register_pool_events(engine: Engine, name: str) -> None:
+    # a checkout served by an idle pooled connection is a hit, a checkout that
+    # had to open a new DBAPI connection first is a miss
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info["pool_miss"] = True
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _count(name, "checkouts")
+        if connection_record.info.pop("pool_miss", False):
+            _count(name, "misses")
+        else:
+            _count(name, "hits")
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        _count(name, "checkins")
+
+
+def _pool_options(name: str) -> dict:
+    database = get_config().database[name]
+    return dict(
+        pool_size=database.pool_size,
+        max_overflow=database.max_overflow,
+        pool_recycle=database.pool_recycle,
+        pool_pre_ping=database.pool_pre_ping,
+        pool_timeout=database.pool_timeout,
+    )
+
+
+def _create_engine(name: str) -> Engine:
     engine = create_engine(
         "postgresql+psycopg2://{username}:{password}@{host}:{port}/{name}".format(
             **get_config().database[name].__dict__
-        )
+        ),
+        poolclass=QueuePool,
+        **_pool_options(name),
     )
-    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = session_local()
-    return db
+    _register_pool_events(engine, name)
+    return engine
+
+
+def _create_async_engine(name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        "postgresql+asyncpg://{username}:{password}@{host}:{port}/{name}".format(
+            **get_config().database[name].__dict__
+        ),
+        **_pool_options(name),
+    )
+    _register_pool_events(engine.sync_engine, name + ":async")
+    return engine
+
+
+def get_engine(name: str) -> Engine:
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+
+    with _engine_lock:
+        if name not in _engines:
+            _engines[name] = _create_engine(name)
+            _session_makers[name] = sessionmaker(
+                autocommit=False, autoflush=False, bind=_engines[name]
+            )
+        return _engines[name]
+
+
+def postgres(name: str) -> Session:
+    if name not in _session_makers:
+        get_engine(name)
+    return _session_makers[name]()
+
+
+def get_async_engine(name: str) -> AsyncEngine:
+    engine = _async_engines.get(name)
+    if engine is not None:
+        return engine
+
+    with _engine_lock:
+        if name not in _async_engines:
+            _async_engines[name] = _create_async_engine(name)
+            _async_session_makers[name] = async_sessionmaker(
+                bind=_async_engines[name], autoflush=False, expire_on_commit=False
+            )
+        return _async_engines[name]
+
+
+def postgres_async(name: str) -> AsyncSession:
+    if name not in _async_session_makers:
+        get_async_engine(name)
+    return _async_session_makers[name]()
+
+
+def get_pool_stats() -> Dict[str, Dict[str, int | str]]:
+    stats = {}
+    engines = {name: engine for name, engine in _engines.items()}
+    engines.update(
+        {name + ":async": engine.sync_engine for name, engine in _async_engines.items()}
+    )
+    for name, engine in engines.items():
+        with _pool_stats_lock:
+            counters = dict(
+                _pool_stats.get(
+                    name, {"hits": 0, "misses": 0, "checkouts": 0, "checkins": 0}
+                )
+            )
+        counters["status"] = engine.pool.status()
+        stats[name] = counters
+    return stats
+
+
+def dispose_engines() -> None:
+    with _engine_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _session_makers.clear()
+
+
+async def dispose_async_engines() -> None:
+    with _engine_lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+        _async_session_makers.clear()
+    for engine in engines:
+        await engine.dispose()
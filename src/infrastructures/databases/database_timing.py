@@ -0,0 +1,57 @@
+import time
+from contextvars import ContextVar
+from typing import Dict
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+
+DATABASE_TIMING_METRICS = ("acquire", "execute", "commit")
+
+# set by DatabaseMiddleware, the dict is shared with the threadpool threads of
+# the request since they run in a copy of its context
+_timing: ContextVar[Dict[str, float] | None] = ContextVar(
+    "database_timing", default=None
+)
+
+
+def start_database_timing() -> Dict[str, float]:
+    timing = {i: 0.0 for i in DATABASE_TIMING_METRICS}
+    _timing.set(timing)
+    return timing
+
+
+def record_database_timing(metric: str, seconds: float) -> None:
+    timing = _timing.get()
+    if timing is not None:
+        timing[metric] += seconds
+
+
+def get_server_timing(timing: Dict[str, float]) -> str:
+    return ", ".join("db-{};dur={:.1f}".format(k, v * 1000) for k, v in timing.items())
+
+
+# acquire is the time between the session starting a transaction and the
+# connection being ready, which covers the pool checkout and the BEGIN
+@event.listens_for(Session, "after_transaction_create")
+def _after_transaction_create(session: Session, transaction):
+    if transaction.parent is None:
+        session.info["transaction_created_at"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _after_begin(session: Session, transaction, connection):
+    started = session.info.pop("transaction_created_at", None)
+    if started is not None:
+        record_database_timing("acquire", time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_database_timing(
+        "execute", time.perf_counter() - conn.info["query_started_at"].pop()
+    )
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from typing import Dict
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config.config import get_config
+
+_sessions: Dict[str, requests.Session] = {}
+_session_lock = threading.Lock()
+
+# async clients and semaphores belong to the event loop of the app, they are
+# only touched from that loop so no lock is needed
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def outbound_session(name: str) -> requests.Session:
+    # one keep-alive session per outbound, requests.Session is safe to share
+    # between threads for plain requests as long as its settings are not changed
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+
+    with _session_lock:
+        if name not in _sessions:
+            outbound = get_config().outbound[name]
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=outbound.pool_size, pool_maxsize=outbound.pool_size
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if getattr(outbound, "username", None) is not None:
+                session.auth = (outbound.username, outbound.password)
+            _sessions[name] = session
+        return _sessions[name]
+
+
+def close_outbound_sessions() -> None:
+    with _session_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def outbound_async_client(name: str) -> httpx.AsyncClient:
+    client = _async_clients.get(name)
+    if client is None:
+        outbound = get_config().outbound[name]
+        client = httpx.AsyncClient(
+            base_url=outbound.base_url,
+            timeout=outbound.timeout,
+            limits=httpx.Limits(
+                max_connections=outbound.pool_size,
+                max_keepalive_connections=outbound.pool_size,
+            ),
+        )
+        _async_clients[name] = client
+    return client
+
+
+def outbound_semaphore(name: str) -> asyncio.Semaphore:
+    # callers wait here instead of timing out on a full connection pool
+    semaphore = _semaphores.get(name)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_config().outbound[name].max_concurrency)
+        _semaphores[name] = semaphore
+    return semaphore
+
+
+async def close_outbound_async_clients() -> None:
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    _semaphores.clear()
+    for client in clients:
+        await client.aclose()
@@ -9,15 +9,28 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from apscheduler.schedulers.background import BackgroundScheduler
-
 from src.dependencies.database_dependency import get_va_db
 from src.domains.users.user_http import router as user_router
 from src.domains.forecasts.forecast_http import router as forecast_router
 from src.domains.calculations.calculation_http import router as calculation_router
 from src.domains.allocations.allocation_http import router as allocation_router
+from src.domains.jobs.job_http import router as job_router
+from src.domains.jobs.job_worker import start_job_worker, stop_job_worker
 
+from src.domains.masters.master_cache import (
+    start_master_cache_listener,
+    stop_master_cache_listener,
+)
 from src.domains.masters.master_http import router as master_router
+from src.infrastructures.databases.database import (
+    dispose_async_engines,
+    dispose_engines,
+    get_pool_stats,
+)
+from src.infrastructures.outbounds.session import (
+    close_outbound_async_clients,
+    close_outbound_sessions,
+)
 from src.shared.middlewares.database_middleware import DatabaseMiddleware
 from src.shared.utils.database_utils import rollback_all
 
@@ -112,8 +125,50 @@ def default():
     return {"version": os.getenv("APP_VERSION")}
 
 
+@app.get(
+    "/api/status/database",
+    summary="Get Database Pool Statistics",
+    description="This endpoint returns the connection pool hit/miss counters and pool status for every database engine opened by this worker.",
+)
+def database_status():
+    return get_pool_stats()
+
+
+@app.on_event("startup")
+def start_master_cache():
+    start_master_cache_listener()
+
+
+@app.on_event("shutdown")
+def stop_master_cache():
+    stop_master_cache_listener()
+
+
+@app.on_event("startup")
+def start_jobs():
+    start_job_worker()
+
+
+@app.on_event("shutdown")
+def stop_jobs():
+    stop_job_worker()
+
+
+@app.on_event("shutdown")
+async def dispose_database_pools():
+    dispose_engines()
+    await dispose_async_engines()
+
+
+@app.on_event("shutdown")
+async def close_outbound_pools():
+    close_outbound_sessions()
+    await close_outbound_async_clients()
+
+
 app.include_router(user_router)
 app.include_router(forecast_router)
 app.include_router(calculation_router)
 app.include_router(master_router)
 app.include_router(allocation_router)
+app.include_router(job_router)
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class ExcelTemplateDto(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    content: bytes
+    etag: str
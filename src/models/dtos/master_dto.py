@@ -0,0 +1,56 @@
+from typing import Dict, Tuple
+
+from pydantic import BaseModel, ConfigDict
+
+
+class MasterDto(BaseModel):
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+
+
+class CategoryDto(MasterDto):
+    id: str
+
+
+class SegmentDto(MasterDto):
+    id: str
+
+
+class DealerDto(MasterDto):
+    id: str
+    name: str
+
+
+class ModelDto(MasterDto):
+    id: str
+    manufacture_code: str | None
+    group: str
+    variant: str
+    category_id: str | None
+    segment_id: str | None
+    usage: str | None
+    euro: str | None
+
+
+class OrderConfigurationDto(MasterDto):
+    month: int
+    year: int
+    category_id: str
+    forecast_percentage: int
+    urgent_percentage: int
+
+
+class StockPilotDto(MasterDto):
+    month: int
+    year: int
+    segment_id: str
+    percentage: int
+
+
+class MasterSnapshotDto(MasterDto):
+    version: int
+    models: Dict[str, ModelDto]
+    dealers: Dict[str, DealerDto]
+    categories: Dict[str, CategoryDto]
+    segments: Dict[str, SegmentDto]
+    order_configurations: Dict[Tuple[int, int], Tuple[OrderConfigurationDto, ...]]
+    stock_pilots: Dict[Tuple[int, int], Tuple[StockPilotDto, ...]]
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class PdfDto(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    content: bytes
+    etag: str
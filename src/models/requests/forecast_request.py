@@ -1,8 +1,79 @@
-from typing import List
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from src.models.requests.basic_request import TableRequest
+from src.shared.enums import PaginationCountEnum
+
+FORECAST_DETAIL_MONTH_FIELDS = (
+    "rs_gov",
+    "ws_gov",
+    "rs_priv",
+    "ws_priv",
+    "total_rs",
+    "prev_rs_gov",
+    "prev_rs_priv",
+    "total_prev_rs",
+    "total_ws",
+    "new_ws_req",
+    "hmsi_allocation",
+)
+CONFIRM_FORECAST_DETAIL_MONTH_FIELDS = ("ws_gov_conf", "ws_priv_conf", "total_ws_conf")
+
+
+@lru_cache(maxsize=256)
+def _get_month_field_lookup(
+    keys: FrozenSet[str], fields: Tuple[str, ...]
+) -> Dict[str, Tuple[int, str]]:
+    # HOYU sends every month flattened as n<month>_<field>, the payloads of
+    # one upload share their key set so the regex runs once per distinct set
+    pattern = re.compile(r"n(\d+)_({})$".format("|".join(fields)))
+    lookup = {}
+    for i in keys:
+        match = pattern.match(i)
+        if match:
+            lookup[i] = (int(match.group(1)), match.group(2))
+    return lookup
+
+
+def _group_months(data: Any, fields: Tuple[str, ...]) -> Any:
+    if not isinstance(data, dict) or "months" in data:
+        return data
+
+    months = {}
+    for k, (month, field) in _get_month_field_lookup(frozenset(data), fields).items():
+        months.setdefault(month, {"forecast_month": month})[field] = data[k]
+    return {**data, "months": months}
+
+
+class ForecastDetailMonthRequest(BaseModel):
+    forecast_month: int
+    rs_gov: int | None = None
+    ws_gov: int | None = None
+    rs_priv: int | None = None
+    ws_priv: int | None = None
+    total_rs: int | None = None
+    prev_rs_gov: int | None = None
+    prev_rs_priv: int | None = None
+    total_prev_rs: int | None = None
+    total_ws: int | None = None
+    new_ws_req: int | None = None
+    hmsi_allocation: int | None = None
+
+
+class ForecastDetailRequest(BaseModel):
+    record_id: str
+    model_variant: str
+    end_stock: int
+    dealer_forecast_id: str | None = None
+    months: Dict[int, ForecastDetailMonthRequest] = {}
+
+    @model_validator(mode="before")
+    @classmethod
+    def group_months(cls, data: Any) -> Any:
+        return _group_months(data, FORECAST_DETAIL_MONTH_FIELDS)
 
 
 class CreateForecastRequest(BaseModel):
@@ -12,18 +83,39 @@ class CreateForecastRequest(BaseModel):
     dealer_code: str
     year: int
     month: int
-    details: List[dict]
+    details: List[ForecastDetailRequest]
+
+
+class ConfirmForecastDetailMonthRequest(BaseModel):
+    forecast_month: int
+    ws_gov_conf: int | None = None
+    ws_priv_conf: int | None = None
+    total_ws_conf: int | None = None
+
+
+class ConfirmForecastDetailRequest(BaseModel):
+    record_id: str
+    model_variant: str
+    months: Dict[int, ConfirmForecastDetailMonthRequest] = {}
+
+    @model_validator(mode="before")
+    @classmethod
+    def group_months(cls, data: Any) -> Any:
+        return _group_months(data, CONFIRM_FORECAST_DETAIL_MONTH_FIELDS)
 
 
 class ConfirmForecastRequest(BaseModel):
     record_id: str
     order_confirmation_date: str
-    data: List[dict]
+    data: List[ConfirmForecastDetailRequest]
 
 
 class GetForecastSummaryRequest(TableRequest, BaseModel):
     month: int | None = None
     year: int | None = None
+    # YYYY-MM of the last summary of the previous page, page is ignored when set
+    after: str | None = None
+    count: PaginationCountEnum = PaginationCountEnum.exact
 
 
 class GetForecastDetailRequest(BaseModel):
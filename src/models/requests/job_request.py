@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+from src.domains.jobs.enums import JobStatusEnum, JobTypeEnum
+from src.models.requests.basic_request import TableRequest
+
+
+class GetJobsRequest(TableRequest, BaseModel):
+    type: JobTypeEnum | None = None
+    status: JobStatusEnum | None = None
+    month: int | None = None
+    year: int | None = None
@@ -3,7 +3,10 @@ from typing import List
 
 from pydantic import BaseModel
 
-from src.domains.allocations.enums import AllocationApprovalFlagEnum
+from src.domains.allocations.enums import (
+    AllocationApprovalFlagEnum,
+    AllocationDispatchStatusEnum,
+)
 from src.models.responses.basic_response import TextValueResponse
 
 
@@ -64,3 +67,23 @@ class GetAllocationResponse(BaseModel):
     approvals: List[AllocationApprovalResponse]
     adjustments: List[GetAllocationAdjustmentResponse]
     targets: List[AllocationTargetMonthResponse]
+
+
+class AllocationDispatchResponse(BaseModel):
+    forecast_id: str
+    dealer_id: str
+    status: AllocationDispatchStatusEnum
+    attempts: int
+    last_error: str | None
+    sent_at: datetime | None
+
+
+class GetAllocationDispatchResponse(BaseModel):
+    month: int
+    year: int
+    total: int
+    pending: int
+    sending: int
+    sent: int
+    failed: int
+    dispatches: List[AllocationDispatchResponse]
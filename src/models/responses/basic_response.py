@@ -36,6 +36,7 @@ class PaginationMetadata(BaseModel):
     size: int
     total_count: int
     page_count: int
+    next_cursor: str | None = None
 
 
 class PaginationResponse(BaseModel, Generic[T]):
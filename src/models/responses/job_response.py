@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from src.domains.jobs.enums import JobStatusEnum, JobTypeEnum
+
+
+class JobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    type: JobTypeEnum
+    status: JobStatusEnum
+    month: int | None
+    year: int | None
+    progress: int
+    attempts: int
+    error: str | None
+    created_by: str | None
+    created_at: datetime | None
+    started_at: datetime | None
+    finished_at: datetime | None
@@ -28,6 +28,9 @@ from src.domains.forecasts.entities.va_forecasts_detail_archive import (
 from src.domains.forecasts.entities.va_forecasts_detail_month_archive import (
     ForecastDetailMonthArchive,
 )
+from src.domains.forecasts.entities.va_forecast_period_stats import (
+    ForecastPeriodStat,
+)
 
 
 # Calculations
@@ -50,3 +53,21 @@ from src.domains.allocations.entities.allocation_approvals import (
 from src.domains.allocations.entities.allocation_approval_matrix import (
     AllocationApprovalMatrix,
 )
+
+from src.domains.allocations.entities.allocation_snapshots import (
+    AllocationSnapshot,
+)
+
+from src.domains.allocations.entities.allocation_snapshot_periods import (
+    AllocationSnapshotPeriod,
+)
+
+from src.domains.allocations.entities.allocation_dispatches import (
+    AllocationDispatch,
+)
+
+# Jobs
+from src.domains.jobs.entities.jobs import Job
+
+# Uploads
+from src.domains.uploads.entities.upload_ledgers import UploadLedger
@@ -6,5 +6,10 @@ class TableOrderEnum(Enum):
     desc = "desc"
 
 
+class PaginationCountEnum(Enum):
+    exact = "exact"
+    estimate = "estimate"
+
+
 class Database(Enum):
     VEHICLE_ALLOCATION = "vehicle_allocation"
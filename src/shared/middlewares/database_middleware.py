@@ -1,9 +1,47 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from src.infrastructures.databases.database_timing import (
+    get_server_timing,
+    start_database_timing,
+)
+from src.shared.utils.database_utils import close_request_va_db, finish_request_va_db
 
-class DatabaseMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+
+class DatabaseMiddleware:
+    # a plain ASGI middleware, BaseHTTPMiddleware runs the endpoint in another
+    # task and pipes the response body through a memory stream
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
         request.state.va_db = None
-        response = await call_next(request)
-        return response
+        request.state.va_session = None
+        timing = start_database_timing()
+
+        async def send_with_transaction(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # the transaction ends before the status goes out, so a failed
+                # commit still becomes an error response. A request that never
+                # opened a session skips the threadpool
+                if request.state.va_session is not None:
+                    await run_in_threadpool(
+                        finish_request_va_db, request, message["status"] < 400
+                    )
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", get_server_timing(timing)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_transaction)
+        finally:
+            if request.state.va_session is not None:
+                await run_in_threadpool(close_request_va_db, request)
@@ -0,0 +1,23 @@
+import hashlib
+import json
+from typing import Any, BinaryIO, Iterable
+
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_checksum(file: BinaryIO) -> str:
+    # reads from the start and rewinds, so the file can still be saved after
+    digest = hashlib.sha256()
+    file.seek(0)
+    while chunk := file.read(CHECKSUM_CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def get_rows_checksum(rows: Iterable[Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(
+            sorted(json.dumps(i, sort_keys=True, default=str) for i in rows)
+        ).encode("utf-8")
+    ).hexdigest()
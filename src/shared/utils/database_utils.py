@@ -1,23 +1,73 @@
+import logging
+import time
+
+from sqlalchemy.orm import Session
 from starlette.requests import Request
 
-from src.dependencies.database_dependency import get_va_db
+from src.infrastructures.databases.database import postgres
+from src.infrastructures.databases.database_timing import record_database_timing
 from src.shared.enums import Database
 
+logger = logging.getLogger(__name__)
+
+
+def get_request_va_db(request: Request) -> Session:
+    # one session per request, the dependency and begin_transaction share it
+    # and no connection is checked out until the first statement
+    session = getattr(request.state, "va_session", None)
+    if session is None:
+        session = postgres(Database.VEHICLE_ALLOCATION.value)
+        request.state.va_session = session
+    return session
+
 
 def commit(request: Request, database: Database):
     if database == Database.VEHICLE_ALLOCATION:
+        started = time.perf_counter()
         request.state.va_db.commit()
+        record_database_timing("commit", time.perf_counter() - started)
         request.state.va_db = None
 
 
 def rollback_all(request: Request):
+    request.state.va_db = None
+    session = getattr(request.state, "va_session", None)
+    if session is None:
+        return
     try:
-        request.state.va_db.rollback()
-        request.state.va_db = None
-    except Exception as ex:
-        pass
+        session.rollback()
+    except Exception:
+        logger.exception("could not roll back the request session")
 
 
 def begin_transaction(request: Request, database: Database):
     if database == Database.VEHICLE_ALLOCATION and request.state.va_db is None:
-        request.state.va_db = next(get_va_db())
+        request.state.va_db = get_request_va_db(request)
+
+
+def finish_request_va_db(request: Request, succeeded: bool) -> None:
+    # whatever the use case left open is committed for a successful response
+    # and rolled back otherwise
+    request.state.va_db = None
+    session = getattr(request.state, "va_session", None)
+    if session is None:
+        return
+    if not succeeded:
+        session.rollback()
+        return
+    started = time.perf_counter()
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        record_database_timing("commit", time.perf_counter() - started)
+
+
+def close_request_va_db(request: Request) -> None:
+    request.state.va_db = None
+    session = getattr(request.state, "va_session", None)
+    if session is not None:
+        request.state.va_session = None
+        session.close()
@@ -1,29 +1,213 @@
-
-
+import hashlib
+import http
+import io
+import re
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, BinaryIO, Iterator, List, Tuple
+
+from fastapi import HTTPException
 from openpyxl import Workbook, load_workbook, worksheet
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.models.dtos.excel_dto import ExcelTemplateDto
 
 
 def open_excel_workbook(file_path: Path) -> Workbook:
     return load_workbook(file_path)
 
+
 def get_worksheet(workbook: Workbook, sheet_name: str = None) -> worksheet:
     if sheet_name is None:
         return workbook.active
     else:
         return workbook[sheet_name]
-    
+
+
 def save_workbook(workbook: Workbook, file_path: Path):
     workbook.save(file_path)
-    
+
+
 def get_header_column_index(
     worksheet: worksheet, header_name: str, header_row_index: int = 1
 ) -> int | None:
     index = None
-    
+
     for cell in worksheet[header_row_index]:
         if str(cell.value).strip().lower() == header_name.lower():
             index = cell.column
-            
+
     return index
-    
+
+
+EXCEL_CHUNK_SIZE = 1000
+FORECAST_MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+class ExcelRowReader:
+    # streams the first sheet of an upload row by row so memory does not grow
+    # with the size of the file, use as a context manager to close the file
+    def __init__(self, file_path: Path | str | BinaryIO, header_row_index: int = 1):
+        self.workbook = load_workbook(file_path, read_only=True, data_only=True)
+        self.worksheet = self.workbook.active
+        # read only sheets trust the dimension written by the exporting tool,
+        # which is often wrong for generated files
+        self.worksheet.reset_dimensions()
+        self.header_row_index = header_row_index
+
+        header = next(
+            self.worksheet.iter_rows(
+                min_row=header_row_index, max_row=header_row_index, values_only=True
+            ),
+            (),
+        )
+        self.header: List[str] = [
+            str(i).strip() if i is not None else "" for i in header
+        ]
+
+    def __enter__(self) -> "ExcelRowReader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.workbook.close()
+
+    def get_columns(self, pattern: str) -> List[str]:
+        return [i for i in self.header if re.match(pattern, i)]
+
+    def validate_header(self, columns: List[str]) -> None:
+        not_found = [i for i in columns if i not in self.header]
+        if len(not_found) > 0:
+            raise HTTPException(
+                status_code=http.HTTPStatus.BAD_REQUEST,
+                detail=f"{not_found[0]} field is required.",
+            )
+
+    def iter_chunks(
+        self,
+        columns: List[str],
+        numeric_columns: List[str] = (),
+        chunk_size: int = EXCEL_CHUNK_SIZE,
+    ) -> Iterator[List[tuple]]:
+        # yields tuples of the given columns, numeric columns are validated
+        # and empty cells of them are returned as None
+        self.validate_header(columns)
+        indexes = [self.header.index(i) for i in columns]
+        numeric = [i in numeric_columns for i in columns]
+
+        chunk = []
+        for row_index, row in enumerate(
+            self.worksheet.iter_rows(
+                min_row=self.header_row_index + 1, values_only=True
+            ),
+            start=self.header_row_index + 1,
+        ):
+            if all(i is None or i == "" for i in row):
+                continue
+
+            values = []
+            for column, index, is_numeric in zip(columns, indexes, numeric):
+                value = row[index] if index < len(row) else None
+                if is_numeric:
+                    value = _to_number(value, row_index, column)
+                values.append(value)
+            chunk.append(tuple(values))
+
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if len(chunk) > 0:
+            yield chunk
+
+
+def _to_number(value: Any, row_index: int, column: str) -> int | float | None:
+    if value is None or isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        if value.strip() == "":
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    raise HTTPException(
+        status_code=http.HTTPStatus.BAD_REQUEST,
+        detail=f"Row {row_index}: {column} must be a number.",
+    )
+
+
+# bump when the layout of the generated templates changes so browsers holding
+# an old copy download the new one
+EXCEL_TEMPLATE_VERSION = 1
+EXCEL_TEMPLATE_CACHE_SIZE = 256
+EXCEL_TEMPLATE_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
+EXCEL_TEMPLATE_ALIGNMENT = Alignment(horizontal="center")
+EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def get_template_months(month: int, year: int, count: int) -> List[str]:
+    months = []
+    for i in range(count):
+        if i > 0:
+            month += 1
+            if month > 12:
+                month = 1
+                year += 1
+        months.append(f"{year}-{month:02}")
+    return months
+
+
+def get_excel_template_etag(title: str, headers: Tuple[str, ...]) -> str:
+    # derived from what is rendered rather than from the bytes, the xlsx
+    # metadata carries a timestamp so every worker would produce another hash
+    return '"{}"'.format(
+        hashlib.sha256(
+            repr((EXCEL_TEMPLATE_VERSION, title, headers)).encode("utf-8")
+        ).hexdigest()
+    )
+
+
+@lru_cache(maxsize=EXCEL_TEMPLATE_CACHE_SIZE)
+def get_excel_template(title: str, headers: Tuple[str, ...]) -> ExcelTemplateDto:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+
+    for col_index, header in enumerate(headers, start=1):
+        sheet.column_dimensions[get_column_letter(col_index)].width = len(header) + 2
+
+    row = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.border = EXCEL_TEMPLATE_BORDER
+        cell.alignment = EXCEL_TEMPLATE_ALIGNMENT
+        row.append(cell)
+    sheet.append(row)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return ExcelTemplateDto(
+        content=buffer.getvalue(), etag=get_excel_template_etag(title, headers)
+    )
+
+
+def get_excel_template_response(
+    request: Request, template: ExcelTemplateDto, filename: str
+) -> Response:
+    headers = {"ETag": template.etag, "Cache-Control": "no-cache"}
+    if template.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=http.HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    headers["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
+    return Response(template.content, media_type=EXCEL_MEDIA_TYPE, headers=headers)
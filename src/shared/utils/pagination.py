@@ -1,5 +1,8 @@
-from typing import TypeVar
+import json
+from typing import Any, Sequence, TypeVar
 
+from sqlalchemy import ColumnElement, Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Query
 
 T = TypeVar("T")
@@ -10,3 +13,55 @@ def paginate(query: Query, page: int, size: int) -> tuple[list[T], int]:
     offset = (page - 1) * size
     results = query.limit(size).offset(offset).all()
     return results, total_count
+
+
+async def paginate_async(
+    session: AsyncSession, statement: Select, page: int, size: int
+) -> tuple[list[T], int]:
+    total_count = await count_async(session, statement)
+    offset = (page - 1) * size
+    results = (await session.execute(statement.limit(size).offset(offset))).all()
+    return results, total_count
+
+
+async def count_async(
+    session: AsyncSession, statement: Select, estimate: bool = False
+) -> int:
+    if not estimate:
+        return await session.scalar(
+            select(func.count()).select_from(statement.subquery())
+        )
+
+    # the planner's row estimate costs no execution but is only as good as
+    # the table statistics, the statement is inlined since EXPLAIN takes no
+    # bind parameters and goes to the driver as is, text() would parse colons
+    # in the literals as parameters
+    connection = await session.connection()
+    compiled = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = (
+        await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def paginate_keyset_async(
+    session: AsyncSession,
+    statement: Select,
+    keys: Sequence[ColumnElement],
+    after: Sequence[Any] | None,
+    size: int,
+    offset: int = 0,
+) -> tuple[list[T], bool]:
+    # rows strictly after the cursor in descending key order, an index on the
+    # keys lets the database start there instead of counting past the offset.
+    # One extra row tells whether there is a next page
+    if after is not None:
+        statement = statement.where(tuple_(*keys) < tuple_(*after))
+    statement = statement.order_by(*[i.desc() for i in keys])
+
+    results = (await session.execute(statement.limit(size + 1).offset(offset))).all()
+    return results[:size], len(results) > size
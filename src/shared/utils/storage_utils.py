@@ -1,9 +1,17 @@
+import hashlib
 import http
 import os
 import shutil
+import time
 import uuid
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, Set
 
-from fastapi import File, HTTPException
+from fastapi import File, HTTPException, UploadFile
+
+from src.config.config import get_config
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 def save_file(path: str, file: File) -> str:
@@ -19,6 +27,72 @@ def save_file(path: str, file: File) -> str:
     return dest.removeprefix(os.getcwd() + "/storage")
 
 
+def save_upload(path: str, file: UploadFile) -> str:
+    # the job that ingests the upload needs a copy outside of the request spool,
+    # with upload_retention the copy is kept and named by its sha256 so an
+    # identical upload reuses the file already on disk
+    if not get_config().app.upload_retention:
+        return save_file(path, file)
+
+    upload_dir = os.path.join(os.getcwd(), "storage/uploads/{}".format(path))
+    if not os.path.exists(upload_dir):
+        os.makedirs(upload_dir)
+    extension = os.path.splitext(file.filename)[-1]
+
+    digest = hashlib.sha256()
+    with NamedTemporaryFile(dir=upload_dir, delete=False) as buffer:
+        while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            buffer.write(chunk)
+
+    dest = os.path.join(upload_dir, digest.hexdigest() + extension)
+    if os.path.exists(dest):
+        os.remove(buffer.name)
+    else:
+        os.replace(buffer.name, dest)
+
+    return dest.removeprefix(os.getcwd() + "/storage")
+
+
+def get_upload_source(file: str | BinaryIO) -> str | BinaryIO:
+    # uploads are either a stored path or the file object of the request
+    if not isinstance(file, str):
+        return file
+
+    if not is_file_exist(file):
+        raise HTTPException(
+            status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="Excel file is not found",
+        )
+    return get_full_path(file)
+
+
+def discard_temp_upload(path: str | None) -> None:
+    if path is not None and path.startswith("/temp/") and is_file_exist(path):
+        os.remove(get_full_path(path))
+
+
+def purge_temp_files(older_than: float, keep: Set[str] = frozenset()) -> int:
+    # generated templates, pdfs and uploads are only needed for a short while,
+    # paths in keep (as stored, e.g. /temp/...) still belong to a pending job
+    storage_path = os.path.join(os.getcwd(), "storage")
+    base_path = os.path.join(storage_path, "temp")
+    expired_at = time.time() - older_than
+    count = 0
+    for root, dirs, files in os.walk(base_path):
+        for i in files:
+            file_path = os.path.join(root, i)
+            if file_path.removeprefix(storage_path) in keep:
+                continue
+            try:
+                if os.path.getmtime(file_path) < expired_at:
+                    os.remove(file_path)
+                    count += 1
+            except FileNotFoundError:
+                pass
+    return count
+
+
 def move_file(from_path: str, to_path: str):
     base_path = os.path.join(os.getcwd(), "storage")
     to_dir = os.path.dirname(base_path + to_path)
@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+
+import jwt
+from cachetools import TLRUCache
+
+from src.config.config import get_config
+from src.models.dtos.iam_dto import IamUserDto
+
+_token_cache: TLRUCache | None = None
+_token_cache_lock = threading.Lock()
+
+
+def _hash_token(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+
+def _get_token_expiry(access_token: str) -> float | None:
+    # the token has just been verified by IAM, we only need its exp claim
+    try:
+        claims = jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return None
+
+    exp = claims.get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def _time_to_use(key: str, value: tuple[IamUserDto, float], now: float) -> float:
+    # value holds the wall clock expiry, the cache itself runs on monotonic time
+    return now + max(value[1] - time.time(), 0)
+
+
+def _get_token_cache() -> TLRUCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TLRUCache(
+            maxsize=get_config().app.token_cache_size, ttu=_time_to_use
+        )
+    return _token_cache
+
+
+def get_cached_user(access_token: str) -> IamUserDto | None:
+    with _token_cache_lock:
+        value = _get_token_cache().get(_hash_token(access_token))
+    return value[0] if value is not None else None
+
+
+def cache_user(access_token: str, user: IamUserDto) -> None:
+    expires_at = time.time() + get_config().app.token_cache_ttl
+    token_expiry = _get_token_expiry(access_token)
+    if token_expiry is not None:
+        expires_at = min(expires_at, token_expiry)
+
+    if expires_at <= time.time():
+        return
+
+    with _token_cache_lock:
+        _get_token_cache()[_hash_token(access_token)] = (user, expires_at)
+
+
+def invalidate_token(access_token: str) -> None:
+    with _token_cache_lock:
+        _get_token_cache().pop(_hash_token(access_token), None)
+
+
+def invalidate_user(username: str) -> None:
+    with _token_cache_lock:
+        cache = _get_token_cache()
+        for key in [k for k, v in cache.items() if v[0].username == username]:
+            cache.pop(key, None)
+
+
+def clear_token_cache() -> None:
+    with _token_cache_lock:
+        _get_token_cache().clear()
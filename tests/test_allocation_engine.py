@@ -0,0 +1,392 @@
+import random
+
+import pytest
+
+from src.domains.allocations.allocation_engine import compute_allocation_adjustments
+
+YEAR = 2024
+MONTH = 5
+SLOT_FIELDS = ["take_off", "soa", "oc", "bo", "so", "booking_prospect", "slot_1"]
+
+
+def _coalesce(value):
+    return 0 if value is None else value
+
+
+def _evaluate_sql(period: dict) -> list:
+    # row by row evaluation of the GROUP BY query the engine replaced: inner
+    # joins on stock pilot and order configuration, a left join on every live
+    # calculation of the period and its detail for (model, forecast month),
+    # and GROUP BY collapsing candidates with identical slot values
+    models = period["models"]
+    stock_pilots = dict(period["stock_pilots"])
+    order_configurations = dict(period["order_configurations"])
+
+    total_ws = {}
+    for i in period["months"]:
+        if i["forecast_deletable"] or i["detail_deletable"] or i["deletable"]:
+            continue
+        key = (i["model_id"], i["forecast_month"])
+        total_ws.setdefault(key, None)
+        if i["total_ws"] is not None:
+            total_ws[key] = _coalesce(total_ws[key]) + i["total_ws"]
+
+    rows = set()
+    for i in period["months"]:
+        # the query filtered deleted details and months but not forecasts
+        if i["detail_deletable"] or i["deletable"]:
+            continue
+        model = models[i["model_id"]]
+        if model["segment_id"] not in stock_pilots:
+            continue
+        if model["category_id"] not in order_configurations:
+            continue
+
+        candidates = [None] if len(period["calculation_ids"]) == 0 else []
+        for calculation_id in period["calculation_ids"]:
+            detail = period["slot_details"].get(
+                (calculation_id, i["model_id"], i["forecast_month"])
+            )
+            candidates.append(
+                detail if detail is not None and detail["deletable"] == 0 else None
+            )
+
+        total_ws_sum = total_ws.get((i["model_id"], i["forecast_month"]))
+        has_total_ws = total_ws_sum is not None and total_ws_sum > 0
+        for detail in candidates:
+            slot = {k: None if detail is None else detail[k] for k in SLOT_FIELDS}
+            ws = _coalesce(i["total_ws"])
+            ws_percentage = (
+                round(float(ws) / float(total_ws_sum) * 100) if has_total_ws else 0
+            )
+            if slot["slot_1"] is not None:
+                allocation = slot["slot_1"]
+            elif has_total_ws:
+                available = float(
+                    _coalesce(slot["take_off"]) + _coalesce(slot["bo"])
+                ) * (float(stock_pilots[model["segment_id"]]) / 100) - float(
+                    _coalesce(slot["soa"])
+                    + _coalesce(slot["oc"])
+                    + _coalesce(slot["so"])
+                    + _coalesce(slot["booking_prospect"])
+                )
+                allocation = round(
+                    available
+                    * (order_configurations[model["category_id"]] / 100)
+                    * float(total_ws_sum)
+                    * 100
+                )
+            else:
+                allocation = 0
+
+            rows.add(
+                (
+                    tuple(slot.values()),
+                    (
+                        i["id"],
+                        i["dealer_id"],
+                        i["dealer_name"],
+                        YEAR,
+                        MONTH,
+                        i["model_id"],
+                        model["segment_id"],
+                        model["category_id"],
+                        i["forecast_month"],
+                        _coalesce(i["adjustment"]),
+                        ws,
+                        ws_percentage,
+                        min(allocation, ws),
+                        _coalesce(i["confirmed_total_ws"]),
+                        _coalesce(i["end_stock"]),
+                    ),
+                )
+            )
+
+    return sorted([i for _, i in rows], key=_order)
+
+
+def _order(row: tuple) -> tuple:
+    return row[5], row[1], row[8], row[0], row
+
+
+def _compute(period: dict) -> list:
+    models = period["models"]
+    forecast_months = [
+        (
+            i["id"],
+            i["dealer_id"],
+            i["dealer_name"],
+            YEAR,
+            MONTH,
+            i["model_id"],
+            models[i["model_id"]]["segment_id"],
+            models[i["model_id"]]["category_id"],
+            i["forecast_month"],
+            i["adjustment"],
+            i["total_ws"],
+            i["confirmed_total_ws"],
+            i["end_stock"],
+        )
+        for i in period["months"]
+        if not i["detail_deletable"] and not i["deletable"]
+    ]
+
+    total_ws = {}
+    for i in period["months"]:
+        if i["forecast_deletable"] or i["detail_deletable"] or i["deletable"]:
+            continue
+        key = (i["model_id"], i["forecast_month"])
+        total_ws.setdefault(key, None)
+        if i["total_ws"] is not None:
+            total_ws[key] = _coalesce(total_ws[key]) + i["total_ws"]
+
+    slot_details = [
+        (calculation_id, model_id, forecast_month, *[v[k] for k in SLOT_FIELDS])
+        for (calculation_id, model_id, forecast_month), v in period[
+            "slot_details"
+        ].items()
+        if v["deletable"] == 0
+    ]
+
+    result = compute_allocation_adjustments(
+        forecast_months,
+        [(k[0], k[1], v) for k, v in total_ws.items()],
+        period["calculation_ids"],
+        slot_details,
+        period["stock_pilots"],
+        period["order_configurations"],
+    )
+    # the engine orders by model, dealer, forecast month and id, candidates of
+    # one month keep no particular order
+    assert [_order(i)[:4] for i in result] == sorted(_order(i)[:4] for i in result)
+    return sorted(result, key=_order)
+
+
+def _month(id, dealer_id, model_id, forecast_month, **kwargs):
+    month = {
+        "id": id,
+        "dealer_id": dealer_id,
+        "dealer_name": "Dealer {}".format(dealer_id),
+        "model_id": model_id,
+        "forecast_month": forecast_month,
+        "forecast_deletable": 0,
+        "detail_deletable": 0,
+        "deletable": 0,
+        "adjustment": 0,
+        "total_ws": 10,
+        "confirmed_total_ws": 0,
+        "end_stock": 0,
+    }
+    month.update(kwargs)
+    return month
+
+
+def _slot(**kwargs):
+    slot = {k: 0 for k in SLOT_FIELDS}
+    slot.update(slot_1=None, deletable=0)
+    slot.update(kwargs)
+    return slot
+
+
+def _period(months, slot_details=None, calculation_ids=("K1",), **kwargs):
+    period = {
+        "models": {
+            "M1": {"segment_id": "S1", "category_id": "C1"},
+            "M2": {"segment_id": "S2", "category_id": "C2"},
+        },
+        "months": months,
+        "calculation_ids": list(calculation_ids),
+        "slot_details": slot_details or {},
+        "stock_pilots": [("S1", 80), ("S2", 50)],
+        "order_configurations": [("C1", 60), ("C2", 100)],
+    }
+    period.update(kwargs)
+    return period
+
+
+def _random_period(rng: random.Random) -> dict:
+    def value(null_rate=0.2, high=50):
+        return None if rng.random() < null_rate else rng.randint(0, high)
+
+    segments = ["S1", "S2", "S3"]
+    categories = ["C1", "C2", "C3"]
+    models = {
+        "M{}".format(i): {
+            "segment_id": rng.choice(segments),
+            "category_id": rng.choice(categories),
+        }
+        for i in range(rng.randint(1, 6))
+    }
+
+    months = []
+    for dealer in range(rng.randint(1, 4)):
+        forecast_deletable = rng.choice([0, 0, 0, 1])
+        for model_id in rng.sample(sorted(models), rng.randint(1, len(models))):
+            detail_deletable = rng.choice([0, 0, 0, 1])
+            end_stock = value()
+            for forecast_month in range(rng.randint(1, 4)):
+                months.append(
+                    _month(
+                        "X{:04d}".format(len(months)),
+                        "D{}".format(dealer),
+                        model_id,
+                        forecast_month,
+                        forecast_deletable=forecast_deletable,
+                        detail_deletable=detail_deletable,
+                        deletable=rng.choice([0, 0, 0, 1]),
+                        adjustment=value(),
+                        total_ws=value(0.15, 500),
+                        confirmed_total_ws=value(),
+                        end_stock=end_stock,
+                    )
+                )
+
+    calculation_ids = ["K{}".format(i) for i in range(rng.choice([0, 1, 1, 2, 3]))]
+    slot_details = {}
+    for calculation_id in calculation_ids:
+        for model_id in models:
+            for forecast_month in range(4):
+                if rng.random() < 0.7:
+                    slot_details[(calculation_id, model_id, forecast_month)] = {
+                        "take_off": value(0.2, 300),
+                        "soa": value(),
+                        "oc": value(),
+                        "bo": value(),
+                        "so": value(),
+                        "booking_prospect": value(),
+                        "slot_1": value(0.7, 100),
+                        "deletable": rng.choice([0, 0, 0, 1]),
+                    }
+
+    return {
+        "models": models,
+        "months": months,
+        "calculation_ids": calculation_ids,
+        "slot_details": slot_details,
+        "stock_pilots": [
+            (i, rng.randint(0, 100)) for i in segments if rng.random() < 0.9
+        ],
+        "order_configurations": [
+            (i, rng.randint(0, 100)) for i in categories if rng.random() < 0.9
+        ],
+    }
+
+
+def test_empty_period():
+    assert compute_allocation_adjustments([], [], [], [], [], []) == []
+
+
+def test_allocation_from_slot_values():
+    period = _period(
+        [_month("X1", "D1", "M1", 0, total_ws=30), _month("X2", "D2", "M1", 0)],
+        {("K1", "M1", 0): _slot(take_off=100, bo=20, soa=10, so=5)},
+    )
+
+    result = _compute(period)
+
+    assert result == _evaluate_sql(period)
+    # ws 30 of 40 is 75%, allocation is capped at the dealer's ws
+    assert [(i[0], i[11], i[12]) for i in result] == [("X1", 75, 30), ("X2", 25, 10)]
+
+
+def test_slot_1_overrides_the_computed_allocation():
+    period = _period(
+        [_month("X1", "D1", "M1", 0, total_ws=30)],
+        {("K1", "M1", 0): _slot(take_off=100, slot_1=7)},
+    )
+
+    assert _compute(period) == _evaluate_sql(period)
+    assert _compute(period)[0][12] == 7
+
+
+def test_null_values_count_as_zero():
+    period = _period(
+        [
+            _month(
+                "X1",
+                "D1",
+                "M1",
+                0,
+                adjustment=None,
+                total_ws=None,
+                confirmed_total_ws=None,
+                end_stock=None,
+            ),
+            _month("X2", "D2", "M1", 0, total_ws=None),
+        ],
+        {("K1", "M1", 0): _slot(take_off=None, bo=None, soa=None)},
+    )
+
+    result = _compute(period)
+
+    assert result == _evaluate_sql(period)
+    assert all(i[9:] == (0, 0, 0, 0, 0, 0) for i in result)
+    assert all(type(v) is int for i in result for v in i[9:])
+
+
+def test_deleted_rows_are_left_out():
+    period = _period(
+        [
+            _month("X1", "D1", "M1", 0, total_ws=30),
+            _month("X2", "D2", "M1", 0, total_ws=50, deletable=1),
+            _month("X3", "D3", "M1", 0, total_ws=50, detail_deletable=1),
+            # a deleted forecast keeps its rows but not its share of the total
+            _month("X4", "D4", "M1", 0, total_ws=10, forecast_deletable=1),
+        ],
+        {
+            ("K1", "M1", 0): _slot(take_off=100),
+            ("K2", "M1", 0): _slot(take_off=500, deletable=1),
+        },
+        calculation_ids=["K1", "K2"],
+    )
+
+    result = _compute(period)
+
+    # K2 has no live detail, so it is an empty candidate of its own
+    assert result == _evaluate_sql(period)
+    assert [i[0] for i in result] == ["X1", "X1", "X4", "X4"]
+    assert [i[11] for i in result] == [100, 100, 33, 33]
+
+
+def test_missing_stock_pilot_or_order_configuration_drops_the_row():
+    period = _period(
+        [_month("X1", "D1", "M1", 0), _month("X2", "D1", "M2", 0)],
+        stock_pilots=[("S1", 80)],
+    )
+
+    result = _compute(period)
+
+    assert result == _evaluate_sql(period)
+    assert [i[0] for i in result] == ["X1"]
+
+
+def test_every_calculation_gives_a_candidate():
+    period = _period(
+        [_month("X1", "D1", "M1", 0, total_ws=40)],
+        {
+            ("K1", "M1", 0): _slot(take_off=100),
+            ("K2", "M1", 0): _slot(take_off=100),
+            ("K3", "M1", 0): _slot(slot_1=3),
+        },
+        calculation_ids=["K1", "K2", "K3", "K4"],
+    )
+
+    result = _compute(period)
+
+    # K1 and K2 collapse, K3 has its own slot_1 and K4 has no detail
+    assert result == _evaluate_sql(period)
+    assert len(result) == 3
+
+
+def test_without_calculations_the_allocation_is_computed_from_nothing():
+    period = _period([_month("X1", "D1", "M1", 0)], calculation_ids=[])
+
+    assert _compute(period) == _evaluate_sql(period)
+    assert len(_compute(period)) == 1
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_the_sql_on_random_periods(seed):
+    period = _random_period(random.Random(seed))
+
+    assert _compute(period) == _evaluate_sql(period)
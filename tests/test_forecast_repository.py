@@ -0,0 +1,191 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from src.domains.forecasts.entities.va_forecast_detail_months import ForecastDetailMonth
+from src.domains.forecasts.entities.va_forecast_details import ForecastDetail
+from src.domains.forecasts.entities.va_forecasts import Forecast
+from src.domains.forecasts.forecast_repository import ForecastRepository
+from src.domains.masters.entities.va_categories import Category
+from src.domains.masters.entities.va_dealers import Dealer
+from src.domains.masters.entities.va_models import Model
+from src.domains.masters.entities.va_segments import Segment
+from src.shared.entities.migrations import BaseModel
+
+YEAR = 2024
+MONTH = 5
+MODELS = 4
+FORECAST_MONTHS = 3
+
+
+class _AsyncSession:
+    # find_forecast_async only awaits execute, the statements it sends are
+    # the same on a sync session
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, statement):
+        return self.session.execute(statement)
+
+
+def _seed(session: Session, dealers: int) -> None:
+    session.execute(insert(Category), [{"id": "CAT"}])
+    session.execute(insert(Segment), [{"id": "SEG"}])
+    session.execute(
+        insert(Model),
+        [
+            {
+                "id": "M{}".format(i),
+                "manufacture_code": "M",
+                "group": "G",
+                "variant": "V",
+                "category_id": "CAT",
+                "segment_id": "SEG",
+                "usage": "U",
+                "euro": "E",
+            }
+            for i in range(MODELS)
+        ],
+    )
+    session.execute(
+        insert(Dealer),
+        [
+            {"id": "D{}".format(i), "name": "Dealer {}".format(i)}
+            for i in range(dealers)
+        ],
+    )
+
+    forecasts, details, months = [], [], []
+    for i in range(dealers):
+        # every dealer re-sent its forecast once, the first one is deleted
+        for deletable in [1, 0]:
+            forecast_id = "F{}-{}".format(i, deletable)
+            forecasts.append(
+                {
+                    "id": forecast_id,
+                    "name": "Forecast",
+                    "month": MONTH,
+                    "year": YEAR,
+                    "dealer_id": "D{}".format(i),
+                    "deletable": deletable,
+                }
+            )
+            for j in range(MODELS):
+                detail_id = "{}-{}".format(forecast_id, j)
+                details.append(
+                    {
+                        "id": detail_id,
+                        "forecast_id": forecast_id,
+                        "model_id": "M{}".format(j),
+                        "end_stock": 0,
+                        # the last model was removed from the live forecast
+                        "deletable": int(deletable or j == MODELS - 1),
+                    }
+                )
+                for k in range(1, FORECAST_MONTHS + 1):
+                    months.append(
+                        {
+                            "id": "{}-{}".format(detail_id, k),
+                            "forecast_detail_id": detail_id,
+                            "forecast_month": k,
+                            "total_ws": k,
+                            "hmsi_allocation": k,
+                            "deletable": int(deletable or k == FORECAST_MONTHS),
+                        }
+                    )
+    session.execute(insert(Forecast), forecasts)
+    session.execute(insert(ForecastDetail), details)
+    session.execute(insert(ForecastDetailMonth), months)
+    session.commit()
+
+
+def _walk(forecast: Forecast) -> list:
+    # everything the use cases read from a loaded forecast tree
+    return [
+        (
+            forecast.id,
+            forecast.dealer_id,
+            i.id,
+            i.model_id,
+            i.deletable,
+            [(j.forecast_month, j.hmsi_allocation, j.deletable) for j in i.months],
+        )
+        for i in forecast.details
+    ]
+
+
+def _count_statements(dealers: int, call) -> tuple:
+    engine = create_engine("sqlite://")
+    BaseModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        _seed(session, dealers)
+        session.expunge_all()
+
+        statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        repository = ForecastRepository(session, _AsyncSession(session))
+        request = SimpleNamespace(state=SimpleNamespace(va_db=None))
+        result = call(repository, request)
+
+        return len(statements), result
+
+
+@pytest.mark.parametrize("dealers", [1, 5, 20])
+def test_get_forecast_loads_a_month_in_three_statements(dealers):
+    count, result = _count_statements(
+        dealers,
+        lambda repository, request: [
+            _walk(i) for i in repository.get_forecast(request, month=MONTH, year=YEAR)
+        ],
+    )
+
+    assert count == 3
+    assert len(result) == dealers
+    for i in result:
+        # only the live details and months are loaded
+        assert len(i) == MODELS - 1
+        assert all(j[4] == 0 for j in i)
+        assert all(len(j[5]) == FORECAST_MONTHS - 1 for j in i)
+
+
+def test_find_forecast_loads_a_tree_in_three_statements():
+    count, result = _count_statements(
+        5,
+        lambda repository, request: _walk(
+            repository.find_forecast(request, dealer_id="D3", month=MONTH, year=YEAR)
+        ),
+    )
+
+    assert count == 3
+    # removed details and months stay loaded, the diff revives them
+    assert len(result) == MODELS
+    assert {i[0] for i in result} == {"F3-0"}
+
+
+def test_find_forecast_async_loads_a_tree_in_two_statements():
+    def call(repository, request):
+        forecast = asyncio.run(
+            repository.find_forecast_async(
+                request, dealer_id="D3", month=MONTH, year=YEAR
+            )
+        )
+        return forecast.dealer.name, [
+            (i.model.id, i.model.category_id, [j.forecast_month for j in i.months])
+            for i in forecast.details
+        ]
+
+    count, (dealer_name, details) = _count_statements(5, call)
+
+    assert count == 2
+    assert dealer_name == "Dealer 3"
+    assert sorted(details) == [
+        ("M{}".format(i), "CAT", list(range(1, FORECAST_MONTHS)))
+        for i in range(MODELS - 1)
+    ]